@@ -0,0 +1,57 @@
+# Authors:  PAGistyczna Drużyna Cybergeodetów
+# Created:  2026-10-18
+#
+# Wiele niezależnych tras naraz - pary punktów rozdzielane między procesy (multiprocessing.Pool).
+# Każdy proces otwiera ten sam plik .pfg przez mmap (jak procesy routing_server), więc graf nie jest kopiowany
+# ani przesyłany (pickle) do procesów - przesyłane są tylko pary punktów i wyniki.
+# Wyniki są zwracane na bieżąco: w kolejności par (ordered=True) albo w kolejności obliczenia.
+
+import os
+from multiprocessing import Pool
+
+# generator wyników (indeks pary, wynik) - wynik jak w routing_server /route: słownik z "cost", "edge_ids",
+# ("path" przy geometry=True), {"found": False} bez ścieżki albo {"error": ...} (np. punkt za daleko od dróg)
+#   pairs   - pary punktów ((x, y), (x, y))
+#   metric  - "time" lub "length"
+#   workers - liczba procesów (domyślnie liczba rdzeni); 0 - w bieżącym procesie
+#   method  - "astar", "dijkstra", "bidirectional", "alt", "ch" (ALT i CH zapisywane raz przed startem procesów)
+#   chunk   - liczba par wysyłanych do procesu naraz
+#   cache_bytes - pamięć tras każdego procesu (route_cache) - powtarzające się pary liczone raz na proces
+def route_batch(pairs, metric="time", workers=None, in_graph_file="PF_graph.pfg", method="astar", ordered=True,
+                geometry=False, chunk=16, cache_bytes=64 * 2**20):
+    from routing_server import _init_worker, prepare_graph_file
+
+    tasks = ((i, {"start": list(start), "end": list(end), "cost": metric, "method": method, "geometry": geometry})
+             for i, (start, end) in enumerate(pairs))
+    if method in ("alt", "ch"):
+        prepare_graph_file(in_graph_file, [method], [metric])
+
+    if workers == 0:
+        _init_worker(in_graph_file, cache_bytes)
+        yield from map(_route_task, tasks)
+        return
+    with Pool(workers or os.cpu_count(), initializer=_init_worker, initargs=(in_graph_file, cache_bytes)) as pool:
+        results = pool.imap(_route_task, tasks, chunk) if ordered else pool.imap_unordered(_route_task, tasks, chunk)
+        yield from results
+
+def _route_task(task):
+    from routing_server import _handle
+
+    i, params = task
+    _, result = _handle("route", params)
+    return i, result
+
+# trasy dla par punktów zapisane do pliku (writers: .gpkg, .geojson, .ndjson, .csv) - bez arcpy; linie tras
+# w kolejności przejazdu (CSRGraph.route_geometry), atrybuty: indeks pary, koszt, liczba krawędzi.
+# Pary bez trasy nie są zapisywane. Wynik: (liczba zapisanych tras, liczba par bez trasy)
+def write_batch(pairs, output, metric="time", layer="routes", **kwargs):
+    from writers import open_writer
+
+    failed = 0
+    with open_writer(output, "LineString", layer) as writer:
+        for i, result in route_batch(pairs, metric, geometry=True, **kwargs):
+            if not result.get("found"):
+                failed += 1
+                continue
+            writer.write(result["path"], {"pair": i, "cost": result["cost"], "edges": len(result["edge_ids"])})
+    return writer.count, failed
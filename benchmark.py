@@ -0,0 +1,1011 @@
+# Authors:  PAGistyczna Drużyna Cybergeodetów
+# Created:  2026-10-18
+#
+# Pomiary wydajności struktur grafu i algorytmów (bez ArcGIS GUI).
+# Użycie:  python benchmark.py <test> [argumenty]
+
+import glob
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+TORUN_ZIP = "nowy_SKJZ_L.zip"
+
+# ścieżka do pliku shp - archiwum zip z danymi rozpakowywane jest do katalogu tymczasowego
+def source_shp(path=TORUN_ZIP):
+    if path.lower().endswith(".zip"):
+        out_dir = os.path.join(tempfile.gettempdir(), "PF_" + os.path.splitext(os.path.basename(path))[0])
+        if not os.path.isdir(out_dir):
+            with zipfile.ZipFile(path) as z:
+                z.extractall(out_dir)
+        return sorted(glob.glob(os.path.join(out_dir, "**", "*.shp"), recursive=True))[0]
+    return path
+
+# graf słownikowy: z pliku pickle (generate_launcher) albo z danych shp / zip
+def source_graph(path=TORUN_ZIP):
+    from toolbox_core import Graph
+    from csr_graph import load_graph_pickle
+
+    if path.lower().endswith(".pkl"):
+        return load_graph_pickle(path)
+    return Graph(source_shp(path), loader="shp")
+
+# pamięć: graf słownikowy (Node / Edge) vs CSR
+def bench_csr(path=TORUN_ZIP):
+    from csr_graph import CSRGraph, memory_report
+
+    g = source_graph(path)
+    t0 = time.time()
+    csr = CSRGraph.from_graph(g)
+    t1 = time.time()
+    print(f"conversion to CSR: {t1 - t0:.3f} s")
+    memory_report(g, csr)
+
+# odczyt danych: shp_reader vs kursor arcpy (jeśli dostępny)
+def bench_loader(path=TORUN_ZIP):
+    import toolbox_core as tb
+    from shp_reader import ShapefileReader
+
+    shp = source_shp(path)
+    size = sum(os.path.getsize(os.path.splitext(shp)[0] + ext) for ext in (".shp", ".shx", ".dbf"))
+    print(f"source: {shp} ({size / 2**20:.1f} MB)")
+
+    t0 = time.time()
+    count = sum(1 for _ in ShapefileReader(shp, ["KLASA_DROG", "DIRECTION"]).rows())
+    t1 = time.time()
+    print(f"shp_reader rows:        {t1 - t0:.3f} s   ({count / (t1 - t0):.0f} rows/s, {count} rows)")
+
+    t0 = time.time()
+    g = tb.Graph(shp, loader="shp")
+    t1 = time.time()
+    print(f"Graph (loader='shp'):   {t1 - t0:.3f} s   ({len(g.nodes)} nodes)")
+
+    if tb.arcpy is None:
+        print("arcpy not available - cursor comparison skipped")
+        return
+
+    tb.IDFIELD = "FID"
+    t0 = time.time()
+    g_arcpy = tb.Graph(shp, loader="arcpy")
+    t1 = time.time()
+    print(f"Graph (loader='arcpy'): {t1 - t0:.3f} s   ({len(g_arcpy.nodes)} nodes)")
+
+# czas odczytu grafu: pickle (Graph, CSRGraph) vs plik .pfg (mmap)
+def bench_graph_file(path=TORUN_ZIP, repeat=5):
+    import pickle
+    from csr_graph import CSRGraph
+    from graph_file import GraphFile, load_graph, save_graph
+
+    g = source_graph(path)
+    csr = CSRGraph.from_graph(g)
+    out_dir = tempfile.mkdtemp(prefix="PF_bench_")
+    files = {
+        "pickle Graph": os.path.join(out_dir, "PF_graph.pkl"),
+        "pickle CSRGraph": os.path.join(out_dir, "PF_graph_csr.pkl"),
+        ".pfg mmap": os.path.join(out_dir, "PF_graph.pfg"),
+    }
+    with open(files["pickle Graph"], "wb") as f:
+        pickle.dump(g, f)
+    with open(files["pickle CSRGraph"], "wb") as f:
+        pickle.dump(csr, f)
+    save_graph(files[".pfg mmap"], csr)
+
+    def load(name):
+        if name == ".pfg mmap":
+            return load_graph(files[name])
+        with open(files[name], "rb") as f:
+            return pickle.load(f)
+
+    print(f"{'format':<18}{'size [MB]':>12}{'load [ms]':>12}")
+    for name in files:
+        times = []
+        for _ in range(int(repeat)):
+            t0 = time.perf_counter()
+            load(name)
+            times.append(time.perf_counter() - t0)
+        print(f"{name:<18}{os.path.getsize(files[name]) / 2**20:>12.2f}{sorted(times)[len(times) // 2] * 1000:>12.2f}")
+
+    t0 = time.perf_counter()
+    GraphFile(files[".pfg mmap"], verify=True)
+    print(f"pfg load with checksum verification: {(time.perf_counter() - t0) * 1000:.2f} ms")
+
+# punkty testowe jak w console_test.py (data/test/test_1.shp x data/test/test_2.shp),
+# bez tych plików - siatka 5 x 5 punktów na obszarze grafu
+TEST_1 = os.path.join("data", "test", "test_1.shp")
+TEST_2 = os.path.join("data", "test", "test_2.shp")
+
+def test_points(csr, test_1=TEST_1, test_2=TEST_2, grid=5):
+    from shp_reader import read_points
+    import numpy as np
+
+    if os.path.exists(test_1) and os.path.exists(test_2):
+        return read_points(test_1), read_points(test_2)
+    xs = np.linspace(csr.x.min(), csr.x.max(), grid + 2)[1:-1]
+    ys = np.linspace(csr.y.min(), csr.y.max(), grid + 2)[1:-1]
+    points = [(float(x), float(y)) for x in xs for y in ys]
+    return points, points
+
+# najbliższy węzeł grafu (przeszukanie wszystkich węzłów - tylko na potrzeby pomiarów)
+def nearest_node(csr, point):
+    import numpy as np
+    i = int(np.argmin((csr.x - point[0]) ** 2 + (csr.y - point[1]) ** 2))
+    return csr.coords(i)
+
+# A* jednokierunkowy vs dwukierunkowy: liczba odwiedzonych węzłów (volume of S) i czas
+def bench_bidirectional(path=TORUN_ZIP, test_1=TEST_1, test_2=TEST_2):
+    from toolbox_core import h_length, h_time
+    from csr_graph import CSRGraph
+
+    csr = CSRGraph.from_graph(source_graph(path))
+    list_1, list_2 = test_points(csr, test_1, test_2)
+    pairs = [(nearest_node(csr, a), nearest_node(csr, b)) for a in list_1 for b in list_2]
+
+    print(f"{len(pairs)} point pairs")
+    print(f"{'mode':<15}{'algorithm':<16}{'sum of S':>12}{'time [s]':>12}")
+    for mode, cost, h in (("Shortest_Path", "length", h_length), ("Fastest_Path", "time", h_time)):
+        for name, search in (("aShift8", csr.aShift8), ("bidirectional", csr.aShift8_bidirectional)):
+            settled = 0
+            t0 = time.time()
+            for start, end in pairs:
+                result = search(cost, h, start, end)
+                if result is not None:
+                    settled += result[3]
+            t1 = time.time()
+            print(f"{mode:<15}{name:<16}{settled:>12}{t1 - t0:>12.3f}")
+
+# Contraction Hierarchies: preprocessing, liczba skrótów i przyspieszenie zapytań względem aShift8
+def bench_ch(path=TORUN_ZIP, test_1=TEST_1, test_2=TEST_2):
+    from toolbox_core import h_length, h_time
+    from csr_graph import CSRGraph
+    from contraction import ContractionHierarchy
+
+    csr = CSRGraph.from_graph(source_graph(path))
+    list_1, list_2 = test_points(csr, test_1, test_2)
+    pairs = [(nearest_node(csr, a), nearest_node(csr, b)) for a in list_1 for b in list_2]
+    print(f"{csr.node_count} nodes, {csr.edge_count} edges, {len(pairs)} point pairs")
+
+    for cost, h in (("length", h_length), ("time", h_time)):
+        t0 = time.time()
+        ch = ContractionHierarchy.build(csr, cost)
+        t1 = time.time()
+        print(f"\n{cost}: preprocessing {t1 - t0:.2f} s, {ch.shortcut_count} shortcuts")
+
+        t0 = time.time()
+        astar = [csr.aShift8(cost, h, start, end) for start, end in pairs]
+        t1 = time.time()
+        ch_results = [ch.query(start, end) for start, end in pairs]
+        t2 = time.time()
+
+        settled_astar = sum(a[3] for a in astar if a is not None)
+        settled_ch = sum(b[3] for b in ch_results if b is not None)
+        print(f"aShift8: {t1 - t0:.3f} s (S: {settled_astar})   CH: {t2 - t1:.3f} s (S: {settled_ch})   "
+              f"speedup: {(t1 - t0) / (t2 - t1):.1f}x")
+
+# heurystyka ALT vs h_time / h_length i Dijkstra (h = 0): liczba odwiedzonych węzłów i czas
+def bench_alt(path=TORUN_ZIP, test_1=TEST_1, test_2=TEST_2, count=8):
+    from toolbox_core import h_length, h_time
+    from csr_graph import CSRGraph
+    from landmarks import Landmarks
+
+    csr = CSRGraph.from_graph(source_graph(path))
+    list_1, list_2 = test_points(csr, test_1, test_2)
+    pairs = [(nearest_node(csr, a), nearest_node(csr, b)) for a in list_1 for b in list_2]
+    print(f"{len(pairs)} point pairs, {count} landmarks")
+
+    def dijkstra_h(current, end):
+        return 0
+
+    for cost, h in (("time", h_time), ("length", h_length)):
+        for method in ("farthest", "avoid"):
+            t0 = time.time()
+            alt = Landmarks.build(csr, cost, int(count), method)
+            t1 = time.time()
+            print(f"\n{cost}, {method}: preprocessing {t1 - t0:.2f} s, "
+                  f"{alt.nbytes() / csr.node_count / alt.k:.1f} B per node per landmark")
+            print(f"{'heuristic':<12}{'sum of S':>12}{'time [s]':>12}")
+            for name, heuristic in (("dijkstra", dijkstra_h), (h.__name__, h), ("ALT", alt)):
+                t0 = time.time()
+                results = [csr.aShift8(cost, heuristic, start, end) for start, end in pairs]
+                t1 = time.time()
+                settled = sum(r[3] for r in results if r is not None)
+                print(f"{name:<12}{settled:>12}{t1 - t0:>12.3f}")
+
+# kolejki priorytetowe (pqueue): odtworzenie śladu operacji z rzeczywistych zapytań i pełne zapytania
+def bench_queue(path=TORUN_ZIP, test_1=TEST_1, test_2=TEST_2):
+    import csr_graph
+    import pqueue
+    from toolbox_core import h_length, h_time
+
+    csr = csr_graph.CSRGraph.from_graph(source_graph(path))
+    list_1, list_2 = test_points(csr, test_1, test_2)
+    pairs = [(nearest_node(csr, a), nearest_node(csr, b)) for a in list_1 for b in list_2]
+
+    # ślady: osobno dla każdej kolejki utworzonej w zapytaniach A*, zapisane przez RecordingQueue. Domyślna kolejka
+    # "lazy" działa w aShift8 wprost na liście heapq (bez make_queue), więc ślad jest zapisywany z kolejką
+    # z decrease-key ("quaternary") - ta sama sekwencja push / pop dla każdej odtwarzanej kolejki
+    traces = []
+    make_queue = csr_graph.make_queue
+
+    def recording_queue(name, n):
+        traces.append([])
+        return pqueue.RecordingQueue(make_queue(name, n), traces[-1])
+
+    csr_graph.make_queue = recording_queue
+    try:
+        for start, end in pairs:
+            csr.aShift8("time", h_time, start, end, queue="quaternary")
+    finally:
+        csr_graph.make_queue = make_queue
+    ops = sum(len(trace) for trace in traces)
+    pops = sum(op for trace in traces for op, _, _ in trace)
+    print(f"{len(pairs)} point pairs, trace: {ops - pops} push, {pops} pop")
+
+    print(f"\n{'queue':<12}{'replay [s]':>12}{'time [s]':>12}{'length [s]':>12}{'bidir. [s]':>12}")
+    for name in pqueue.QUEUES:
+        t0 = time.time()
+        for trace in traces:
+            pqueue.replay(pqueue.make_queue(name, csr.node_count), trace)
+        replay_time = time.time() - t0
+
+        row = [replay_time]
+        for cost, h, bidirectional in (("time", h_time, False), ("length", h_length, False), ("time", h_time, True)):
+            search = csr.aShift8_bidirectional if bidirectional else csr.aShift8
+            t0 = time.time()
+            for start, end in pairs:
+                search(cost, h, start, end, queue=name)
+            row.append(time.time() - t0)
+        print(f"{name:<12}" + "".join(f"{t:>12.3f}" for t in row))
+
+# indeks przestrzenny (spatial_index): budowa i czas zapytań vs pełny przegląd wszystkich odcinków
+def bench_snap(path=TORUN_ZIP, count=2000, noise=100):
+    import random
+    import numpy as np
+    import graph_builder
+    from spatial_index import SpatialIndex
+
+    # odcinki linii dróg z pełnej geometrii grafu
+    csr = graph_builder.load_graph(source_shp(path), "shp")
+    t0 = time.time()
+    index = SpatialIndex.build(csr)
+    t1 = time.time()
+    print(f"index: {t1 - t0:.3f} s, {index.nx} x {index.ny} cells of {index.cell:.0f} m, {len(index.seg)} segments, "
+          f"{index.nbytes() / 2**20:.2f} MB")
+
+    # punkty w pobliżu losowych węzłów
+    rng = random.Random(0)
+    points = []
+    for _ in range(int(count)):
+        v = rng.randrange(csr.node_count)
+        points.append((csr.x[v] + rng.uniform(-noise, noise), csr.y[v] + rng.uniform(-noise, noise)))
+
+    for name, query in (("nearest_node", index.nearest_node), ("nearest_edge", index.nearest_edge)):
+        t0 = time.time()
+        for p in points:
+            query(p)
+        t1 = time.time()
+        print(f"{name}: {(t1 - t0) / len(points) * 1e6:.1f} us per query")
+
+    # pełny przegląd odcinków
+    a, d = index.seg[:, :2], index.seg[:, 2:] - index.seg[:, :2]
+    dd = np.where((d * d).sum(1) > 0, (d * d).sum(1), 1)
+    t0 = time.time()
+    for p in points:
+        t = np.clip(((np.array(p) - a) * d).sum(1) / dd, 0, 1)
+        np.sqrt(((a + t[:, None] * d - p) ** 2).sum(1)).min()
+    t1 = time.time()
+    print(f"brute force: {(t1 - t0) / len(points) * 1e6:.1f} us per query")
+
+    t0 = time.time()
+    for p, q in zip(points[::2], points[1::2]):
+        csr.snap(p, q)
+    t1 = time.time()
+    print(f"CSRGraph.snap: {(t1 - t0) / (len(points) // 2) * 1e3:.3f} ms per call (start and end)")
+
+# snapowanie z podziałem krawędzi (węzły wirtualne) vs przeniesienie punktu do bliższego końca krawędzi
+def bench_split(path=TORUN_ZIP, count=300, noise=150):
+    import random
+    from toolbox_core import h_time
+    from csr_graph import CSRGraph
+
+    csr = CSRGraph.from_graph(source_graph(path))
+    csr.spatial_index()
+    rng = random.Random(0)
+    pairs = []
+    for _ in range(int(count)):
+        a, b = rng.randrange(csr.node_count), rng.randrange(csr.node_count)
+        pairs.append(((csr.x[a] + rng.uniform(-noise, noise), csr.y[a] + rng.uniform(-noise, noise)),
+                      (csr.x[b] + rng.uniform(-noise, noise), csr.y[b] + rng.uniform(-noise, noise))))
+
+    for name, snap in (("snap", csr.snap), ("snap_split", csr.snap_split)):
+        t0 = time.time()
+        for start, end in pairs:
+            snap(start, end)
+        t1 = time.time()
+        print(f"{name}: {(t1 - t0) / len(pairs) * 1e3:.3f} ms per call")
+
+    total = {"snap": [0, 0, 0.0], "snap_split": [0, 0, 0.0]}      # suma kosztu, suma S, czas
+    for start, end in pairs:
+        (s, e), _, snap_time = csr.snap(start, end)
+        t0 = time.time()
+        r = csr.aShift8("time", h_time, s, e)
+        total["snap"][2] += time.time() - t0
+        if r is not None:
+            total["snap"][0] += r[2] + snap_time
+            total["snap"][1] += r[3]
+
+        (s, e), _, snap_time, virtual = csr.snap_split(start, end)
+        t0 = time.time()
+        r = csr.aShift8("time", h_time, s, e, virtual=virtual)
+        total["snap_split"][2] += time.time() - t0
+        if r is not None:
+            total["snap_split"][0] += r[2] + snap_time
+            total["snap_split"][1] += r[3]
+
+    print(f"\n{'snapping':<12}{'sum of time [h]':>16}{'sum of S':>12}{'A* [s]':>10}")
+    for name, (cost, settled, t) in total.items():
+        print(f"{name:<12}{cost / 3600:>16.2f}{settled:>12}{t:>10.3f}")
+
+# macierz kosztów (matrix.distance_matrix) vs zapytanie dla każdej pary punktów jak w console_test.py
+# (snap i A* dla każdej pary; bez odczytu pickle i eksportu klas, które console_test robi dodatkowo)
+def bench_matrix(path=TORUN_ZIP, test_1=TEST_1, test_2=TEST_2, cost="time"):
+    import math
+    import numpy as np
+    from toolbox_core import h_length, h_time
+    from contraction import ContractionHierarchy
+    from csr_graph import CSRGraph
+    from matrix import distance_matrix
+
+    csr = CSRGraph.from_graph(source_graph(path))
+    csr.spatial_index()
+    list_1, list_2 = test_points(csr, test_1, test_2)
+    print(f"{len(list_1)} x {len(list_2)} points, cost: {cost}")
+    h = h_time if cost == "time" else h_length
+
+    t0 = time.time()
+    pairwise = np.full((len(list_1), len(list_2)), math.inf)
+    for i, start in enumerate(list_1):
+        for j, end in enumerate(list_2):
+            try:
+                (s, e), snap_length, snap_time, virtual = csr.snap_split(start, end)
+            except ValueError:
+                continue                                    # punkt poza siecią
+            r = csr.aShift8(cost, h, s, e, virtual=virtual)
+            if r is not None:
+                pairwise[i, j] = r[2] + (snap_time if cost == "time" else snap_length)
+    t1 = time.time()
+    print(f"pairwise snap + A*:        {t1 - t0:8.3f} s")
+
+    t0 = time.time()
+    distance_matrix(csr, list_1, list_2, cost, "dijkstra")
+    t1 = time.time()
+    print(f"distance_matrix dijkstra:  {t1 - t0:8.3f} s")
+
+    t0 = time.time()
+    ch = ContractionHierarchy.build(csr, cost)
+    t1 = time.time()
+    distance_matrix(csr, list_1, list_2, cost, "ch", ch=ch)
+    t2 = time.time()
+    print(f"distance_matrix ch:        {t2 - t1:8.3f} s   (+ {t1 - t0:.1f} s preprocessing)")
+
+    routes = []
+    t0 = time.time()
+    distance_matrix(csr, list_1, list_2, cost, "dijkstra", paths=lambda i, j, nodes, edges: routes.append(len(edges)))
+    t1 = time.time()
+    print(f"dijkstra with paths:       {t1 - t0:8.3f} s   ({len(routes)} paths)")
+
+# zasięg: dijkstra_with_time_limit + wybór krawędzi jak w dawnym Dijsktra_launcher (lista, O(V * E))
+# vs reach (tablice NumPy) dla jednego punktu, a następnie wiele źródeł i progów w jednym przeszukiwaniu
+def bench_reach(path=TORUN_ZIP, max_time=300, sources=10):
+    import random
+    import numpy as np
+    from csr_graph import CSRGraph
+    from reach import reach
+
+    g = source_graph(path)
+    csr = CSRGraph.from_graph(g)
+    max_time = float(max_time)
+    start = csr.coords(int(np.argmin((csr.x - csr.x.mean()) ** 2 + (csr.y - csr.y.mean()) ** 2)))
+
+    t0 = time.time()
+    reachable_nodes = g.dijkstra_with_time_limit(start, max_time)
+    t1 = time.time()
+    dijkstra_edges = []
+    for node in reachable_nodes:
+        for edge in g.nodes[node].edges:
+            if edge.id in reachable_nodes and edge.edge_id not in dijkstra_edges:
+                dijkstra_edges.append(edge.edge_id)
+    t2 = time.time()
+    print(f"dict Graph: search {t1 - t0:.3f} s, edge extraction {t2 - t1:.3f} s "
+          f"({len(reachable_nodes)} nodes, {len(dijkstra_edges)} edges)")
+
+    t0 = time.time()
+    r = reach(csr, [csr.node_id(start)], max_time)
+    t1 = time.time()
+    edge_ids = r.edge_ids()
+    t2 = time.time()
+    print(f"reach:      search {t1 - t0:.3f} s, edge extraction {(t2 - t1) * 1000:.2f} ms "
+          f"({len(r.nodes())} nodes, {len(edge_ids)} edges)")
+
+    # wiele źródeł i progi 1/3, 2/3 i 3/3 max_time w jednym przeszukiwaniu
+    rng = random.Random(0)
+    ids = [rng.randrange(csr.node_count) for _ in range(int(sources))]
+    bands = [max_time / 3, max_time * 2 / 3, max_time]
+    t0 = time.time()
+    r = reach(csr, ids, max_time)
+    edge_bands = r.edge_bands(bands)
+    t1 = time.time()
+    for i in range(len(ids)):
+        reach(csr, [ids[i]], max_time)
+    t2 = time.time()
+    print(f"\n{len(ids)} sources, bands {bands}: one search {t1 - t0:.3f} s "
+          f"({', '.join(str(len(e)) for e in edge_bands)} edges), separate searches {t2 - t1:.3f} s")
+    print(f"nodes per nearest source: {np.bincount(r.source[r.source >= 0]).tolist()}")
+
+def bench_isochrone(path=TORUN_ZIP, max_time=900):
+    import numpy as np
+    from csr_graph import CSRGraph
+    from isochrone import isochrones
+    from reach import reach
+    from writers import wkb
+
+    csr = CSRGraph.from_graph(source_graph(path))
+    max_time = float(max_time)
+    start = int(np.argmin((csr.x - csr.x.mean()) ** 2 + (csr.y - csr.y.mean()) ** 2))
+    bands = [max_time / 3, max_time * 2 / 3, max_time]
+
+    t0 = time.time()
+    r = reach(csr, [start], max_time)
+    t1 = time.time()
+    polygons = isochrones(r, bands)
+    t2 = time.time()
+    print(f"reach {t1 - t0:.3f} s, isochrones for {len(bands)} bands {t2 - t1:.3f} s")
+    for t, band in zip(bands, polygons):
+        area = sum(_ring_area(poly[0]) - sum(_ring_area(hole) for hole in poly[1:]) for poly in band)
+        print(f"  {t:.0f} s: {len(band)} polygons, {sum(len(p) - 1 for p in band)} holes, "
+              f"{area / 1e6:.2f} km2, WKB {len(wkb('MultiPolygon', band))} B")
+
+    # dotychczasowa otoczka wklęsła (triangulacja wszystkich węzłów w zasięgu) - tylko dla największego progu
+    try:
+        from shapely.geometry import MultiPoint
+        from shapely.ops import triangulate, unary_union
+    except ImportError:
+        print("shapely not installed - concave hull skipped")
+        return
+    t0 = time.time()
+    hull = unary_union([tri for tri in triangulate(MultiPoint(r.coords())) if tri.area < 40000.0])
+    t1 = time.time()
+    print(f"concave hull ({len(r.nodes())} nodes): {t1 - t0:.3f} s, {hull.area / 1e6:.2f} km2")
+
+def _ring_area(ring):
+    return 0.5 * abs(sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(ring, ring[1:])))
+
+# budowa grafu: pętla Graph.generate_graph vs graph_builder (te same tablice wierszy), także sieć syntetyczna
+def bench_builder(path=TORUN_ZIP, synthetic_edges=10_000_000, loop_edges=1_000_000):
+    import graph_builder
+    from csr_graph import CSRGraph
+
+    shp = source_shp(path)
+    t0 = time.time()
+    g = CSRGraph.from_graph(source_graph(path))
+    t1 = time.time()
+    graph_builder.load_graph(shp, "shp")
+    t2 = time.time()
+    print(f"{path}: Graph + CSRGraph.from_graph {t1 - t0:.3f} s, graph_builder.load_graph {t2 - t1:.3f} s")
+
+    for n_edges in (int(loop_edges), int(synthetic_edges)):
+        columns = synthetic_rows(n_edges)
+        t0 = time.time()
+        b = graph_builder.build_graph(*columns)
+        t1 = time.time()
+        print(f"\nsynthetic {n_edges} edges: graph_builder {t1 - t0:.2f} s ({b.node_count} nodes, {b.edge_count} arcs)")
+        if n_edges > int(loop_edges):
+            continue
+        g = _loop_graph(columns)
+        t2 = time.time()
+        g = CSRGraph.from_graph(g)
+        t3 = time.time()
+        print(f"generate_graph loop {t2 - t1:.2f} s (+ from_graph {t3 - t2:.2f} s)")
+        del g, b
+
+# Graph.generate_graph na gotowych tablicach wierszy (bez odczytu pliku)
+def _loop_graph(columns):
+    from toolbox_core import Graph
+
+    x0, y0, x1, y1, edge_ids, length, road_class, direction = columns
+    g = Graph.__new__(Graph)
+    g.data_fc = None
+    g.nodes = {}
+    rows = zip(edge_ids.tolist(), zip(x0.tolist(), y0.tolist()), zip(x1.tolist(), y1.tolist()), length.tolist(),
+               road_class.tolist(), direction.tolist())
+    g.read_rows = lambda: rows
+    g.generate_graph()
+    return g
+
+# sieć syntetyczna: skrzyżowania w oczkach siatki co 100 m, drogi między sąsiadami; 5% końców dróg jest
+# przesuniętych o kilka cm względem skrzyżowania (część z nich trafia do sąsiednich kwadratów 1 x 1 m)
+def synthetic_rows(n_edges, seed=0):
+    import numpy as np
+    from toolbox_core import speed_dict
+
+    rng = np.random.default_rng(seed)
+    side = int(np.sqrt(n_edges / 2)) + 1
+    i = rng.integers(0, side, n_edges)
+    j = rng.integers(0, side, n_edges)
+    horizontal = rng.random(n_edges) < 0.5
+    jx = rng.uniform(0, 100, (side + 1, side + 1))      # położenie skrzyżowań w oczkach siatki
+    jy = rng.uniform(0, 100, (side + 1, side + 1))
+    i1, j1 = i + horizontal, j + ~horizontal
+    noise = lambda: rng.uniform(-0.05, 0.05, n_edges) * (rng.random(n_edges) < 0.05)
+    x0 = 400000.0 + i * 100.0 + jx[i, j] + noise()
+    y0 = 500000.0 + j * 100.0 + jy[i, j] + noise()
+    x1 = 400000.0 + i1 * 100.0 + jx[i1, j1] + noise()
+    y1 = 500000.0 + j1 * 100.0 + jy[i1, j1] + noise()
+    length = np.hypot(x1 - x0, y1 - y0) * rng.uniform(1.0, 1.3, n_edges)
+    road_class = np.array(list(speed_dict), dtype=object)[rng.integers(0, len(speed_dict), n_edges)]
+    direction = np.array(["both", "ftl", "ltf"], dtype=object)[rng.choice(3, n_edges, p=[0.8, 0.1, 0.1])]
+    return x0, y0, x1, y1, np.arange(n_edges), length, road_class, direction
+
+# łączenie węzłów: round_coords (Graph) vs NodeMerger z różnymi tolerancjami
+def bench_merge(path=TORUN_ZIP, synthetic_edges=10_000_000):
+    import numpy as np
+    import graph_builder
+
+    shp = source_shp(path)
+    t0 = time.time()
+    g = graph_builder.load_graph(shp, "shp")
+    t1 = time.time()
+    print(f"round_coords: {g.node_count} nodes, {t1 - t0:.3f} s")
+    for tolerance in (0.0, 0.5, 1.0, 3.0):
+        merger = graph_builder.NodeMerger(tolerance)
+        t0 = time.time()
+        g = graph_builder.load_graph(shp, "shp", merger)
+        t1 = time.time()
+        print(f"tolerance {tolerance} m: {g.node_count} nodes, {merger.clusters} clusters merged "
+              f"({merger.merged_points} points), max displacement {merger.max_displacement:.3f} m, {t1 - t0:.3f} s")
+
+    # paczki po 1M krawędzi (jak z ShapefileReader.batches)
+    x0, y0, x1, y1 = synthetic_rows(int(synthetic_edges))[:4]
+    merger = graph_builder.NodeMerger(1.0)
+    t0 = time.time()
+    for start in range(0, len(x0), 1_000_000):
+        stop = start + 1_000_000
+        merger.add(np.column_stack((x0[start:stop], x1[start:stop])).ravel(),
+                   np.column_stack((y0[start:stop], y1[start:stop])).ravel())
+    node_x, _, _ = merger.finish()
+    t1 = time.time()
+    print(f"\nsynthetic {synthetic_edges} edges, tolerance 1 m: {len(node_x)} nodes, {merger.clusters} clusters "
+          f"merged, max displacement {merger.max_displacement:.3f} m, {t1 - t0:.2f} s")
+
+# równoległy odczyt w build_parallel: plik Torunia powtórzony copies razy (jak pliki powiatowe BDOT10k),
+# 1..liczba rdzeni procesów; łączenie round_coords i tablice CSR są sekwencyjne - ich czas ogranicza przyspieszenie
+def bench_parallel(path=TORUN_ZIP, copies=32, chunk=50_000):
+    import graph_builder
+
+    shp = source_shp(path)
+    paths = [shp] * int(copies)
+    cores = os.cpu_count() or 1
+    serial = None
+    for workers in sorted({1, 2, 4, cores}):
+        t0 = time.time()
+        g = graph_builder.build_parallel(paths, workers, int(chunk))
+        t1 = time.time()
+        serial = serial or t1 - t0
+        print(f"{workers} workers ({cores} cores): {t1 - t0:.2f} s, speedup {serial / (t1 - t0):.2f}x, "
+              f"{g.edge_count} arcs")
+
+    # część równoległa - odczyt części (w jednym procesie)
+    t0 = time.time()
+    graph_builder._read_part((shp, 0, None, 0))
+    read = (time.time() - t0) * int(copies)
+    print(f"reading: {read:.2f} s of {serial:.2f} s with 1 worker, sequential merge + CSR: {serial - read:.2f} s, "
+          f"speedup limit {serial / max(serial - read, 1e-9):.2f}x")
+
+# zmiana 100 dróg: graph_update.update_graph_file vs budowa od nowa (graph_builder + indeks przestrzenny + zapis)
+def bench_update(path=TORUN_ZIP, edits=100):
+    import random
+    import shutil
+    import tempfile
+    import numpy as np
+    import graph_builder
+    from graph_file import load_graph, save_graph
+    from graph_update import apply_edits, update_graph_file
+    from shp_reader import read_road_rows
+    from spatial_index import SpatialIndex
+
+    shp = source_shp(path)
+    rows = list(read_road_rows(shp))
+    tmp = tempfile.mkdtemp()
+    pfg = os.path.join(tmp, "PF_graph.pfg")
+    g = graph_builder.load_graph(shp, "shp")
+    save_graph(pfg, g, *SpatialIndex.build(g).sections())
+
+    # edycja: usunięcie 40%, zmiana kierunku i klasy 30%, nowe drogi (przesunięte kopie) 30%
+    rng = random.Random(0)
+    edits = int(edits)
+    picked = rng.sample(rows, edits)
+    removed = [row[0] for row in picked[:edits * 4 // 10]]
+    modified = [(row[0], row[1], row[2], row[3], "droga lokalna", "ftl") for row in picked[edits * 4 // 10:edits * 7 // 10]]
+    next_id = max(row[0] for row in rows) + 1
+    added = [(next_id + i, (row[1][0] + 3.3, row[1][1] + 2.7), (row[2][0] + 3.3, row[2][1] + 2.7), row[3], row[4], row[5])
+             for i, row in enumerate(picked[edits * 7 // 10:])]
+
+    size = os.path.getsize(pfg)
+    t0 = time.time()
+    update_graph_file(pfg, added, removed, modified)
+    t1 = time.time()
+    updated = load_graph(pfg)
+    t2 = time.time()
+    print(f"update_graph_file ({edits} edits): {(t1 - t0) * 1000:.1f} ms, "
+          f"file +{(os.path.getsize(pfg) - size) / 2**10:.1f} KB; load with changes: {(t2 - t1) * 1000:.1f} ms ({updated.node_count} nodes, {updated.edge_count} arcs)")
+
+    # budowa od nowa z wierszy po edycji
+    changed = {row[0]: row for row in modified}
+    gone = set(removed)
+    new_rows = [changed.get(row[0], row) for row in rows if row[0] not in gone] + added
+    t0 = time.time()
+    columns = list(zip(*new_rows))
+    first, last = np.array(columns[1]), np.array(columns[2])
+    rebuilt = graph_builder.build_graph(first[:, 0], first[:, 1], last[:, 0], last[:, 1], columns[0], columns[3],
+                                        columns[4], columns[5])
+    save_graph(os.path.join(tmp, "rebuilt.pfg"), rebuilt, *SpatialIndex.build(rebuilt).sections())
+    t1 = time.time()
+    print(f"full rebuild from rows: {(t1 - t0) * 1000:.1f} ms")
+
+    t0 = time.time()
+    apply_edits(updated, [], [added[0][0]], [])
+    print(f"apply_edits in memory (1 edit): {(time.time() - t0) * 1000:.1f} ms")
+
+    # kolejne zmiany: sekcje zmian w miejscu poprzednich, plik rośnie tylko o nowe zmiany
+    size = os.path.getsize(pfg)
+    t0 = time.time()
+    for i in range(10):
+        batch = rng.sample(rows, edits)
+        update_graph_file(pfg, modified=[(row[0], row[1], row[2], row[3], "droga dojazdowa", row[5]) for row in batch])
+    print(f"10 more updates: {(time.time() - t0) * 100:.1f} ms per update, "
+          f"file +{(os.path.getsize(pfg) - size) / 2**10:.1f} KB")
+    shutil.rmtree(tmp, ignore_errors=True)
+
+# serwer tras (routing_server): zapytania z generatora obciążenia vs wczytanie grafu przy każdym zapytaniu
+def bench_server(path=TORUN_ZIP, requests=500, concurrency=8, workers=None):
+    import asyncio
+    import json
+    import random
+    import shutil
+    import subprocess
+    import graph_builder
+    from graph_file import save_graph
+    from routing_server import load_test
+    from spatial_index import SpatialIndex
+
+    tmp = tempfile.mkdtemp()
+    pfg = os.path.join(tmp, "PF_graph.pfg")
+    g = graph_builder.load_graph(source_shp(path), "shp")
+    save_graph(pfg, g, *SpatialIndex.build(g).sections())
+
+    # zapytania "na zimno" (jak wywołanie narzędzia): nowy proces, import modułów, wczytanie grafu, snap, A*
+    rng = random.Random(0)
+    pairs = [(g.coords(rng.randrange(g.node_count)), g.coords(rng.randrange(g.node_count))) for _ in range(5)]
+    here = os.path.dirname(os.path.abspath(__file__))
+    t0 = time.time()
+    for a, b in pairs:
+        subprocess.run([sys.executable, "-c", "import json, sys; sys.path.insert(0, sys.argv[1]); "
+                        "from graph_file import load_graph; from toolbox_core import h_time; "
+                        "g = load_graph(sys.argv[2]); (s, e), _, _, v = g.snap_split(json.loads(sys.argv[3]), json.loads(sys.argv[4])); "
+                        "g.aShift8('time', h_time, s, e, virtual=v)", here, pfg, json.dumps(a), json.dumps(b)], check=True)
+    print(f"cold request (new process + load graph + snap + A*): {(time.time() - t0) * 1000 / len(pairs):.1f} ms")
+
+    sock = os.path.join(tmp, "pf.sock")
+    command = [sys.executable, os.path.join(here, "routing_server.py"), "serve",
+               pfg, "--unix", sock, "--prepare", "alt,ch"]
+    if workers is not None:
+        command += ["--workers", str(workers)]
+    server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    try:
+        for line in server.stdout:
+            if line.startswith("Routing server"):
+                break
+        for kind, method in (("route", "astar"), ("route", "bidirectional"), ("route", "alt"), ("route", "ch"),
+                             ("matrix", "ch"), ("reach", None)):
+            params = {"method": method} if method else {}
+            result = asyncio.run(load_test(pfg, kind, int(requests), int(concurrency), unix=sock, **params))
+            print(f"{kind:6} {method or '':13} {result['per_second']:7.1f} req/s, mean {result['mean_ms']:.1f} ms, "
+                  f"p50 {result['p50_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms, "
+                  f"errors {result['errors']}")
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+# route_batch: przepustowość dla 1..liczba rdzeni procesów (losowe pary węzłów, graf z pliku .pfg przez mmap)
+def bench_batch(path=TORUN_ZIP, queries=2000, method="astar"):
+    import random
+    import shutil
+    import graph_builder
+    from batch_routing import route_batch
+    from graph_file import save_graph
+    from routing_server import prepare_graph_file
+    from spatial_index import SpatialIndex
+
+    tmp = tempfile.mkdtemp()
+    pfg = os.path.join(tmp, "PF_graph.pfg")
+    g = graph_builder.load_graph(source_shp(path), "shp")
+    save_graph(pfg, g, *SpatialIndex.build(g).sections())
+    rng = random.Random(0)
+    pairs = [(g.coords(rng.randrange(g.node_count)), g.coords(rng.randrange(g.node_count))) for _ in range(int(queries))]
+    prepare_graph_file(pfg, [method], ["time"])
+
+    cores = os.cpu_count() or 1
+    serial = None
+    for workers in [0] + sorted({1, 2, 4, cores}):
+        t0 = time.time()
+        for _ in route_batch(pairs, "time", workers, pfg, method):
+            pass
+        t1 = time.time()
+        serial = serial or t1 - t0
+        print(f"{workers} workers ({cores} cores): {len(pairs) / (t1 - t0):.1f} routes/s, "
+              f"speedup {serial / (t1 - t0):.2f}x")
+    shutil.rmtree(tmp, ignore_errors=True)
+
+# wiele krótkich zapytań (100 - 800 m): przestrzeń robocza wątku używana ponownie vs nowa dla każdego zapytania
+def bench_context(path=TORUN_ZIP, queries=5000):
+    import random
+    import numpy as np
+    import graph_builder
+    from search_context import SearchContext
+    from toolbox_core import h_time
+
+    g = graph_builder.load_graph(source_shp(path), "shp")
+    rng = random.Random(0)
+    pairs = []
+    while len(pairs) < int(queries):
+        a = rng.randrange(g.node_count)
+        d = np.hypot(g.x - g.x[a], g.y - g.y[a])
+        near = np.flatnonzero((d > 100) & (d < 800))
+        if len(near):
+            pairs.append((g.coords(a), g.coords(int(near[rng.randrange(len(near))]))))
+
+    print(f"{len(pairs)} queries, {g.node_count} nodes, "
+          f"workspace {g.search_context().nbytes / 2**20:.2f} MB per thread")
+    for name, context, queue in (("shared workspace", lambda: None, "lazy"),
+                                 ("new workspace per query", lambda: SearchContext(g.node_count), "lazy"),
+                                 ("shared workspace, quaternary queue", lambda: None, "quaternary")):
+        t0 = time.perf_counter()
+        for a, b in pairs:
+            g.aShift8("time", h_time, a, b, queue, context=context())
+        t1 = time.perf_counter()
+        print(f"{name:<36}{(t1 - t0) / len(pairs) * 1e6:>10.1f} us/query")
+
+# pamięć tras: ruch z powtarzającymi się parami (popular - udział zapytań o pary z puli hot_pairs)
+def bench_cache(path=TORUN_ZIP, queries=5000, hot_pairs=100, popular=0.8, max_mb=1):
+    import random
+    import graph_builder
+    from route_cache import RouteCache
+    from toolbox_core import h_time
+
+    g = graph_builder.load_graph(source_shp(path), "shp")
+    rng = random.Random(0)
+    node = lambda: g.coords(rng.randrange(g.node_count))
+    hot = [(node(), node()) for _ in range(int(hot_pairs))]
+    pairs = [rng.choice(hot) if rng.random() < float(popular) else (node(), node()) for _ in range(int(queries))]
+
+    t0 = time.perf_counter()
+    for a, b in pairs:
+        g.aShift8("time", h_time, a, b)
+    t1 = time.perf_counter()
+    print(f"{len(pairs)} queries, {int(hot_pairs)} popular pairs ({float(popular):.0%} of traffic)")
+    print(f"without cache: {(t1 - t0) / len(pairs) * 1000:.3f} ms/query")
+
+    cache = RouteCache(int(float(max_mb) * 2**20))
+    t0 = time.perf_counter()
+    for a, b in pairs:
+        if cache.get(a, b, "time") is None:
+            result = g.aShift8("time", h_time, a, b)
+            if result is not None:
+                cache.put(a, b, "time", result[0], result[1], result[2])
+    t1 = time.perf_counter()
+    stats = cache.stats()
+    print(f"with cache ({float(max_mb)} MB): {(t1 - t0) / len(pairs) * 1000:.3f} ms/query, hit rate {stats['hit_rate']:.1%}, "
+          f"{stats['entries']} routes in {stats['nbytes'] / 2**10:.0f} kB, {stats['evictions']} evictions")
+
+# profile kosztów: przeliczenie tablic, A* na profilu vs na "time" i heurystyka z prędkością profilu vs h_time (140 km/h)
+def bench_profiles(path=TORUN_ZIP, queries=300):
+    import random
+    import graph_builder
+    from cost_profiles import PROFILES, add_profile
+    from toolbox_core import h_time
+
+    g = graph_builder.load_graph(source_shp(path), "shp")
+    t0 = time.perf_counter()
+    for name, definition in PROFILES.items():
+        add_profile(g, name, definition.get("speeds"), definition.get("overrides"))
+    t1 = time.perf_counter()
+    print(f"{len(PROFILES)} profiles compiled for {g.edge_count} arcs: {(t1 - t0) * 1000:.1f} ms")
+
+    rng = random.Random(0)
+    pairs = [(g.coords(rng.randrange(g.node_count)), g.coords(rng.randrange(g.node_count))) for _ in range(int(queries))]
+    print(f"{'cost':<12}{'heuristic':<22}{'ms/query':>10}{'mean S':>10}")
+    runs = [("time", "h_time (140 km/h)", h_time)]
+    for name, p in g.profiles.items():
+        runs += [(name, f"profile ({p.max_speed:.0f} km/h)", p.h), (name, "h_time (140 km/h)", h_time)]
+    for cost, label, h in runs:
+        t0 = time.perf_counter()
+        results = [g.aShift8(cost, h, a, b) for a, b in pairs]
+        t1 = time.perf_counter()
+        found = [r for r in results if r is not None]
+        print(f"{cost:<12}{label:<22}{(t1 - t0) / len(pairs) * 1000:>10.2f}{sum(r[3] for r in found) / len(found):>10.0f}")
+
+# trasy zależne od pory dnia: A* zależny od czasu (odjazd w nocy i w szczycie) vs statyczny A* na "time"
+def bench_td(path=TORUN_ZIP, queries=300):
+    import random
+    import numpy as np
+    import graph_builder
+    from time_dependent import TimeDependentModel, td_aShift8
+    from toolbox_core import h_time
+
+    g = graph_builder.load_graph(source_shp(path), "shp")
+    t0 = time.perf_counter()
+    model = TimeDependentModel.build(g)
+    t1 = time.perf_counter()
+    print(f"model: {model.factors.shape[0]} functions x {model.width} samples, {model.nbytes / 2**10:.0f} kB, "
+          f"built and FIFO-checked in {(t1 - t0) * 1000:.1f} ms, FIFO violations: {len(model.fifo_violations(g))}")
+    flat = TimeDependentModel(np.ones((1, model.width)), np.zeros(g.edge_count, dtype=np.uint16), model.step)
+
+    rng = random.Random(0)
+    pairs = [(g.coords(rng.randrange(g.node_count)), g.coords(rng.randrange(g.node_count))) for _ in range(int(queries))]
+    t0 = time.perf_counter()
+    static = [g.aShift8("time", h_time, a, b) for a, b in pairs]
+    base = (time.perf_counter() - t0) / len(pairs)
+    print(f"{'search':<28}{'ms/query':>10}{'x static':>10}{'mean S':>10}{'mean time [s]':>15}")
+    print(f"{'static A*':<28}{base * 1000:>10.2f}{1:>10.2f}"
+          f"{np.mean([r[3] for r in static if r]):>10.0f}{np.mean([r[2] for r in static if r]):>15.1f}")
+    for label, m, departure in (("TD A*, constant factors", flat, 0), ("TD A*, departure 03:00", model, "03:00"),
+                                ("TD A*, departure 07:45", model, "07:45"), ("TD A*, departure 16:30", model, "16:30")):
+        t0 = time.perf_counter()
+        results = [td_aShift8(g, m, a, b, departure) for a, b in pairs]
+        t = (time.perf_counter() - t0) / len(pairs)
+        print(f"{label:<28}{t * 1000:>10.2f}{t / base:>10.2f}"
+              f"{np.mean([r[3] for r in results if r]):>10.0f}{np.mean([r[2] for r in results if r]):>15.1f}")
+
+# skręty: graf krawędziowy (pamięć, czas budowy) i A* z kosztami skrętów vs A* na grafie węzłowym
+def bench_turns(path=TORUN_ZIP, queries=300):
+    import random
+    import numpy as np
+    import graph_builder
+    from turns import TurnGraph
+    from toolbox_core import h_time
+
+    g = graph_builder.load_graph(source_shp(path), "shp")
+    t0 = time.perf_counter()
+    tg = TurnGraph.build(g)
+    t1 = time.perf_counter()
+    print(f"node graph: {g.node_count} nodes, {g.edge_count} arcs, {g.nbytes() / 2**20:.2f} MB")
+    print(f"turn graph: {tg.line.node_count} nodes, {tg.line.edge_count} arcs, {tg.nbytes() / 2**20:.2f} MB "
+          f"({tg.nbytes() / g.nbytes():.1f}x), built in {(t1 - t0) * 1000:.1f} ms, "
+          f"{np.count_nonzero(np.isinf(tg.turn_cost))} forbidden and {np.count_nonzero(tg.turn_cost > 0)} penalized turns")
+
+    rng = random.Random(0)
+    pairs = [(g.coords(rng.randrange(g.node_count)), g.coords(rng.randrange(g.node_count))) for _ in range(int(queries))]
+    print(f"{'search':<28}{'ms/query':>10}{'x node':>10}{'mean S':>10}{'mean time [s]':>15}")
+    base = None
+    for label, run in (("node-based A*", lambda a, b: g.aShift8("time", h_time, a, b)),
+                       ("edge-based A*", lambda a, b: tg.aShift8("time", h_time, a, b)),
+                       ("edge-based bidirectional", lambda a, b: tg.aShift8_bidirectional("time", h_time, a, b))):
+        t0 = time.perf_counter()
+        results = [run(a, b) for a, b in pairs]
+        t = (time.perf_counter() - t0) / len(pairs)
+        base = base or t
+        found = [r for r in results if r is not None]
+        print(f"{label:<28}{t * 1000:>10.2f}{t / base:>10.2f}{np.mean([r[3] for r in found]):>10.0f}"
+              f"{np.mean([r[2] for r in found]):>15.1f}")
+
+# pełna geometria dróg: rozmiar bufora (float32 / float64), koszt odczytu przy budowie grafu i składanie linii tras
+def bench_geometry(path=TORUN_ZIP, queries=300):
+    import random
+    import numpy as np
+    import graph_builder
+    from toolbox_core import h_time
+
+    shp = source_shp(path)
+    graphs = {}
+    for encoding in (None, "float32", "float64"):
+        t0 = time.perf_counter()
+        graphs[encoding] = graph_builder.load_graph(shp, "shp", geometry=encoding)
+        t1 = time.perf_counter()
+        geometry = graphs[encoding].geometry
+        size = f"{geometry.nbytes() / 2**20:.2f} MB ({len(geometry.coords)} vertices)" if geometry else "-"
+        print(f"geometry {str(encoding):<8} build {(t1 - t0) * 1000:>7.1f} ms, buffer {size}")
+
+    g = graphs["float32"]
+    exact = graphs["float64"].geometry
+    rng = random.Random(0)
+    pairs = [(g.coords(rng.randrange(g.node_count)), g.coords(rng.randrange(g.node_count))) for _ in range(int(queries))]
+    routes = [r for r in (g.aShift8("time", h_time, a, b) for a, b in pairs) if r is not None]
+    t0 = time.perf_counter()
+    lines = [g.route_geometry(r[0], r[1]) for r in routes]
+    t1 = time.perf_counter()
+    error = max(float(np.abs(line - exact.polyline(r[1], r[0])).max()) for line, r in zip(lines, routes))
+    print(f"{len(routes)} routes, {np.mean([len(r[1]) for r in routes]):.0f} edges and "
+          f"{np.mean([len(line) for line in lines]):.0f} vertices on average: "
+          f"{(t1 - t0) / len(routes) * 1e6:.0f} us/route, max float32 error {error * 1000:.2f} mm")
+
+# zapis tras bez arcpy (writers): trasy na sekundę i rozmiar pliku dla każdego formatu, GeoPackage także
+# z zatwierdzaniem każdego wiersza osobno (bez jednej transakcji) dla porównania
+def bench_writers(path=TORUN_ZIP, queries=2000):
+    import random
+    import shutil
+    import sqlite3
+    import graph_builder
+    from toolbox_core import h_time
+    from writers import GeoPackageWriter, open_writer
+
+    g = graph_builder.load_graph(source_shp(path), "shp")
+    rng = random.Random(0)
+    pairs = [(g.coords(rng.randrange(g.node_count)), g.coords(rng.randrange(g.node_count))) for _ in range(int(queries))]
+    routes = [r for r in (g.aShift8("time", h_time, a, b) for a, b in pairs) if r is not None]
+    t0 = time.perf_counter()
+    features = [(g.route_geometry(r[0], r[1]), {"pair": i, "cost": r[2], "edges": len(r[1])})
+                for i, r in enumerate(routes)]
+    t1 = time.perf_counter()
+    print(f"{len(routes)} routes, {sum(len(xy) for xy, _ in features)} vertices, "
+          f"route_geometry {len(routes) / (t1 - t0):.0f} routes/s")
+
+    tmp = tempfile.mkdtemp()
+    for ext in (".gpkg", ".geojson", ".ndjson", ".csv"):
+        out = os.path.join(tmp, "routes" + ext)
+        t0 = time.perf_counter()
+        with open_writer(out, "LineString", "routes") as writer:
+            writer.write_many(features)
+        t1 = time.perf_counter()
+        print(f"{ext:<8} {len(features) / (t1 - t0):>9.0f} routes/s, {os.path.getsize(out) / 2**20:.2f} MB")
+
+    # każdy wiersz w osobnej transakcji
+    out = os.path.join(tmp, "commit_per_row.gpkg")
+    n = min(len(features), 200)
+    t0 = time.perf_counter()
+    with GeoPackageWriter(out, "LineString", "routes", batch=1) as writer:
+        for xy, properties in features[:n]:
+            writer.write(xy, properties)
+            writer.db.execute("COMMIT")
+            writer.db.execute("BEGIN")
+    t1 = time.perf_counter()
+    print(f"{'.gpkg':<8} {n / (t1 - t0):>9.0f} routes/s with a commit per route ({n} routes)")
+    with sqlite3.connect(os.path.join(tmp, "routes.gpkg")) as db:
+        print(f"GeoPackage check: {db.execute('PRAGMA integrity_check').fetchone()[0]}, "
+              f"{db.execute('SELECT count(*) FROM routes').fetchone()[0]} rows")
+    shutil.rmtree(tmp, ignore_errors=True)
+
+BENCHMARKS = {
+    "csr": bench_csr,
+    "loader": bench_loader,
+    "graph_file": bench_graph_file,
+    "bidirectional": bench_bidirectional,
+    "ch": bench_ch,
+    "alt": bench_alt,
+    "queue": bench_queue,
+    "snap": bench_snap,
+    "split": bench_split,
+    "matrix": bench_matrix,
+    "reach": bench_reach,
+    "isochrone": bench_isochrone,
+    "builder": bench_builder,
+    "merge": bench_merge,
+    "parallel": bench_parallel,
+    "update": bench_update,
+    "server": bench_server,
+    "batch": bench_batch,
+    "context": bench_context,
+    "cache": bench_cache,
+    "profiles": bench_profiles,
+    "td": bench_td,
+    "turns": bench_turns,
+    "geometry": bench_geometry,
+    "writers": bench_writers,
+}
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print("usage: python benchmark.py {" + ", ".join(BENCHMARKS) + "} [args]")
+        sys.exit(1)
+    BENCHMARKS[sys.argv[1]](*sys.argv[2:])
@@ -1,5 +1,6 @@
+from heapdict import heapdict
 from ToolboxScript_Improved_v3 import *
-import ToolboxScript_Improved_v3 as tb
+import toolbox_core as tb
 
 class NewGraph(Graph):
     def dijkstra(self, cost, start, end):
@@ -0,0 +1,387 @@
+# Authors:  PAGistyczna Drużyna Cybergeodetów
+# Created:  2026-10-18
+#
+# Contraction Hierarchies (Geisberger i in., 2008) dla grafu CSR - osobno dla metryki "length" i "time".
+# Preprocessing: węzły są kolejno "zwijane" (kolejność wg różnicy krawędzi), a gdy najkrótsza ścieżka
+# u -> v -> x nie ma objazdu (witness), dodawany jest skrót u -> x. Zapytanie to dwukierunkowa
+# Dijkstra tylko po krawędziach prowadzących do węzłów wyższego rzędu.
+#
+# Krawędzie hierarchii (ch_*): oryginalne (ch_edge_id = ID krawędzi z pliku źródłowego) albo skróty
+# (ch_child1, ch_child2 = dwie krawędzie hierarchii, z których skrót powstał).
+
+import heapq
+import math
+import os
+import time
+import numpy as np
+
+class ContractionHierarchy:
+    def __init__(self, graph, metric, sections):
+        self.graph = graph
+        self.metric = metric
+        for name, array in sections.items():
+            setattr(self, name, array)
+
+        # memoryview - szybki odczyt w pętli zapytania
+        self._mv = {name: memoryview(np.ascontiguousarray(array)) for name, array in sections.items()}
+
+    # budowa hierarchii
+    #   settle_limit - maksymalna liczba węzłów odwiedzonych w jednym wyszukiwaniu objazdu (witness search);
+    #                  mniejsza wartość = szybszy preprocessing kosztem większej liczby skrótów
+    @classmethod
+    def build(cls, graph, metric, settle_limit=100):
+        n = graph.node_count
+        cost = getattr(graph, metric)
+
+        # krawędzie hierarchii
+        ch_src, ch_dst, ch_w, ch_edge_id, ch_child1, ch_child2 = [], [], [], [], [], []
+
+        # bieżący (jeszcze niezwinięty) graf: out[u][v] = (koszt, krawędź hierarchii), inn[v][u] - to samo
+        out = [dict() for _ in range(n)]
+        inn = [dict() for _ in range(n)]
+        targets = graph.targets.tolist()
+        edge_ids = graph.edge_ids.tolist()
+        weights = cost.tolist()
+        offsets = graph.offsets.tolist()
+        for u in range(n):
+            for k in range(offsets[u], offsets[u + 1]):
+                v = targets[k]
+                if u == v or (v in out[u] and out[u][v][0] <= weights[k]):
+                    continue                                # pętle i gorsze krawędzie równoległe są zbędne
+                e = len(ch_src)
+                ch_src.append(u)
+                ch_dst.append(v)
+                ch_w.append(weights[k])
+                ch_edge_id.append(edge_ids[k])
+                ch_child1.append(-1)
+                ch_child2.append(-1)
+                out[u][v] = weights[k], e
+                inn[v][u] = weights[k], e
+
+        # wyszukiwanie objazdu z u omijającego v, do kosztu max_cost
+        def witness(u, v, max_cost):
+            dist = {u: 0.0}
+            heap = [(0.0, u)]
+            settled = 0
+            while heap and settled < settle_limit:
+                d, a = heapq.heappop(heap)
+                if d > dist[a]:
+                    continue
+                if d > max_cost:
+                    break
+                settled += 1
+                for b, (w, _) in out[a].items():
+                    if b == v:
+                        continue
+                    nd = d + w
+                    if nd < dist.get(b, math.inf):
+                        dist[b] = nd
+                        heapq.heappush(heap, (nd, b))
+            return dist
+
+        # skróty potrzebne przy zwinięciu v: (u, x, koszt, krawędź u -> v, krawędź v -> x)
+        def shortcuts(v):
+            result = []
+            if not out[v]:
+                return result
+            max_out = max(w for w, _ in out[v].values())
+            for u, (wu, eu) in inn[v].items():
+                dist = witness(u, v, wu + max_out)
+                for x, (wx, ex) in out[v].items():
+                    if x != u and dist.get(x, math.inf) > wu + wx:
+                        result.append((u, x, wu + wx, eu, ex))
+            return result
+
+        deleted_neighbours = [0] * n
+
+        def priority(v):
+            return len(shortcuts(v)) - len(inn[v]) - len(out[v]) + deleted_neighbours[v]
+
+        heap = [(priority(v), v) for v in range(n)]
+        heapq.heapify(heap)
+        rank = [0] * n
+        up = [None] * n                                     # krawędzie v -> wyższy rząd
+        down = [None] * n                                   # krawędzie wyższy rząd -> v
+        level = 0
+
+        while heap:
+            _, v = heapq.heappop(heap)
+            # leniwa aktualizacja priorytetu
+            p = priority(v)
+            if heap and p > heap[0][0]:
+                heapq.heappush(heap, (p, v))
+                continue
+
+            for u, x, w, eu, ex in shortcuts(v):
+                if x in out[u] and out[u][x][0] <= w:
+                    continue
+                e = len(ch_src)
+                ch_src.append(u)
+                ch_dst.append(x)
+                ch_w.append(w)
+                ch_edge_id.append(-1)
+                ch_child1.append(eu)
+                ch_child2.append(ex)
+                out[u][x] = w, e
+                inn[x][u] = w, e
+
+            # pozostałe krawędzie v prowadzą do węzłów wyższego rzędu
+            up[v] = [e for _, e in out[v].values()]
+            down[v] = [e for _, e in inn[v].values()]
+            for u in inn[v]:
+                del out[u][v]
+                deleted_neighbours[u] += 1
+            for x in out[v]:
+                del inn[x][v]
+                deleted_neighbours[x] += 1
+            out[v] = {}
+            inn[v] = {}
+            rank[v] = level
+            level += 1
+
+        def to_csr(lists):
+            offsets = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum([len(l) for l in lists], out=offsets[1:])
+            return offsets, np.array([e for l in lists for e in l], dtype=np.int32)
+
+        up_offsets, up_edges = to_csr(up)
+        down_offsets, down_edges = to_csr(down)
+        sections = {
+            "rank": np.array(rank, dtype=np.int32),
+            "ch_src": np.array(ch_src, dtype=np.int32),
+            "ch_dst": np.array(ch_dst, dtype=np.int32),
+            "ch_w": np.array(ch_w, dtype=np.float64),
+            "ch_edge_id": np.array(ch_edge_id, dtype=np.int32),
+            "ch_child1": np.array(ch_child1, dtype=np.int32),
+            "ch_child2": np.array(ch_child2, dtype=np.int32),
+            "up_offsets": up_offsets,
+            "up_edges": up_edges,
+            "down_offsets": down_offsets,
+            "down_edges": down_edges,
+        }
+        return cls(graph, metric, sections)
+
+    @property
+    def shortcut_count(self):
+        return int(np.count_nonzero(self.ch_edge_id < 0))
+
+    # zapytanie - wynik jak w aShift8: (węzły ścieżki, krawędzie ścieżki, koszt, ilość węzłów w S)
+    #   virtual - węzły wirtualne (virtual_nodes.VirtualNodes); przeszukiwanie zaczyna się wtedy od końców
+    #             podzielonej krawędzi z kosztem części krawędzi
+    def query(self, start, end, virtual=None):
+        mv = self._mv
+        ch_src, ch_dst, ch_w = mv["ch_src"], mv["ch_dst"], mv["ch_w"]
+        graph = virtual if virtual else self.graph
+        s = graph.node_id(start)
+        t = graph.node_id(end)
+        if s == t:
+            return [graph.coords(s)], [], 0, 1
+
+        # [0] - w górę od start po krawędziach up, [1] - w górę od end po krawędziach down (odwrotnie)
+        neighbours = ((mv["up_offsets"], mv["up_edges"], ch_dst), (mv["down_offsets"], mv["down_edges"], ch_src))
+        dist = ({}, {})
+        parent = ({}, {})                                   # krawędź hierarchii, którą dotarto do węzła
+        first = ({}, {})                                    # dla węzłów początkowych: część krawędzi grafu od węzła wirtualnego
+        heaps = ([], [])
+        for d, v in ((0, s), (1, t)):
+            for u, k, cost in self._entry(v, d, virtual):
+                if cost < dist[d].get(u, math.inf):
+                    dist[d][u] = cost
+                    parent[d][u] = None
+                    first[d][u] = k
+                    heapq.heappush(heaps[d], (cost, u))
+        settled = [0, 0]
+        mu = math.inf
+        meet = None
+
+        # start i end na tej samej krawędzi - bezpośrednia krawędź między węzłami wirtualnymi
+        direct = None
+        if virtual:
+            w = self.graph.views()[self.metric]
+            for v, k, f in virtual.out.get(s, ()):
+                if v == t and f * w[k] < mu:
+                    mu, direct = f * w[k], k
+
+        while heaps[0] or heaps[1]:
+            # kierunek z mniejszym kluczem; kierunek kończy się, gdy jego klucz >= mu
+            d = 0 if heaps[0] and (not heaps[1] or heaps[0][0][0] <= heaps[1][0][0]) else 1
+            key, v = heapq.heappop(heaps[d])
+            if key >= mu:
+                heaps[d].clear()
+                continue
+            if key > dist[d][v]:
+                continue
+            settled[d] += 1
+            if v in dist[1 - d] and key + dist[1 - d][v] < mu:
+                mu = key + dist[1 - d][v]
+                meet = v
+
+            offsets, edges, other_end = neighbours[d]
+            for i in range(offsets[v], offsets[v + 1]):
+                e = edges[i]
+                u = other_end[e]
+                nd = key + ch_w[e]
+                if nd < dist[d].get(u, math.inf):
+                    dist[d][u] = nd
+                    parent[d][u] = e
+                    heapq.heappush(heaps[d], (nd, u))
+
+        edge_ids_graph = self.graph.views()["edge_ids"]
+        if meet is None:
+            if direct is None:
+                return None
+            return [graph.coords(s), graph.coords(t)], [edge_ids_graph[direct]], mu, settled[0] + settled[1]
+
+        # krawędzie hierarchii start -> meet -> end
+        path = []
+        v = meet
+        while parent[0][v] is not None:
+            path.append(parent[0][v])
+            v = ch_src[parent[0][v]]
+        path.reverse()
+        head = first[0][v]
+        v = meet
+        while parent[1][v] is not None:
+            path.append(parent[1][v])
+            v = ch_dst[parent[1][v]]
+        tail = first[1][v]
+
+        node_path, edge_ids = self.unpack(path)
+        if not path:
+            node_path = [self.graph.coords(meet)]
+        # części krawędzi od / do węzłów wirtualnych
+        if head is not None:
+            node_path.insert(0, graph.coords(s))
+            edge_ids.insert(0, edge_ids_graph[head])
+        if tail is not None:
+            node_path.append(graph.coords(t))
+            edge_ids.append(edge_ids_graph[tail])
+        return node_path, edge_ids, mu, settled[0] + settled[1]
+
+    # koszty wiele-do-wielu (Knopp i in., 2007): przeszukiwania w górę od celów zapisują w "kubełkach" odwiedzonych
+    # węzłów pary (cel, koszt), a przeszukiwania w górę od źródeł sprawdzają kubełki - bez zapytania dla każdej pary.
+    # sources, targets - id węzłów (także wirtualnych); wynik: tablica NumPy len(sources) x len(targets)
+    def many_to_many(self, sources, targets, virtual=None):
+        buckets = {}
+        for j, t in enumerate(targets):
+            for v, d in self._upward(t, 1, virtual).items():
+                buckets.setdefault(v, []).append((j, d))
+
+        w = self.graph.views()[self.metric]
+        column = {}                                         # węzeł -> kolumny celów w tym węźle
+        for j, t in enumerate(targets):
+            column.setdefault(t, []).append(j)
+
+        matrix = np.full((len(sources), len(targets)), math.inf)
+        for i, s in enumerate(sources):
+            row = [math.inf] * len(targets)
+            for v, d in self._upward(s, 0, virtual).items():
+                for j, dt in buckets.get(v, ()):
+                    if d + dt < row[j]:
+                        row[j] = d + dt
+            for j in column.get(s, ()):
+                row[j] = 0.0
+            # start i cel na tej samej krawędzi
+            if virtual:
+                for v, k, f in virtual.out.get(s, ()):
+                    for j in column.get(v, ()):
+                        row[j] = min(row[j], f * w[k])
+            matrix[i] = row
+        return matrix
+
+    # pełne przeszukiwanie w górę hierarchii (d = 0 - krawędzie up, d = 1 - down odwrotnie): {węzeł: koszt}
+    def _upward(self, v, d, virtual=None):
+        mv = self._mv
+        if d == 0:
+            offsets, edges, other_end = mv["up_offsets"], mv["up_edges"], mv["ch_dst"]
+        else:
+            offsets, edges, other_end = mv["down_offsets"], mv["down_edges"], mv["ch_src"]
+        ch_w = mv["ch_w"]
+        dist = {}
+        heap = []
+        for u, _, cost in self._entry(v, d, virtual):
+            if cost < dist.get(u, math.inf):
+                dist[u] = cost
+                heapq.heappush(heap, (cost, u))
+
+        while heap:
+            key, u = heapq.heappop(heap)
+            if key > dist[u]:
+                continue
+            for i in range(offsets[u], offsets[u + 1]):
+                e = edges[i]
+                x = other_end[e]
+                nd = key + ch_w[e]
+                if nd < dist.get(x, math.inf):
+                    dist[x] = nd
+                    heapq.heappush(heap, (nd, x))
+        return dist
+
+    # węzły początkowe przeszukiwania w kierunku d: [(węzeł grafu, krawędź grafu lub None, koszt dotarcia)]
+    def _entry(self, v, d, virtual):
+        if v < self.graph.node_count:
+            return [(v, None, 0.0)]
+        w = self.graph.views()[self.metric]
+        arcs = virtual.out[v] if d == 0 else virtual.inn[v]
+        return [(u, k, f * w[k]) for u, k, f in arcs if u < self.graph.node_count]
+
+    # rozwinięcie skrótów do oryginalnych krawędzi: (węzły ścieżki, ID krawędzi)
+    def unpack(self, ch_edges):
+        mv = self._mv
+        child1, child2, ch_edge_id = mv["ch_child1"], mv["ch_child2"], mv["ch_edge_id"]
+        node_path = [self.graph.coords(mv["ch_src"][ch_edges[0]])] if ch_edges else []
+        edge_ids = []
+        stack = list(reversed(ch_edges))
+        while stack:
+            e = stack.pop()
+            if child1[e] < 0:
+                edge_ids.append(ch_edge_id[e])
+                node_path.append(self.graph.coords(mv["ch_dst"][e]))
+            else:
+                stack.append(child2[e])
+                stack.append(child1[e])
+        return node_path, edge_ids
+
+    # zapis obok pliku grafu (sekcje w formacie graph_file), z sumą kontrolną grafu do wykrywania nieaktualności
+    def save(self, path):
+        from graph_file import write_sections
+
+        meta = {"metric": self.metric, "node_count": self.graph.node_count}
+        graph_file = getattr(self.graph, "graph_file", None)
+        if graph_file is not None:
+            meta["graph_checksum"] = graph_file.graph_checksum
+        write_sections(path, {name: getattr(self, name) for name in self._mv}, meta)
+
+    @classmethod
+    def load(cls, path, graph):
+        from graph_file import GraphFile, GraphFileError
+
+        f = GraphFile(path)
+        graph_file = getattr(graph, "graph_file", None)
+        if f.meta["node_count"] != graph.node_count or (
+            graph_file is not None and f.meta.get("graph_checksum", graph_file.graph_checksum) != graph_file.graph_checksum
+        ):
+            raise GraphFileError(f"{path} was built for a different graph")
+        return cls(graph, f.meta["metric"], f.sections)
+
+# plik hierarchii obok pliku grafu: PF_graph.pfg -> PF_graph.ch_time.pfg
+def ch_path(in_graph_file, metric):
+    return os.path.splitext(in_graph_file)[0] + f".ch_{metric}.pfg"
+
+# odczyt hierarchii z pliku obok grafu, a jeśli go nie ma (lub jest nieaktualny) - budowa i zapis
+# report - funkcja wypisująca komunikat o budowie (narzędzie podaje arc_prnt)
+def load_or_build(graph, metric, in_graph_file=None, report=print):
+    from graph_file import GraphFileError
+
+    if in_graph_file is not None and os.path.exists(ch_path(in_graph_file, metric)):
+        try:
+            return ContractionHierarchy.load(ch_path(in_graph_file, metric), graph)
+        except GraphFileError:
+            pass
+
+    t0 = time.time()
+    ch = ContractionHierarchy.build(graph, metric)
+    report(f"Contraction hierarchy ({metric}) built in {time.time() - t0:.1f} s, {ch.shortcut_count} shortcuts")
+    if in_graph_file is not None:
+        ch.save(ch_path(in_graph_file, metric))
+    return ch
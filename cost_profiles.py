@@ -0,0 +1,157 @@
+# Authors:  PAGistyczna Drużyna Cybergeodetów
+# Created:  2026-10-18
+#
+# Profile kosztów - czasy przejazdu dla innych prędkości niż speed_dict (ciężarówki, pojazdy uprzywilejowane, rowery)
+# bez budowy grafu od nowa.
+#   speeds    - prędkość [km/h] dla klasy drogi (klasy nie podane - jak w speed_dict); 0 - droga niedostępna
+#   overrides - prędkość [km/h] dla pojedynczych krawędzi (ID krawędzi -> km/h), np. zakaz wjazdu ciężarówek
+# Profil jest raz przeliczany na tablicę czasów przejazdu krawędzi skierowanych (jak CSRGraph.time), więc algorytmy
+# używają go jak "time": g.aShift8("truck", profil.h, ...), reach(g, źródła, limit, "truck"), ALT i CH dla "truck".
+# Heurystyka profilu (CostProfile.h) dzieli odległość przez największą prędkość w profilu.
+# W pliku .pfg profil to sekcja cost_<nazwa> z definicją w metadanych (po graph_update nieaktualna - przeliczana
+# przy pierwszym użyciu).
+
+import math
+import numpy as np
+
+# profile wbudowane (profile zapisane w pliku grafu mają pierwszeństwo)
+PROFILES = {
+    "truck": {"speeds": {"autostrada": 80, "droga ekspresowa": 80, "droga główna ruchu przyśpieszonego": 60,
+                         "droga główna": 50, "droga zbiorcza": 40, "droga lokalna": 30, "droga dojazdowa": 20,
+                         "droga wewnętrzna": 10}},
+    "emergency": {"speeds": {"autostrada": 160, "droga ekspresowa": 140, "droga główna ruchu przyśpieszonego": 80,
+                             "droga główna": 70, "droga zbiorcza": 60, "droga lokalna": 50, "droga dojazdowa": 40,
+                             "droga wewnętrzna": 30}},
+    "bicycle": {"speeds": {"autostrada": 0, "droga ekspresowa": 0, "droga główna ruchu przyśpieszonego": 18,
+                           "droga główna": 18, "droga zbiorcza": 18, "droga lokalna": 18, "droga dojazdowa": 18,
+                           "droga wewnętrzna": 15}},
+}
+
+class CostProfile:
+    def __init__(self, name, definition, cost, max_speed):
+        self.name = name
+        self.definition = definition    # {"speeds": {...}, "overrides": {...}}
+        self.cost = cost                # czas przejazdu krawędzi skierowanych [s] (inf - krawędź niedostępna)
+        self.max_speed = max_speed      # największa prędkość w profilu [km/h]
+        self._mps = max_speed * 1000 / 3600
+
+    # heurystyka A* (jak h_time, ale dla prędkości maksymalnej profilu)
+    def h(self, current, end):
+        return math.sqrt((current[0] - end[0]) ** 2 + (current[1] - end[1]) ** 2) / self._mps
+
+# kody klas dróg krawędzi skierowanych; dla grafów bez tablicy road_class (np. z pliku pickle)
+# odtwarzane z prędkości length / time - klasy o tej samej prędkości w speed_dict dostają kod pierwszej z nich
+#   values - wartości klas w kolejności ROAD_CLASSES (np. prędkości profilu): jeśli klasy o tej samej prędkości
+#            w speed_dict mają różne wartości, nie da się ich rozróżnić bez road_class - ValueError
+def road_classes(graph, values=None):
+    from csr_graph import ROAD_CLASSES
+    from toolbox_core import speed_dict
+
+    if getattr(graph, "road_class", None) is not None:
+        return np.asarray(graph.road_class)
+    first = {}
+    for name, value in zip(ROAD_CLASSES, values if values is not None else ()):
+        other = first.setdefault(speed_dict[name], name)
+        if not np.array_equal(value, values[ROAD_CLASSES.index(other)]):
+            raise ValueError(f"Road classes '{other}' and '{name}' have the same speed in speed_dict "
+                             f"({speed_dict[name]} km/h) but different values in the profile - the graph has no "
+                             f"road class array to tell them apart (build it with graph_builder)")
+    length, time = np.asarray(graph.length), np.asarray(graph.time)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        speed = np.rint(np.where(time > 0, length / time * 3.6, 0))
+    code = np.zeros(len(speed), dtype=np.uint8)
+    known = np.zeros(len(speed), dtype=bool)
+    for i, name in reversed(list(enumerate(ROAD_CLASSES))):
+        match = speed == speed_dict[name]
+        code[match] = i
+        known |= match
+    known |= length == 0                # krawędzie o zerowej długości - koszt 0 w każdym profilu
+    if not known.all():
+        raise ValueError(f"Cannot determine road class of {np.count_nonzero(~known)} arcs from their speed")
+    return code
+
+# tablica czasów przejazdu i największa prędkość [km/h]
+def compile_profile(graph, speeds=None, overrides=None):
+    from csr_graph import ROAD_CLASSES
+    from toolbox_core import speed_dict
+
+    unknown = set(speeds or {}) - set(ROAD_CLASSES)
+    if unknown:
+        raise ValueError(f"Unknown road classes in profile: {', '.join(sorted(unknown))}")
+    table = dict(speed_dict, **(speeds or {}))
+    speed = np.array([table[name] for name in ROAD_CLASSES], dtype=np.float64)
+    speed = speed[road_classes(graph, speed)]
+
+    if overrides:
+        ids = np.array([int(i) for i in overrides], dtype=np.int64)
+        values = np.array(list(overrides.values()), dtype=np.float64)
+        order = np.argsort(ids)
+        ids, values = ids[order], values[order]
+        pos = np.minimum(np.searchsorted(ids, graph.edge_ids), len(ids) - 1)
+        hit = ids[pos] == graph.edge_ids
+        speed[hit] = values[pos[hit]]
+
+    length = np.asarray(graph.length)
+    with np.errstate(divide="ignore"):
+        cost = np.where(speed > 0, length / (speed * 1000 / 3600), math.inf)
+    allowed = speed[speed > 0]
+    if len(allowed) == 0:
+        raise ValueError("Profile allows no roads")
+    return cost, float(allowed.max())
+
+# profil przeliczony dla grafu i dodany do graph.profiles (dostępny jak metryka "time")
+def add_profile(graph, name, speeds=None, overrides=None):
+    if name in ("length", "time") or name in graph.__dict__ or hasattr(type(graph), name):
+        raise ValueError(f"Invalid profile name: {name}")
+    cost, max_speed = compile_profile(graph, speeds, overrides)
+    definition = {"speeds": dict(speeds or {}), "overrides": {str(k): v for k, v in (overrides or {}).items()}}
+    graph.profiles[name] = CostProfile(name, definition, cost, max_speed)
+    graph._mv = None                    # views() z nową tablicą
+    return graph.profiles[name]
+
+# profil o podanej nazwie: z grafu (np. wczytany z pliku), a jeśli go tam nie ma - przeliczony z definicji
+# zapisanej w pliku grafu albo z PROFILES
+def profile(graph, name):
+    if name in graph.profiles:
+        return graph.profiles[name]
+    graph_file = getattr(graph, "graph_file", None)
+    definitions = dict(PROFILES, **(graph_file.meta.get("profiles", {}) if graph_file is not None else {}))
+    if name not in definitions:
+        raise ValueError(f"Unknown cost profile: {name}")
+    return add_profile(graph, name, definitions[name].get("speeds"), definitions[name].get("overrides"))
+
+# sekcje i metadane profili do zapisu w pliku .pfg
+#   checksum - suma kontrolna grafu w pliku (domyślnie z pliku grafu, z którego wczytano graph)
+def profile_sections(graph, profiles, checksum=None):
+    from graph_file import graph_checksum
+
+    if checksum is None:
+        graph_file = getattr(graph, "graph_file", None)
+        checksum = graph_file.graph_checksum if graph_file is not None else graph_checksum(graph)
+    sections = {}
+    meta = {}
+    for p in profiles:
+        sections["cost_" + p.name] = p.cost
+        meta[f"cost_{p.name}_max_speed"] = p.max_speed
+        meta[f"cost_{p.name}_graph_checksum"] = checksum
+    return sections, meta
+
+# zapis profili w pliku .pfg (definitions: nazwa -> {"speeds": ..., "overrides": ...}, domyślnie PROFILES)
+def save_profiles(path, definitions=None):
+    from graph_file import GraphFile, append_sections
+
+    f = GraphFile(path)
+    graph = f.graph()
+    definitions = PROFILES if definitions is None else definitions
+    profiles = [add_profile(graph, name, d.get("speeds"), d.get("overrides")) for name, d in definitions.items()]
+    sections, meta = profile_sections(graph, profiles)
+    meta["profiles"] = dict(f.meta.get("profiles", {}), **{p.name: p.definition for p in profiles})
+    del f, graph
+    append_sections(path, sections, meta)
+
+# profile zapisane w pliku dla tego samego grafu (nieaktualne - po zmianie grafu - są pomijane)
+def load_profiles(graph, graph_file):
+    for name, definition in graph_file.meta.get("profiles", {}).items():
+        if graph_file.meta.get(f"cost_{name}_graph_checksum") == graph_file.graph_checksum and "cost_" + name in graph_file:
+            graph.profiles[name] = CostProfile(name, definition, graph_file["cost_" + name],
+                                               graph_file.meta[f"cost_{name}_max_speed"])
@@ -0,0 +1,750 @@
+# Authors:  PAGistyczna Drużyna Cybergeodetów
+# Created:  2026-10-18
+#
+# Zwarta (CSR - compressed sparse row) reprezentacja grafu słownikowego z toolbox_core (Graph).
+# Zamiast słownika {(x, y): Node} z listami obiektów Edge trzymamy równoległe tablice NumPy:
+#   x, y      - współrzędne węzłów (id węzła = indeks w tablicy, węzły posortowane po (x, y))
+#   offsets   - krawędzie wychodzące z węzła i to zakres offsets[i]:offsets[i + 1]
+#   targets   - id węzła na końcu krawędzi
+#   edge_ids  - ID krawędzi z pliku źródłowego
+#   length    - długość krawędzi [m]
+#   time      - czas przejazdu krawędzi [s]
+#   road_class - opcjonalnie kod klasy drogi krawędzi (indeks w ROAD_CLASSES), potrzebny do profili kosztów
+#   geometry  - opcjonalnie pełna geometria dróg (geometry.EdgeGeometry) do eksportu tras
+# Dodatkowe metryki (profile kosztów, cost_profiles) są w słowniku profiles i dostępne jak length / time,
+# np. g.truck albo aShift8("truck", ...).
+
+import heapq
+import math
+import pickle
+import sys
+import threading
+import numpy as np
+from toolbox_core import Edge, Graph, export_polyline, export_snap_lines, round_coords, speed_dict
+from pqueue import make_queue
+
+DEFAULT_QUEUE = "lazy"          # kolejka priorytetowa algorytmów (pqueue.QUEUES), wybrana na podstawie benchmark.py queue
+ROAD_CLASSES = list(speed_dict)  # klasy dróg w kolejności kodów tablicy road_class
+
+class CSRGraph:
+    def __init__(self, x, y, offsets, targets, edge_ids, length, time, data_fc=None, road_class=None):
+        self.data_fc = data_fc      # nazwa pliku źródłowego (potrzebna przy eksporcie i snapowaniu)
+        self.x = x                  # float64, posortowane rosnąco (przy równych x - rosnąco po y)
+        self.y = y                  # float64
+        self.offsets = offsets      # int64, długość n + 1
+        self.targets = targets      # int32, długość m
+        self.edge_ids = edge_ids    # int32, długość m
+        self.length = length        # float64, długość m
+        self.time = time            # float64, długość m
+        self.road_class = road_class    # uint8, długość m (None - graf bez klas dróg)
+        self.profiles = {}          # nazwa -> cost_profiles.CostProfile
+        self.geometry = None        # geometry.EdgeGeometry (None - tylko odcinki między węzłami)
+        self.squares = None         # kwadraty końców krawędzi i ich węzły (graph_builder.end_squares) - łączenie
+                                    # końców nowych dróg jak round_coords w graph_update
+        self._edits = None          # graf po zmianach z pliku (graph_update.GraphDelta.merge): dane do poprawienia
+                                    # indeksu i modelu pory dnia grafu sprzed zmian
+        self._mv = None             # memoryview tablic - szybki odczyt pojedynczych wartości w pętlach algorytmów
+        self._reverse = None        # odwrócona lista sąsiedztwa (krawędzie wchodzące), tworzona na żądanie
+        self._index = None          # indeks przestrzenny (spatial_index), tworzony lub wczytywany na żądanie
+        self._edge_arcs = None      # krawędzie skierowane posortowane po ID krawędzi, tworzone na żądanie
+        self._sources = None        # węzły początkowe krawędzi skierowanych, tworzone na żądanie
+        self._contexts = None       # przestrzenie robocze przeszukiwań (search_context) dla każdego wątku
+
+    # utworzenie grafu z list krawędzi skierowanych (węzły dowolnie ponumerowane)
+    @classmethod
+    def from_arcs(cls, x, y, src, dst, edge_ids, length, time, data_fc=None, road_class=None):
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+
+        # nowa numeracja węzłów - porządek leksykograficzny (x, y) pozwala wyszukiwać węzły po współrzędnych
+        order = np.lexsort((y, x))
+        new_id = np.empty(len(order), dtype=np.int64)
+        new_id[order] = np.arange(len(order))
+        src = new_id[np.asarray(src, dtype=np.int64)]
+        dst = new_id[np.asarray(dst, dtype=np.int64)]
+
+        # sortowanie stabilne - krawędzie węzła zachowują kolejność dodawania (jak w Node.edges)
+        arc_order = np.argsort(src, kind="stable")
+        offsets = np.zeros(len(order) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=len(order)), out=offsets[1:])
+
+        return cls(
+            x[order], y[order], offsets,
+            dst[arc_order].astype(np.int32),
+            np.asarray(edge_ids)[arc_order].astype(np.int32),
+            np.asarray(length, dtype=np.float64)[arc_order],
+            np.asarray(time, dtype=np.float64)[arc_order],
+            data_fc,
+            np.asarray(road_class, dtype=np.uint8)[arc_order] if road_class is not None else None
+        )
+
+    # konwersja grafu słownikowego (Graph z toolbox_core)
+    @classmethod
+    def from_graph(cls, g):
+        ids = {xy: i for i, xy in enumerate(g.nodes)}
+        src, dst, edge_ids, length, time = [], [], [], [], []
+        for xy, node in g.nodes.items():
+            i = ids[xy]
+            for edge in node.edges:
+                src.append(i)
+                dst.append(ids[edge.id])
+                edge_ids.append(edge.edge_id)
+                length.append(edge.length)
+                time.append(edge.time)
+
+        coords = np.array(list(g.nodes), dtype=np.float64).reshape(-1, 2)
+        return cls.from_arcs(coords[:, 0], coords[:, 1], src, dst, edge_ids, length, time, g.data_fc)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_mv"] = None         # memoryview nie da się zapisać w pickle
+        state["_reverse"] = None
+        state["_index"] = None
+        state["_edge_arcs"] = None
+        state["_sources"] = None
+        state["_contexts"] = None
+        state["_edits"] = None
+        return state
+
+    # grafy zapisane (pickle) przed dodaniem klas dróg, profili, geometrii i przestrzeni roboczych
+    def __setstate__(self, state):
+        state.setdefault("road_class", None)
+        state.setdefault("geometry", None)
+        state.setdefault("squares", None)
+        state.setdefault("_edits", None)
+        state.setdefault("profiles", {})
+        state.setdefault("_contexts", None)
+        self.__dict__.update(state)
+
+    # tablica kosztów profilu jak atrybut (getattr(g, "truck") jak getattr(g, "time"))
+    def __getattr__(self, name):
+        profiles = self.__dict__.get("profiles")
+        if profiles and name in profiles:
+            return profiles[name].cost
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    @property
+    def node_count(self):
+        return len(self.x)
+
+    @property
+    def edge_count(self):
+        return len(self.targets)
+
+    # widok zgodny ze słownikiem Graph.nodes: (x, y) -> obiekt z listą krawędzi
+    @property
+    def nodes(self):
+        return NodesView(self)
+
+    # memoryview tablic - indeksowanie zwraca zwykłe int / float, szybciej niż skalary NumPy
+    def views(self):
+        if self._mv is None:
+            self._mv = {
+                name: memoryview(np.ascontiguousarray(getattr(self, name)))
+                for name in ("x", "y", "offsets", "targets", "edge_ids", "length", "time", *self.profiles)
+            }
+        return self._mv
+
+    # krawędzie wchodzące: dla węzła v zakres rev_offsets[v]:rev_offsets[v + 1] w rev_arcs,
+    # rev_arcs to indeksy krawędzi w tablicach targets / edge_ids / length / time, rev_sources - węzły początkowe.
+    # Kierunkowość (ftl / ltf) jest już zapisana w krawędziach skierowanych, więc odwrócenie jej nie zmienia.
+    def reverse(self):
+        if self._reverse is None:
+            sources = self.arc_sources()
+            rev_arcs = np.argsort(self.targets, kind="stable").astype(np.int32)
+            rev_offsets = np.zeros(self.node_count + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.targets, minlength=self.node_count), out=rev_offsets[1:])
+            self._reverse = {
+                "rev_offsets": memoryview(rev_offsets),
+                "rev_arcs": memoryview(rev_arcs),
+                "rev_sources": memoryview(sources[rev_arcs]),
+            }
+        return self._reverse
+
+    # id węzła o podanych współrzędnych (None, jeśli nie ma go w grafie)
+    def node_id(self, xy):
+        lo = int(np.searchsorted(self.x, xy[0], "left"))
+        hi = int(np.searchsorted(self.x, xy[0], "right"))
+        if lo == hi:
+            return None
+        i = lo + int(np.searchsorted(self.y[lo:hi], xy[1], "left"))
+        if i < hi and self.y[i] == xy[1]:
+            return i
+        return None
+
+    def coords(self, i):
+        mv = self.views()
+        return mv["x"][i], mv["y"][i]
+
+    # węzeł początkowy każdej krawędzi skierowanej (tablica długości m)
+    def arc_sources(self):
+        if self._sources is None:
+            self._sources = np.repeat(np.arange(self.node_count, dtype=np.int32), np.diff(self.offsets))
+        return self._sources
+
+    # krawędzie skierowane utworzone z krawędzi pliku źródłowego: lista (indeks krawędzi skierowanej, węzeł początkowy)
+    def arcs_of_edge(self, edge_id):
+        if self._edge_arcs is None:
+            order = np.argsort(self.edge_ids, kind="stable")
+            self._edge_arcs = (self.edge_ids[order], memoryview(order.astype(np.int64)), memoryview(self.arc_sources()))
+        sorted_ids, order, sources = self._edge_arcs
+        lo = int(np.searchsorted(sorted_ids, edge_id, "left"))
+        hi = int(np.searchsorted(sorted_ids, edge_id, "right"))
+        return [(order[i], sources[order[i]]) for i in range(lo, hi)]
+
+    # indeks przestrzenny węzłów i krawędzi (z pliku .pfg albo zbudowany przy pierwszym użyciu)
+    def spatial_index(self):
+        if self._index is None:
+            from spatial_index import spatial_index
+            self._index = spatial_index(self)
+        return self._index
+
+    # id węzła grafu dla punktu wejściowego - te same warianty zaokrąglenia co przy budowie grafu
+    def find_node(self, point):
+        for cr in round_coords(point):
+            i = self.node_id(cr)
+            if i is not None:
+                return i
+        return None
+
+    # implementacja algorytmu A* - jak Graph.aShift8, ale na id węzłów
+    #   queue   - nazwa kolejki priorytetowej z pqueue.QUEUES
+    #   virtual - węzły wirtualne (virtual_nodes.VirtualNodes), gdy start / end leżą wewnątrz krawędzi
+    #   context - przestrzeń robocza (search_context.SearchContext), domyślnie wspólna dla wątku
+    def aShift8(self, cost, h, start, end, queue=DEFAULT_QUEUE, virtual=None, context=None):
+        mv = self.views()
+        offsets, targets, edge_ids, x, y = mv["offsets"], mv["targets"], mv["edge_ids"], mv["x"], mv["y"]
+        w = mv[cost]                                        # tablica kosztów: "length" lub "time"
+        n = self.node_count
+        extra = virtual.out if virtual else {}              # węzły z krawędziami dodanymi przez podział krawędzi
+        graph = virtual if virtual else self
+        s = graph.node_id(start)
+        t = graph.node_id(end)
+
+        # listy indeksowane id węzła zamiast słowników - aktualne tylko wpisy z numerem tego zapytania
+        context = context or self.search_context()
+        gen = context.begin(graph.node_count)
+        g, hv, p, pe = context.g, context.h, context.parent, context.parent_edge
+        seen, closed = context.seen, context.closed     # odkryte / odwiedzone (zbiór S) w tym zapytaniu
+        # kolejka "lazy" prowadzona wprost na liście heapq przestrzeni roboczej (bez wywołań metod kolejki),
+        # pozostałe kolejki z pqueue: id węzła -> f
+        lazy = queue == "lazy"
+        heap = context.heap
+        Q = None if lazy else make_queue(queue, graph.node_count)
+        g[s] = 0
+        seen[s] = gen
+        closed[s] = gen
+        volume = 1                                          # liczba węzłów w S
+        curr, curr_g = s, 0
+
+        # heurystyka może liczyć wprost na id węzłów (np. ALT), wtedy nie trzeba przekazywać współrzędnych
+        node_h = getattr(h, "node_h", None)
+        if node_h and virtual:
+            node_h = virtual.bound(node_h, cost)
+        # heurystyka dopuszczalna, ale niespójna (slack > 0, np. ALT z zaokrąglonymi odległościami) -
+        # węzeł z S jest otwierany ponownie, gdy znaleziono do niego tańszą ścieżkę (inaczej trasa może być dłuższa)
+        reopen = getattr(h, "slack", 0) > 0
+
+        while True:
+            # wyniki końcowe po dotarciu do celu
+            if curr == t:
+                node_path, edge_ids_path = context.path(s, t)
+                return [graph.coords(i) for i in node_path], edge_ids_path, curr_g, volume
+
+            # dodanie węzła do zbioru S i relaksacja krawędzi wychodzących
+            # (dla węzłów przy podzielonej krawędzi - listy krawędzi z węzłów wirtualnych)
+            if closed[curr] != gen:
+                closed[curr] = gen
+                volume += 1
+            if curr in extra:
+                T, W, E = virtual.adjacent(curr, cost)
+                arcs = range(len(T))
+            else:
+                T, W, E = targets, w, edge_ids
+                arcs = range(offsets[curr], offsets[curr + 1])
+            for k in arcs:
+                v = T[k]
+                if closed[v] == gen:
+                    if not reopen or curr_g + W[k] >= g[v]:
+                        continue
+                    closed[v] = 0
+                new_g = curr_g + W[k]
+                if seen[v] != gen:
+                    future_h = node_h(v, t) if node_h else h((x[v], y[v]) if v < n else graph.coords(v), end)
+                    seen[v] = gen
+                    hv[v] = future_h
+                    if lazy:
+                        heapq.heappush(heap, (new_g + future_h, v))
+                    else:
+                        Q.push(v, new_g + future_h)
+                    g[v] = new_g
+                    p[v] = curr
+                    pe[v] = E[k]
+                elif new_g < g[v]:                          # relaksacja krawędzi
+                    if lazy:
+                        heapq.heappush(heap, (new_g + hv[v], v))
+                    else:
+                        Q.push(v, new_g + hv[v])
+                    g[v] = new_g
+                    p[v] = curr
+                    pe[v] = E[k]
+
+            if lazy:
+                # pominięcie wpisów nieaktualnych (węzeł już w S albo później dodany z mniejszym f)
+                while heap:
+                    f, curr = heapq.heappop(heap)
+                    if closed[curr] != gen and f == g[curr] + hv[curr]:
+                        break
+                else:
+                    return None                             # brak ścieżki
+            else:
+                if not Q:                                   # brak ścieżki
+                    return None
+                curr, _ = Q.pop()
+            curr_g = g[curr]
+            if curr_g == math.inf:                          # pozostały tylko krawędzie niedostępne (profil kosztów)
+                return None
+
+    # przestrzeń robocza przeszukiwań tego wątku (tworzona przy pierwszym użyciu, potem używana ponownie)
+    def search_context(self):
+        from search_context import SearchContext
+
+        if self._contexts is None:
+            self._contexts = threading.local()
+        context = getattr(self._contexts, "context", None)
+        if context is None:
+            context = self._contexts.context = SearchContext(self.node_count)
+        return context
+
+    # algorytm Dijkstry (jak console_test.NewGraph.dijkstra) - A* z zerową heurystyką
+    def dijkstra(self, cost, start, end, queue=DEFAULT_QUEUE, virtual=None):
+        return self.aShift8(cost, h_zero, start, end, queue, virtual)
+
+    # dwukierunkowy A* - wynik jak w aShift8 (węzły ścieżki, krawędzie ścieżki, koszt, ilość węzłów w S),
+    # S to suma węzłów odwiedzonych w obu kierunkach
+    def aShift8_bidirectional(self, cost, h, start, end, queue=DEFAULT_QUEUE, virtual=None):
+        mv = self.views()
+        rv = self.reverse()
+        x, y, edge_ids, w = mv["x"], mv["y"], mv["edge_ids"], mv[cost]
+        n = self.node_count
+        graph = virtual if virtual else self
+        s = graph.node_id(start)
+        t = graph.node_id(end)
+        if s == t:
+            return [graph.coords(s)], [], 0, 1
+
+        # potencjał średni: p_f(v) = (h(v, end) - h_r(start, v)) / 2, w kierunku wstecznym p_r = -p_f.
+        # Suma p_f + p_r jest stała, więc oba przeszukiwania mają zgodne koszty zredukowane.
+        # h_r szacuje koszt dojazdu ze start do v - dla odległości euklidesowej to po prostu h(v, start).
+        node_h = getattr(h, "node_h", None)
+        node_h_reverse = getattr(h, "node_h_reverse", None)
+        if node_h and node_h_reverse and virtual:
+            node_h = virtual.bound(node_h, cost)            # ALT: node_h_reverse(v, s) = node_h(s, v)
+            node_h_reverse = lambda v, s: node_h(s, v)
+        potential = {}
+        def p_f(v):
+            if v not in potential:
+                if node_h and node_h_reverse:
+                    potential[v] = (node_h(v, t) - node_h_reverse(v, s)) / 2
+                else:
+                    xy = (x[v], y[v]) if v < n else graph.coords(v)
+                    potential[v] = (h(xy, end) - h(xy, start)) / 2
+            return potential[v]
+        # heurystyka niespójna (ALT): potencjał różni się od spójnego o mniej niż slack / 2, więc warunek stopu
+        # jest przesunięty o slack, a węzły z S są otwierane ponownie po znalezieniu tańszej ścieżki
+        slack = getattr(h, "slack", 0)
+
+        # [0] - w przód od start, [1] - wstecz od end; krawędzie dodane przez podział krawędzi osobno
+        neighbours = (
+            (mv["offsets"], mv["targets"], None, virtual.out if virtual else {}),
+            (rv["rev_offsets"], rv["rev_sources"], rv["rev_arcs"], virtual.inn if virtual else {}),
+        )
+        sign = (1, -1)
+        g = ({s: 0}, {t: 0})                                # koszty dotarcia
+        p = ({s: (None, None)}, {t: (None, None)})          # poprzednicy (w kierunku wstecznym - następnicy)
+        S = (set(), set())
+        Q = (make_queue(queue, graph.node_count), make_queue(queue, graph.node_count))
+        Q[0].push(s, p_f(s))
+        Q[1].push(t, -p_f(t))
+
+        mu = math.inf                                       # koszt najlepszej znalezionej ścieżki
+        meet = None                                         # węzeł, w którym spotkały się przeszukiwania
+
+        while Q[0] and Q[1]:
+            top_f = Q[0].peek()[1]
+            top_r = Q[1].peek()[1]
+            # warunek stopu: przy p_f + p_r = 0 żadna ścieżka przez nieodwiedzone węzły nie jest krótsza niż mu
+            if top_f + top_r >= mu + slack:
+                break
+
+            d = 0 if top_f <= top_r else 1                  # rozwijamy kierunek z mniejszym kluczem
+            curr, _ = Q[d].pop()
+            S[d].add(curr)
+            curr_g = g[d][curr]
+            offsets, targets, arc_ids, extra = neighbours[d]
+            other_g = g[1 - d]
+
+            if curr in extra:
+                T, W, E = virtual.adjacent(curr, cost, reverse=d == 1)
+                A = None
+                arcs = range(len(T))
+            else:
+                T, W, E, A = targets, w, edge_ids, arc_ids
+                arcs = range(offsets[curr], offsets[curr + 1])
+            for k in arcs:
+                v = T[k]
+                if v in S[d] and not slack:
+                    continue
+                arc = k if A is None else A[k]
+                new_g = curr_g + W[arc]
+                if new_g < g[d].get(v, math.inf):
+                    S[d].discard(v)
+                    g[d][v] = new_g
+                    p[d][v] = curr, E[arc]
+                    Q[d].push(v, new_g + sign[d] * p_f(v))
+                    if v in other_g and new_g + other_g[v] < mu:
+                        mu = new_g + other_g[v]
+                        meet = v
+
+        if meet is None:                                    # brak ścieżki
+            return None
+
+        # odtworzenie ścieżki: start -> meet z poprzedników, meet -> end z następników
+        node_path = [meet]
+        edge_ids_path = []
+        while node_path[-1] != s:
+            prev, edge_id = p[0][node_path[-1]]
+            node_path.append(prev)
+            edge_ids_path.append(edge_id)
+        node_path.reverse()
+        edge_ids_path.reverse()
+        while node_path[-1] != t:
+            nxt, edge_id = p[1][node_path[-1]]
+            node_path.append(nxt)
+            edge_ids_path.append(edge_id)
+
+        return [graph.coords(i) for i in node_path], edge_ids_path, mu, len(S[0]) + len(S[1])
+
+    # Dijkstra z jednego lub wielu źródeł do wszystkich węzłów - tablica kosztów (inf dla nieosiągalnych).
+    # reverse=True - po krawędziach odwróconych, czyli koszt dotarcia z węzła DO źródła.
+    # tree=True - dodatkowo tablica poprzedników (-1 dla źródeł i nieosiągalnych) i kolejność zdejmowania węzłów z kolejki
+    # virtual - węzły wirtualne (źródłami mogą być też ich id), tablice mają wtedy długość virtual.node_count
+    def one_to_all(self, cost, sources, reverse=False, tree=False, virtual=None):
+        mv = self.views()
+        w = mv[cost]
+        n = self.node_count
+        if reverse:
+            rv = self.reverse()
+            offsets, targets, arc_ids = rv["rev_offsets"], rv["rev_sources"], rv["rev_arcs"]
+            extra = virtual.inn if virtual else {}
+        else:
+            offsets, targets, arc_ids = mv["offsets"], mv["targets"], None
+            extra = virtual.out if virtual else {}
+
+        size = virtual.node_count if virtual else n
+        dist = [math.inf] * size
+        parent = [-1] * size
+        order = []
+        heap = []
+        for s in sources:
+            dist[s] = 0.0
+            heap.append((0.0, s))
+        heapq.heapify(heap)
+
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue                                    # nieaktualny wpis (leniwe usuwanie)
+            order.append(u)
+            if u in extra:
+                T, W, _ = virtual.adjacent(u, cost, reverse)
+                A = None
+                arcs = range(len(T))
+            else:
+                T, W, A = targets, w, arc_ids
+                arcs = range(offsets[u], offsets[u + 1])
+            for k in arcs:
+                v = T[k]
+                nd = d + W[k if A is None else A[k]]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    parent[v] = u
+                    heapq.heappush(heap, (nd, v))
+
+        if tree:
+            return np.array(dist), np.array(parent, dtype=np.int64), np.array(order, dtype=np.int64)
+        return np.array(dist)
+
+    # Dijkstra z jednego węzła do wielu celów - kończy się po zdjęciu z kolejki wszystkich osiągalnych celów.
+    # Zwraca koszty dotarcia {węzeł: koszt} i poprzedników {węzeł: (poprzednik, ID krawędzi)} (ścieżki: trace_path)
+    def one_to_many(self, cost, source, targets, virtual=None):
+        mv = self.views()
+        offsets, targets_arr, edge_ids, w = mv["offsets"], mv["targets"], mv["edge_ids"], mv[cost]
+        extra = virtual.out if virtual else {}
+        left = set(targets)                                 # cele jeszcze nie zdjęte z kolejki
+        dist = {source: 0.0}
+        p = {source: (None, None)}
+        heap = [(0.0, source)]
+
+        while heap and left:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue                                    # nieaktualny wpis (leniwe usuwanie)
+            left.discard(u)
+            if u in extra:
+                T, W, E = virtual.adjacent(u, cost)
+                arcs = range(len(T))
+            else:
+                T, W, E = targets_arr, w, edge_ids
+                arcs = range(offsets[u], offsets[u + 1])
+            for k in arcs:
+                v = T[k]
+                nd = d + W[k]
+                if nd < dist.get(v, math.inf):
+                    dist[v] = nd
+                    p[v] = u, E[k]
+                    heapq.heappush(heap, (nd, v))
+
+        return dist, p
+
+    # wyznaczanie zasięgu na podstawie algorytmu Dijkstry - zwraca listę współrzędnych osiągniętych węzłów
+    def dijkstra_with_time_limit(self, start, max_time, queue=DEFAULT_QUEUE):
+        mv = self.views()
+        offsets, targets, w, x, y = mv["offsets"], mv["targets"], mv["time"], mv["x"], mv["y"]
+        s = self.node_id(start)
+
+        visited = set()
+        times = {s: 0}
+        Q = make_queue(queue, self.node_count)
+        Q.push(s, 0)
+        reachable_nodes = []
+
+        while Q:
+            current_node, current_time = Q.pop()
+            if current_time > max_time:
+                continue
+            visited.add(current_node)
+            reachable_nodes.append((x[current_node], y[current_node]))
+
+            for k in range(offsets[current_node], offsets[current_node + 1]):
+                neighbor = targets[k]
+                new_time = current_time + w[k]
+                if neighbor in visited or new_time > max_time:
+                    continue
+                if neighbor not in times or new_time < times[neighbor]:
+                    times[neighbor] = new_time
+                    Q.push(neighbor, new_time)
+
+        return reachable_nodes
+
+    # snapowanie - jak Graph.snap (punkt spoza grafu przenoszony do bliższego końca najbliższej krawędzi
+    # w promieniu max_dist), ale z indeksem przestrzennym zamiast arcpy.analysis.Near.
+    # Klasa odcinków łączących punkty z grafem jest zapisywana tylko dla write_fc=True.
+    def snap(self, start, end, write_fc=False, max_dist=500):
+        index = self.spatial_index()
+        mv = self.views()
+        start_end_final = []                                # ostateczne punkty startu i końca
+        snap_lines = []                                     # odcinki łączące punkty z grafem
+        length = 0
+        time = 0
+        for point in (start, end):
+            i = self.find_node(point)
+            if i is None:
+                near = index.nearest_edge(point, max_dist)
+                if near is None:
+                    raise ValueError(f"Point ({point[0]}, {point[1]}) is more than {max_dist} m from the road network")
+                # bliższy z węzłów końcowych najbliższej krawędzi
+                k, u = self.arcs_of_edge(near[1])[0]
+                v = mv["targets"][k]
+                du = math.dist(point, self.coords(u))
+                dv = math.dist(point, self.coords(v))
+                i = u if du < dv else v
+                snap_lines.append(((point[0], point[1]), self.coords(i)))
+                length += min(du, dv)
+                time += min(du, dv) / (speed_dict['droga wewnętrzna'] * 1000 / 3600)
+            start_end_final.append(self.coords(i))
+
+        if write_fc:
+            export_snap_lines(snap_lines)
+        return start_end_final, length, time
+
+    # snapowanie z podziałem krawędzi: punkt spoza grafu jest rzutowany na najbliższą krawędź, w miejscu rzutu
+    # powstaje węzeł wirtualny (virtual_nodes). Wynik jak w snap oraz węzły wirtualne do przekazania
+    # algorytmom (parametr virtual). Tablice grafu nie są zmieniane.
+    def snap_split(self, start, end, write_fc=False, max_dist=500):
+        from virtual_nodes import VirtualNodes
+
+        virtual = VirtualNodes(self)
+        start_end_final = []
+        snap_lines = []
+        length = 0
+        for point in (start, end):
+            i = self.find_node(point)
+            if i is None:
+                added = virtual.add(point, max_dist)
+                if added is None:
+                    raise ValueError(f"Point ({point[0]}, {point[1]}) is more than {max_dist} m from the road network")
+                i, dist = added
+                snap_lines.append(((point[0], point[1]), virtual.coords(i)))
+                length += dist
+            start_end_final.append(virtual.coords(i))
+        time = length / (speed_dict['droga wewnętrzna'] * 1000 / 3600)
+
+        if write_fc:
+            export_snap_lines(snap_lines)
+        return start_end_final, length, time, virtual
+
+    # linia trasy (float64, n x 2) z wyniku aShift8: z pełnej geometrii dróg w kolejności i kierunku przejazdu,
+    # a dla grafu bez geometrii - węzły ścieżki. Końce ścieżki spoza węzłów grafu (węzły wirtualne, rzuty punktów na
+    # linię drogi) tną linię drogi w miejscu rzutu.
+    def route_geometry(self, path, edge_ids):
+        if self.geometry is None:
+            return np.array(path, dtype=np.float64).reshape(-1, 2)
+        return self.geometry.polyline(edge_ids, path, self.node_id(path[0]) is None, self.node_id(path[-1]) is None)
+
+    # linie dróg o podanych ID: (ID, wierzchołki) - z pełnej geometrii dróg albo odcinek między węzłami krawędzi
+    def edge_lines(self, ids):
+        for edge_id in ids:
+            if self.geometry is not None:
+                yield edge_id, self.geometry.edge(edge_id)
+                continue
+            arcs = self.arcs_of_edge(edge_id)
+            if arcs:
+                k, source = arcs[0]
+                yield edge_id, [self.coords(source), self.coords(self.targets[k])]
+
+    # eksport wybranych dróg do nowej warstwy i klasy; z path (węzły ścieżki) i pełną geometrią dróg -
+    # jedna linia trasy zapisana z pamięci, bez zapytania do warstwy źródłowej.
+    # Przy zapisie do pliku (OUTPUT, writers) bez arcpy: linia trasy albo drogi jako osobne obiekty z atrybutem edge_id
+    def export_fc(self, ids, name, path=None):
+        from toolbox_core import OUTPUT, write_output
+
+        if path is not None and (self.geometry is not None or OUTPUT):
+            export_polyline(self.route_geometry(path, ids), name)
+        elif OUTPUT:
+            write_output(name, "LineString", ((xy, {"edge_id": int(e)}) for e, xy in self.edge_lines(ids)))
+        else:
+            Graph.export_fc(self, ids, name)
+
+    def export_dijkstra_as_concave_hull(self, reachable_nodes, name, alpha=40000.0):
+        return Graph.export_dijkstra_as_concave_hull(self, reachable_nodes, name, alpha)
+
+    def export_isochrone(self, polygons, name):
+        return Graph.export_isochrone(self, polygons, name)
+
+    # rozmiar tablic grafu w bajtach
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ("x", "y", "offsets", "targets", "edge_ids", "length", "time"))
+
+# ścieżka z słownika poprzedników {węzeł: (poprzednik, ID krawędzi)}: (id węzłów, ID krawędzi)
+def trace_path(p, s, t):
+    node_path = [t]
+    edge_ids_path = []
+    while node_path[-1] != s:
+        prev, edge_id = p[node_path[-1]]
+        node_path.append(prev)
+        edge_ids_path.append(edge_id)
+    node_path.reverse()
+    edge_ids_path.reverse()
+    return node_path, edge_ids_path
+
+# heurystyka zerowa (A* = Dijkstra)
+def h_zero(current, end):
+    return 0
+
+# widok tylko do odczytu udający słownik Graph.nodes (dla kodu, który iteruje po g.nodes[xy].edges)
+class NodesView:
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __contains__(self, xy):
+        return self.graph.node_id(xy) is not None
+
+    def __getitem__(self, xy):
+        i = self.graph.node_id(xy)
+        if i is None:
+            raise KeyError(xy)
+        return NodeView(self.graph, i)
+
+    def __iter__(self):
+        mv = self.graph.views()
+        for i in range(self.graph.node_count):
+            yield mv["x"][i], mv["y"][i]
+
+    def __len__(self):
+        return self.graph.node_count
+
+    def items(self):
+        for i, xy in enumerate(self):
+            yield xy, NodeView(self.graph, i)
+
+class NodeView:
+    def __init__(self, graph, i):
+        self.graph = graph
+        self.i = i
+
+    # lista krawędzi tworzona na żądanie (obiekty Edge jak w oryginalnym grafie)
+    @property
+    def edges(self):
+        mv = self.graph.views()
+        return [
+            Edge(mv["x"][mv["targets"][k]], mv["y"][mv["targets"][k]], mv["edge_ids"][k], mv["length"][k], mv["time"][k])
+            for k in range(mv["offsets"][self.i], mv["offsets"][self.i + 1])
+        ]
+
+# odczyt grafu zapisanego przez generate_launcher - klasy zapisane jako __main__.Graph / __main__.NewGraph
+# (skrypt uruchomiony bezpośrednio) są mapowane na klasy z toolbox_core
+class GraphUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        if module == "__main__" or module == "console_test":
+            if name in ("Graph", "NewGraph"):
+                return Graph
+            if name in ("Node", "Edge"):
+                module = "toolbox_core"
+        return super().find_class(module, name)
+
+def load_graph_pickle(path):
+    with open(path, "rb") as f:
+        return GraphUnpickler(f).load()
+
+# rozmiar grafu słownikowego w bajtach - suma sys.getsizeof po wszystkich obiektach (każdy obiekt liczony raz)
+def dict_graph_nbytes(g):
+    seen = set()
+    total = 0
+
+    def size(obj):
+        nonlocal total
+        if id(obj) not in seen:
+            seen.add(id(obj))
+            total += sys.getsizeof(obj)
+
+    size(g.nodes)
+    for xy, node in g.nodes.items():
+        size(xy)
+        size(xy[0])
+        size(xy[1])
+        size(node)
+        size(node.__dict__)
+        size(node.edges)
+        for edge in node.edges:
+            size(edge)
+            size(edge.__dict__)
+            size(edge.id)
+            size(edge.edge_id)
+            size(edge.length)
+            size(edge.time)
+    return total
+
+# porównanie pamięci: układ słownikowy vs CSR
+def memory_report(g, csr=None):
+    if csr is None:
+        csr = CSRGraph.from_graph(g)
+    dict_bytes = dict_graph_nbytes(g)
+    csr_bytes = csr.nbytes()
+    m = max(csr.edge_count, 1)
+
+    print(f"nodes: {csr.node_count}   edges (directed): {csr.edge_count}")
+    print(f"{'layout':<12}{'total [MB]':>14}{'per edge [B]':>16}")
+    print(f"{'dict':<12}{dict_bytes / 2**20:>14.2f}{dict_bytes / m:>16.1f}")
+    print(f"{'CSR':<12}{csr_bytes / 2**20:>14.2f}{csr_bytes / m:>16.1f}")
+    return dict_bytes, csr_bytes
@@ -18,6 +18,7 @@ class Edge:
         self.length = length
         self.fid = fid 
         self.road_speed = road_speed
+        self.time = length / (road_speed * 1000 / 3600)    # czas przejazdu liczony raz, nie w pętli A*
 
     def h(self, end):
         return abs(self.xy[0] - end[0]) + abs(self.xy[1] - end[1])
@@ -88,7 +89,7 @@ class Graph:
 
         for edge in self.nodes[start].edges:
             future_h = edge.h(end) / (edge.road_speed * 1000 / 3600)
-            travel_time = edge.length / (edge.road_speed * 1000/3600)
+            travel_time = edge.time
             Q[edge.xy] = travel_time + future_h, travel_time, future_h  
             p[edge.xy] = start, edge.fid
 
@@ -110,7 +111,7 @@ class Graph:
 
             for edge in self.nodes[curr].edges:
                 if edge.xy not in S:
-                    travel_time = edge.length / (edge.road_speed * 1000/3600)
+                    travel_time = edge.time
                     future_h = edge.h(end) / (edge.road_speed * 1000 / 3600)
                     if edge.xy not in Q:
                         future_g = curr_g + travel_time  
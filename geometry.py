@@ -0,0 +1,212 @@
+# Authors:  PAGistyczna Drużyna Cybergeodetów
+# Created:  2026-10-18
+#
+# Pełna geometria dróg (wszystkie wierzchołki linii) w jednym buforze, zapisywana przy budowie grafu:
+#   ids     - ID krawędzi (rosnąco)
+#   offsets - wierzchołki krawędzi ids[i] to coords[offsets[i]:offsets[i + 1]] (w kolejności z pliku źródłowego)
+#   coords  - wierzchołki wszystkich krawędzi (n x 2):
+#             "float32" - współrzędne względem origin (dla zasięgu powiatu / województwa dokładność ~1 - 3 cm)
+#             "float64" - współrzędne bez zmian
+# Geometria trasy (polyline) jest składana z bufora w kolejności i kierunku przejazdu, bez zapytań do warstwy
+# źródłowej (SelectLayerByAttribute z listą ID w Graph.export_fc).
+
+import numpy as np
+
+ENCODINGS = ("float32", "float64")
+
+class EdgeGeometry:
+    def __init__(self, ids, offsets, coords, origin=(0.0, 0.0)):
+        self.ids = ids
+        self.offsets = offsets
+        self.coords = coords
+        self.origin = np.array(origin, dtype=np.float64)
+        self.encoding = np.dtype(coords.dtype).name
+
+    # bufor z wierzchołków kolejnych krawędzi: counts - liczba wierzchołków krawędzi, xy - wszystkie wierzchołki
+    @classmethod
+    def from_parts(cls, edge_ids, counts, xy, encoding="float32"):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown geometry encoding: {encoding}")
+        edge_ids = np.asarray(edge_ids, dtype=np.int64)
+        counts = np.asarray(counts, dtype=np.int64)
+        xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        # krawędzie posortowane po ID (np. pliki w innej kolejności niż ID)
+        if np.any(np.diff(edge_ids) <= 0):
+            order = np.argsort(edge_ids, kind="stable")
+            if np.any(np.diff(edge_ids[order]) == 0):
+                raise ValueError("Duplicate edge ids in geometry")
+            xy = xy[_ranges(offsets[order], counts[order])]
+            edge_ids, counts = edge_ids[order], counts[order]
+            np.cumsum(counts, out=offsets[1:])
+
+        origin = (0.0, 0.0)
+        if encoding == "float32" and len(xy):
+            origin = (float(np.floor(xy[:, 0].min())), float(np.floor(xy[:, 1].min())))
+            xy = xy - origin
+        return cls(edge_ids, offsets, np.ascontiguousarray(xy, dtype=encoding), origin)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def nbytes(self):
+        return self.ids.nbytes + self.offsets.nbytes + self.coords.nbytes
+
+    def _decode(self, coords):
+        return coords.astype(np.float64) + self.origin
+
+    # indeksy krawędzi w buforze dla tablicy ID krawędzi
+    def _positions(self, edge_ids):
+        pos = np.searchsorted(self.ids, edge_ids)
+        missing = (pos >= len(self.ids)) | (self.ids[np.minimum(pos, len(self.ids) - 1)] != edge_ids)
+        if np.any(missing):
+            raise KeyError(f"No geometry for edge {int(np.asarray(edge_ids)[missing][0])}")
+        return pos
+
+    # wierzchołki jednej krawędzi (float64, kolejność z pliku źródłowego)
+    def edge(self, edge_id):
+        i = int(self._positions(np.array([edge_id]))[0])
+        return self._decode(self.coords[self.offsets[i]:self.offsets[i + 1]])
+
+    # wierzchołki wielu krawędzi naraz: (wierzchołki float64 kolejnych krawędzi, liczby wierzchołków krawędzi)
+    def lines(self, edge_ids):
+        pos = self._positions(np.asarray(edge_ids, dtype=np.int64))
+        lo, hi = self.offsets[pos], self.offsets[pos + 1]
+        return self._decode(self.coords[_ranges(lo, hi - lo)]), hi - lo
+
+    # linia trasy (float64, n x 2) w kolejności i kierunku przejazdu
+    #   edge_ids - ID krawędzi ścieżki, nodes - współrzędne węzłów ścieżki (o jeden więcej niż krawędzi)
+    #   cut_start / cut_end - pierwszy / ostatni węzeł leży wewnątrz krawędzi (węzeł wirtualny - rzut punktu na linię
+    #                         drogi) - linia jest cięta w tym punkcie
+    # Kierunek krawędzi: bliższy koniec krawędzi do węzła, z którego się na nią wjeżdża.
+    def polyline(self, edge_ids, nodes, cut_start=False, cut_end=False):
+        nodes = np.asarray(nodes, dtype=np.float64).reshape(-1, 2)
+        if len(edge_ids) == 0:
+            return nodes[:1].copy()
+        pos = self._positions(np.asarray(edge_ids, dtype=np.int64))
+        lo, hi = self.offsets[pos], self.offsets[pos + 1]
+        first, last = self._decode(self.coords[lo]), self._decode(self.coords[hi - 1])
+        entry, leave = nodes[:-1], nodes[1:]
+        reverse = ((first - entry) ** 2).sum(axis=1) > ((last - entry) ** 2).sum(axis=1)
+        # pierwsza krawędź z węzłem wirtualnym - kierunek od końca, do którego się jedzie
+        if cut_start:
+            reverse[0] = ((first[0] - leave[0]) ** 2).sum() < ((last[0] - leave[0]) ** 2).sum()
+
+        counts = hi - lo
+        starts = np.cumsum(counts) - counts
+        step = np.arange(counts.sum()) - np.repeat(starts, counts)
+        index = np.where(np.repeat(reverse, counts), np.repeat(hi - 1, counts) - step, np.repeat(lo, counts) + step)
+        xy = self._decode(self.coords[index])
+
+        if cut_start or cut_end:
+            pieces = [xy[starts[i]:starts[i] + counts[i]] for i in range(len(counts))]
+            if len(pieces) == 1 and cut_start and cut_end:
+                pieces[0] = _between(pieces[0], nodes[0], nodes[-1])
+            else:
+                if cut_start:
+                    pieces[0] = _after(pieces[0], nodes[0])
+                if cut_end:
+                    pieces[-1] = _before(pieces[-1], nodes[-1])
+            counts = np.array([len(p) for p in pieces], dtype=np.int64)
+            starts = np.cumsum(counts) - counts
+            xy = np.concatenate(pieces)
+
+        # wspólny wierzchołek kolejnych krawędzi raz
+        keep = np.ones(len(xy), dtype=bool)
+        joints = starts[1:]
+        keep[joints] = np.any(xy[joints] != xy[joints - 1], axis=1)
+        return xy[keep]
+
+    # punkty sąsiednie do końców krawędzi skierowanych grafu (np. kąty skrętów z rzeczywistej geometrii):
+    # (drugi wierzchołek od początku, drugi wierzchołek od końca) w kierunku przejazdu krawędzi
+    def arc_neighbours(self, graph):
+        tails = graph.arc_sources()
+        heads = np.asarray(graph.targets)
+        pos = self._positions(np.asarray(graph.edge_ids, dtype=np.int64))
+        lo, hi = self.offsets[pos], self.offsets[pos + 1]
+        first, last = self._decode(self.coords[lo]), self._decode(self.coords[hi - 1])
+        second = self._decode(self.coords[np.minimum(lo + 1, hi - 1)])
+        penultimate = self._decode(self.coords[np.maximum(hi - 2, lo)])
+        tail = np.column_stack((graph.x[tails], graph.y[tails]))
+        head = np.column_stack((graph.x[heads], graph.y[heads]))
+        forward = (np.hypot(*(first - tail).T) + np.hypot(*(last - head).T) <=
+                   np.hypot(*(first - head).T) + np.hypot(*(last - tail).T))
+        return (np.where(forward[:, None], second, penultimate),
+                np.where(forward[:, None], penultimate, second))
+
+    # nowa geometria po zmianach grafu (graph_update): bez krawędzi removed, z krawędziami added (ID, wierzchołki).
+    # Wierzchołki pozostałych krawędzi są kopiowane bez dekodowania, a nowe krawędzie wstawiane w miejsca wg ID
+    # (bez ponownego sortowania całego bufora); nowe wierzchołki są zapisywane względem tego samego origin.
+    def replace(self, removed=(), added=()):
+        removed = np.fromiter(removed, dtype=np.int64)
+        keep = ~np.isin(self.ids, removed)
+        counts = np.diff(self.offsets)
+        coords = self.coords[np.repeat(keep, counts)]
+        ids, counts = self.ids[keep], counts[keep]
+
+        added = sorted(added, key=lambda item: item[0])
+        lines = [np.asarray(points, dtype=np.float64).reshape(-1, 2) for _, points in added]
+        new_ids = np.array([edge_id for edge_id, _ in added], dtype=np.int64)
+        new_counts = np.array([len(points) for points in lines], dtype=np.int64)
+        at = np.searchsorted(ids, new_ids)
+        ids = np.insert(ids, at, new_ids)
+        if np.any(np.diff(ids) == 0):
+            raise ValueError("Duplicate edge ids in geometry")
+
+        starts = np.concatenate(([0], np.cumsum(counts)))[at]
+        if lines:
+            new_coords = (np.concatenate(lines) - self.origin).astype(self.encoding)
+            coords = np.insert(coords, np.repeat(starts, new_counts), new_coords, axis=0)
+        counts = np.insert(counts, at, new_counts)
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return EdgeGeometry(ids, offsets, np.ascontiguousarray(coords), self.origin)
+
+    def sections(self):
+        return ({"geom_ids": self.ids, "geom_offsets": self.offsets, "geom_coords": self.coords},
+                {"geom_origin": self.origin.tolist()})
+
+    # geometria z pliku .pfg (None, jeśli plik jej nie ma)
+    @classmethod
+    def from_graph_file(cls, graph_file):
+        if "geom_coords" not in graph_file:
+            return None
+        return cls(graph_file["geom_ids"], graph_file["geom_offsets"], graph_file["geom_coords"],
+                   graph_file.meta.get("geom_origin", (0.0, 0.0)))
+
+# indeksy start[i], ..., start[i] + count[i] - 1 kolejnych zakresów
+def _ranges(start, count):
+    begin = np.cumsum(count) - count
+    return np.repeat(start, count) + np.arange(count.sum()) - np.repeat(begin, count)
+
+# miejsce na linii najbliższe punktowi p (węzeł wirtualny z virtual_nodes leży na linii drogi - rzut punktu
+# na odcinki linii): (indeks odcinka, odległość wzdłuż linii, punkt)
+def _locate(xy, p):
+    if len(xy) < 2:
+        return 0, 0.0, xy[0]
+    a, d = xy[:-1], np.diff(xy, axis=0)
+    dd = (d ** 2).sum(axis=1)
+    t = np.clip(((p - a) * d).sum(axis=1) / np.where(dd > 0, dd, 1.0), 0.0, 1.0)
+    q = a + t[:, None] * d
+    i = int(np.argmin(((q - p) ** 2).sum(axis=1)))
+    return i, float(np.sqrt(dd[:i]).sum() + t[i] * np.sqrt(dd[i])), q[i]
+
+# część linii od punktu p do końca
+def _after(xy, p):
+    i, _, q = _locate(xy, p)
+    return np.vstack((q, xy[i + 1:]))
+
+# część linii od początku do punktu p
+def _before(xy, p):
+    i, _, q = _locate(xy, p)
+    return np.vstack((xy[:i + 1], q))
+
+# część linii między punktami p i q (od p do q, także gdy q leży przed p)
+def _between(xy, p, q):
+    i, s, pp = _locate(xy, p)
+    j, t, qq = _locate(xy, q)
+    if s <= t:
+        return np.vstack((pp, xy[i + 1:j + 1], qq))
+    return np.vstack((pp, xy[j + 1:i + 1][::-1], qq))
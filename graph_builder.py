@@ -0,0 +1,520 @@
+# Authors:  PAGistyczna Drużyna Cybergeodetów
+# Created:  2026-10-18
+#
+# Wsadowa budowa grafu CSR z tablic współrzędnych końców krawędzi (NumPy zamiast pętli Graph.generate_graph).
+# Łączenie końców w węzły daje dokładnie ten sam wynik co generate_graph (round_coords + temp_nodes):
+#   każdy koniec krawędzi ma 4 warianty zaokrąglenia - narożniki kwadratu 1 x 1 m siatki liczb całkowitych,
+#   w którym leży. Koniec, którego narożniki nie należą do żadnego innego kwadratu końców, tworzy węzeł
+#   (floor x, ceil y) - także wtedy, gdy w tym samym kwadracie leży wiele końców (skrzyżowanie).
+#   Końce, których kwadraty stykają się z innymi kwadratami, zależą od kolejności wierszy - są łączone
+#   pętlą z generate_graph (zwykle ułamek procenta końców).
+# NodeMerger - łączenie końców z wybraną tolerancją, niezależne od kolejności wierszy.
+
+from itertools import repeat
+import numpy as np
+
+_DIRECTIONS = {"both": 3, "ftl": 1, "ltf": 2}
+
+# węzły dla końców krawędzi x, y (w kolejności przetwarzania: początek i koniec wiersza 0, wiersza 1, ...):
+# (x węzłów, y węzłów, numer węzła dla każdego końca); węzły posortowane po (x, y)
+def merge_nodes(x, y):
+    fx = np.floor(x).astype(np.int64)
+    fy = np.floor(y).astype(np.int64)
+    dx = (np.ceil(x) != fx).astype(np.int64)       # 0 - współrzędna całkowita (floor == ceil)
+    dy = (np.ceil(y) != fy).astype(np.int64)
+
+    # punkty siatki jako jedna liczba: (px - x_min) * ny + (py - y_min)
+    x_min, y_min = int(fx.min()), int(fy.min())
+    ny = int(fy.max()) - y_min + 2
+    if (int(fx.max()) - x_min + 2) * ny * 4 >= 2 ** 62:
+        raise ValueError("Coordinate extent too large for integer node keys")
+    point = (fx - x_min) * ny + (fy - y_min)        # narożnik (floor x, floor y)
+
+    # kwadraty końców (bez powtórzeń) i ich narożniki w kolejności round_coords: xy, xy1, xy2, xy3
+    squares, square_of = np.unique(point * 4 + dx * 2 + dy, return_inverse=True)
+    base, sdx, sdy = squares // 4, (squares // 2) % 2, squares % 2
+    corners = np.stack((base + sdy, base + sdx * ny, base, base + sdx * ny + sdy), axis=1)
+
+    # kwadrat jest prosty, gdy żaden z jego narożników nie należy do innego kwadratu
+    distinct = np.ones(corners.shape, dtype=bool)
+    distinct[:, 1] = sdx == 1
+    distinct[:, 2] = sdy == 1
+    distinct[:, 3] = (sdx == 1) & (sdy == 1)
+    owners = np.repeat(np.arange(len(squares)), 4).reshape(corners.shape)
+    values, counts = np.unique(corners[distinct], return_counts=True)
+    shared = np.zeros(len(squares), dtype=bool)
+    shared[owners[distinct][counts[np.searchsorted(values, corners[distinct])] > 1]] = True
+
+    # prosty kwadrat - węzeł w narożniku xy; pozostałe końce - pętla z generate_graph
+    node_point = corners[square_of, 0]
+    rest = np.flatnonzero(shared[square_of])
+    if len(rest):
+        node_point[rest] = _merge_in_order(corners[square_of[rest]].tolist())
+
+    keys, node_of = np.unique(node_point, return_inverse=True)
+    return (keys // ny + x_min).astype(np.float64), (keys % ny + y_min).astype(np.float64), node_of
+
+# łączenie końców w kolejności wierszy jak w Graph.generate_graph - corners: [xy, xy1, xy2, xy3] dla każdego końca
+def _merge_in_order(corners):
+    temp_nodes = {}
+    nodes = []
+    for xy, xy1, xy2, xy3 in corners:
+        for cr in (xy, xy1, xy2, xy3):
+            if cr in temp_nodes:
+                xyf = temp_nodes[cr]
+                break
+        else:
+            xyf = xy
+        temp_nodes[xy] = xyf
+        temp_nodes[xy1] = xyf
+        temp_nodes[xy2] = xyf
+        temp_nodes[xy3] = xyf
+        nodes.append(xyf)
+    return nodes
+
+# kwadraty końców krawędzi z merge_nodes jako liczby: klucz narożnika (floor x, floor y) jak w _cell_keys o boku 1 m
+# i szerokość / wysokość kwadratu (0 dla współrzędnej całkowitej): klucz * 4 + dx * 2 + dy
+def square_codes(x, y):
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    dx = (np.ceil(x) != np.floor(x)).astype(np.int64)
+    dy = (np.ceil(y) != np.floor(y)).astype(np.int64)
+    return _cell_keys(x, y, 1.0) * 4 + dx * 2 + dy
+
+# kwadraty końców i ich węzły: (kody kwadratów rosnąco, węzeł kwadratu) - zapisywane z grafem (CSRGraph.squares),
+# żeby końce nowych dróg (graph_update) łączyć z węzłami jak merge_nodes: przez narożniki wspólne z kwadratami
+# wszystkich dotychczasowych końców, a nie tylko z narożnikiem, który został węzłem
+def end_squares(x, y, node_of):
+    codes, first = np.unique(square_codes(x, y), return_index=True)
+    return codes, np.asarray(node_of)[first].astype(np.int32)
+
+# kody kwadratów, do których należy narożnik (cx, cy) siatki liczb całkowitych: kwadraty z narożnikiem
+# (floor x, floor y) w (cx, cy), (cx - 1, cy), (cx, cy - 1) i (cx - 1, cy - 1) o odpowiedniej szerokości i wysokości
+def corner_squares(cx, cy):
+    key = int(_cell_keys(np.float64(cx), np.float64(cy), 1.0)) * 4
+    west, south = key - 4 * _STRIDE, key - 4
+    return np.array([key, key + 1, key + 2, key + 3, west + 2, west + 3, south + 1, south + 3, west - 4 + 3],
+                    dtype=np.int64)
+
+# łączenie końców krawędzi w odległości do tolerance [m] (niezależne od kolejności wierszy):
+#   punkty są grupowane przez union-find na parach punktów bliższych niż tolerance (pary z siatki
+#   o boku tolerance - tylko komórki sąsiednie), węzeł to średnia końców z grupy.
+#   Grupy są łączone łańcuchowo, więc odległość końca od węzła może przekroczyć tolerance (max_displacement).
+# Końce są dodawane paczkami (add) i od razu łączone w kaflach siatki o boku tile [m]: kafel przechowuje tylko swoje
+# różne punkty (bez kopii paczek) i ich grupy - kolejna paczka z punktami w tym kaflu łączy je z punktami kafla.
+# Nowe kafle paczki są od siebie niezależne - add(x, y, map) łączy je przez map (np. Pool.imap w build_parallel).
+# finish zszywa kafle: union-find tylko na punktach w odległości do tolerance od brzegu kafla (para bliższa niż
+# tolerance z różnych kafli ma oba punkty przy brzegu), wynik i statystyki - po finish.
+class NodeMerger:
+    def __init__(self, tolerance=1.0, tile=20000.0):
+        self.tolerance = tolerance
+        self.tile = max(float(tile), 2.0 * tolerance)
+        self.count = 0              # liczba dodanych końców
+        self.clusters = 0           # liczba grup z więcej niż jednym różnym punktem (po finish)
+        self.merged_points = 0      # liczba różnych punktów w tych grupach
+        self.max_displacement = 0.0 # największa odległość końca od jego węzła [m]
+        self._tiles = {}            # (tx, ty) -> numer kafla
+        self._points = []           # numer kafla -> _Tile
+        self._ends = []             # paczki: (numer kafla, numer punktu w kaflu) dla każdego końca
+
+    # dodanie końców; zwraca numer pierwszego z nich (numeracja w kolejności dodawania)
+    #   map - funkcja map dla nowych kafli (_new_tile), np. Pool.imap - łączenie w kaflach w procesach
+    def add(self, x, y, map=map):
+        first = self.count
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        self.count += len(x)
+        tile_no = np.empty(len(x), dtype=np.int32)
+        point_no = np.empty(len(x), dtype=np.int32)
+        if len(x):
+            tx = np.floor(x / self.tile).astype(np.int64)
+            ty = np.floor(y / self.tile).astype(np.int64)
+            key = (tx - tx.min()) * (int(ty.max() - ty.min()) + 1) + ty - ty.min()
+            order = np.argsort(key, kind="stable")
+            starts = np.flatnonzero(np.concatenate(([True], key[order][1:] != key[order][:-1])))
+            fresh = []
+            for a, b in zip(starts.tolist(), np.append(starts[1:], len(order)).tolist()):
+                ends = order[a:b]
+                t = self._tiles.setdefault((int(tx[ends[0]]), int(ty[ends[0]])), len(self._points))
+                tile_no[ends] = t
+                if t == len(self._points):
+                    self._points.append(None)
+                    fresh.append((t, ends))
+                else:
+                    point_no[ends] = _add_to_tile(self._points[t], x[ends], y[ends])
+            tasks = ((self.tolerance, x[ends], y[ends]) for _, ends in fresh)
+            for (t, ends), (tile, at) in zip(fresh, map(_new_tile, tasks)):
+                self._points[t] = tile
+                point_no[ends] = at
+        self._ends.append((tile_no, point_no))
+        return first
+
+
+    # (x węzłów, y węzłów, numer węzła dla każdego końca); węzły w kolejności kafli (CSRGraph.from_arcs i tak
+    # sortuje węzły). Sumy współrzędnych w kolejności kafli i punktów w kaflu, więc niezależne od kolejności wierszy.
+    def finish(self):
+        tolerance, size = self.tolerance, self.tile
+        xs, ys, weights, groups, border = [], [], [], [], []
+        point_group = [None] * len(self._points)    # numer kafla -> grupa każdego punktu (w kolejności dodania)
+        group_count = 0
+        for (tx, ty), t in sorted(self._tiles.items()):
+            tile = self._points[t]
+            px, py, weight, root = tile.x, tile.y, tile.weight, tile.root
+            order = np.lexsort((py, px))
+            # grupy kafla numerowane według najmniejszego punktu
+            roots, first = np.unique(root[order], return_index=True)
+            rank = np.empty(len(roots), dtype=np.int64)
+            rank[np.argsort(first)] = np.arange(len(roots))
+            group = group_count + rank[np.searchsorted(roots, root)]
+            group_count += len(roots)
+            point_group[t] = group
+            px, py = px[order], py[order]
+            xs.append(px)
+            ys.append(py)
+            weights.append(weight[order])
+            groups.append(group[order])
+            border.append((px - tx * size <= tolerance) | ((tx + 1) * size - px <= tolerance) |
+                          (py - ty * size <= tolerance) | ((ty + 1) * size - py <= tolerance))
+        self._points = []
+        px, py = np.concatenate(xs), np.concatenate(ys)
+        weight, group, border = np.concatenate(weights).astype(np.float64), np.concatenate(groups), np.concatenate(border)
+        del xs, ys, weights, groups
+
+        # zszycie kafli: pary punktów przy brzegach kafli
+        near = np.flatnonzero(border)
+        a, b = _close_pairs(px[near], py[near], tolerance)
+        root = _union(group_count, group[near[a]].tolist(), group[near[b]].tolist())
+        roots, cluster_of_group = np.unique(root, return_inverse=True)
+        cluster_of = cluster_of_group[group]
+
+        # węzeł - średnia końców w grupie
+        total = np.bincount(cluster_of, weights=weight)
+        node_x = np.bincount(cluster_of, weights=px * weight) / total
+        node_y = np.bincount(cluster_of, weights=py * weight) / total
+
+        sizes = np.bincount(cluster_of)
+        self.clusters = int(np.count_nonzero(sizes > 1))
+        self.merged_points = int(sizes[sizes > 1].sum())
+        if self.clusters:
+            self.max_displacement = float(np.hypot(px - node_x[cluster_of], py - node_y[cluster_of]).max())
+
+        # numery węzłów końców: kafel i punkt kafla -> grupa -> węzeł
+        base = np.concatenate(([0], np.cumsum([len(g) for g in point_group])))
+        node_of_point = cluster_of_group[np.concatenate(point_group)] if point_group else np.zeros(0, dtype=np.int64)
+        node_of = np.concatenate([node_of_point[base[tile_no] + point_no] for tile_no, point_no in self._ends]) \
+            if self._ends else np.zeros(0, dtype=np.int64)
+        self._tiles, self._ends = {}, []
+        return node_x, node_y, node_of
+
+# różne punkty jednego kafla NodeMerger i ich grupy (root - najmniejszy numer punktu grupy). Punkty są dopisywane
+# na końcu (numery punktów się nie zmieniają), a klucze komórek siatki o boku tolerance są trzymane posortowane -
+# nowe punkty są porównywane tylko z punktami sąsiednich komórek, bez ponownego sortowania i grupowania kafla.
+class _Tile:
+    def __init__(self, tolerance):
+        self.tolerance = tolerance
+        self.cell = tolerance if tolerance > 0 else 1.0
+        self.x = np.zeros(0)
+        self.y = np.zeros(0)
+        self.weight = np.zeros(0, dtype=np.int64)   # liczba końców w punkcie
+        self.root = np.zeros(0, dtype=np.int64)
+        self.keys = np.zeros(0, dtype=np.int64)     # klucze komórek punktów (rosnąco)
+        self.order = np.zeros(0, dtype=np.int64)    # numery punktów w kolejności keys
+
+    # różne punkty px, py z liczbami końców weight; zwraca numery punktów kafla
+    def add(self, px, py, weight):
+        n = len(self.x)
+        keys = _cell_keys(px, py, self.cell)
+        a, b = _pairs_with(px, py, keys, self.x, self.y, self.keys, self.order, self.tolerance)
+        same = (px[a] == self.x[b]) & (py[a] == self.y[b])
+        at = np.full(len(px), -1, dtype=np.int64)
+        at[a[same]] = b[same]
+        fresh = at < 0
+        count = int(np.count_nonzero(fresh))
+        at[fresh] = n + np.arange(count)
+        self.weight = np.concatenate((self.weight, np.zeros(count, dtype=np.int64)))
+        self.weight[at] += weight
+        if not count:
+            return at
+
+        # grupy: pary nowych punktów z punktami kafla i nowych punktów między sobą, union-find na korzeniach
+        self.x = np.concatenate((self.x, px[fresh]))
+        self.y = np.concatenate((self.y, py[fresh]))
+        fa, fb = _close_pairs(px[fresh], py[fresh], self.tolerance)
+        new = fresh[a]
+        pairs_a = np.concatenate((at[a[new]], n + np.asarray(fa, dtype=np.int64)))
+        pairs_b = np.concatenate((b[new], n + np.asarray(fb, dtype=np.int64)))
+        root = np.concatenate((self.root, n + np.arange(count)))
+        ids, pair_ids = np.unique(np.concatenate((root[pairs_a], root[pairs_b])), return_inverse=True)
+        remap = np.arange(len(root))
+        remap[ids] = ids[_union(len(ids), pair_ids[:len(pairs_a)].tolist(), pair_ids[len(pairs_a):].tolist())]
+        self.root = remap[root]
+
+        order = np.argsort(keys[fresh], kind="stable")
+        pos = np.searchsorted(self.keys, keys[fresh][order], "right")
+        self.keys = np.insert(self.keys, pos, keys[fresh][order])
+        self.order = np.insert(self.order, pos, n + order)
+        return at
+
+# końce w jednym kaflu; zwraca numery punktów kafla
+def _add_to_tile(tile, x, y):
+    px, py, point_of = _unique_points(x, y)
+    return tile.add(px, py, np.bincount(point_of, minlength=len(px)))[point_of]
+
+# nowy kafel z końców task = (tolerance, x, y): (_Tile, numery punktów kafla) - w procesach build_parallel
+def _new_tile(task):
+    tolerance, x, y = task
+    tile = _Tile(tolerance)
+    return tile, _add_to_tile(tile, x, y)
+
+# klucze komórek siatki o boku cell (komórki sąsiednie: klucz +- 1, +- _STRIDE)
+_STRIDE = 2 ** 32
+
+def _cell_keys(x, y, cell):
+    return np.floor(x / cell).astype(np.int64) * _STRIDE + np.floor(y / cell).astype(np.int64) + _STRIDE // 2
+
+# pary (punkt z x, y; punkt kafla) w odległości do tolerance - punkty kafla z komórki punktu i 8 sąsiednich
+# (trzy komórki sąsiednie w kolumnie siatki mają kolejne klucze - jeden zakres sorted_keys na kolumnę)
+#   sorted_keys, order - klucze komórek punktów kafla (rosnąco) i numery punktów w tej kolejności
+def _pairs_with(x, y, keys, tile_x, tile_y, sorted_keys, order, tolerance):
+    pairs_a, pairs_b = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+    if not len(sorted_keys):
+        return pairs_a[0], pairs_b[0]
+    for dx in (-1, 0, 1):
+        start = np.searchsorted(sorted_keys, keys + dx * _STRIDE - 1, "left")
+        count = np.searchsorted(sorted_keys, keys + dx * _STRIDE + 1, "right") - start
+        a = np.repeat(np.arange(len(x)), count)
+        b = order[np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count) + np.repeat(start, count)]
+        close = (x[a] - tile_x[b]) ** 2 + (y[a] - tile_y[b]) ** 2 <= tolerance * tolerance
+        pairs_a.append(a[close])
+        pairs_b.append(b[close])
+    return np.concatenate(pairs_a), np.concatenate(pairs_b)
+
+# różne punkty posortowane po (x, y): (x, y, numer punktu dla każdego wejścia).
+# Sortowanie po x, a po y tylko w grupach o równym x i różnych y (szybciej niż lexsort).
+def _unique_points(x, y):
+    order = np.argsort(x, kind="stable")
+    xs = x[order]
+    tie = np.flatnonzero(xs[1:] == xs[:-1])
+    if len(tie):
+        ys = y[order]
+        mixed = tie[ys[tie + 1] != ys[tie]]
+        if len(mixed):
+            run = np.cumsum(np.concatenate(([True], xs[1:] != xs[:-1]))) - 1
+            fix = np.flatnonzero(np.isin(run, run[mixed]))
+            order[fix] = order[fix][np.lexsort((ys[fix], run[fix]))]
+            xs = x[order]
+    ys = y[order]
+    new = np.ones(len(order), dtype=bool)
+    new[1:] = (xs[1:] != xs[:-1]) | (ys[1:] != ys[:-1])
+    point_of = np.empty(len(order), dtype=np.int64)
+    point_of[order] = np.cumsum(new) - 1
+    return xs[new], ys[new], point_of
+
+# pary punktów (i < j) w odległości do tolerance - siatka kwadratów o boku tolerance, komórka i jej sąsiedzi
+def _close_pairs(x, y, tolerance):
+    if tolerance <= 0 or len(x) < 2:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    cx = np.floor(x / tolerance).astype(np.int64)
+    cy = np.floor(y / tolerance).astype(np.int64)
+    cx -= cx.min()
+    cy -= cy.min()
+    ny = int(cy.max()) + 3
+    key = cx * ny + cy + 1
+    order = np.argsort(key, kind="stable")
+    sorted_key = key[order]
+
+    pairs_a, pairs_b = [], []
+    # ta sama komórka (kolejne punkty w komórce) i połowa sąsiadów - każda para komórek raz
+    for dx, dy in ((0, 0), (0, 1), (1, -1), (1, 0), (1, 1)):
+        start = np.searchsorted(sorted_key, sorted_key + dx * ny + dy, side="left")
+        stop = np.searchsorted(sorted_key, sorted_key + dx * ny + dy, side="right")
+        if dx == 0 and dy == 0:
+            start = np.arange(1, len(order) + 1)
+        count = np.maximum(stop - start, 0)
+        a = np.repeat(np.arange(len(order)), count)
+        b = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count) + np.repeat(start, count)
+        a, b = order[a], order[b]
+        close = (x[a] - x[b]) ** 2 + (y[a] - y[b]) ** 2 <= tolerance * tolerance
+        pairs_a.append(a[close])
+        pairs_b.append(b[close])
+    return np.concatenate(pairs_a).tolist(), np.concatenate(pairs_b).tolist()
+
+def _find(parent, a):
+    root = a
+    while root in parent:
+        root = parent[root]
+    while a != root:                    # skrócenie ścieżki
+        parent[a], a = root, parent[a]
+    return root
+
+# union-find na parach (a, b) elementów 0..n-1: korzeń (najmniejszy element grupy) każdego elementu
+def _union(n, pairs_a, pairs_b):
+    parent = {}
+    for a, b in zip(pairs_a, pairs_b):
+        ra, rb = _find(parent, a), _find(parent, b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+    root = np.arange(n)
+    if parent:
+        child = np.fromiter(parent, dtype=np.int64, count=len(parent))
+        root[child] = [_find(parent, a) for a in child.tolist()]
+    return root
+
+# graf CSR z tablic wierszy (jak w Graph.read_rows): końce krawędzi, ID, długość, klasa drogi, kierunek
+#   merger - NodeMerger (łączenie węzłów z tolerancją); domyślnie łączenie jak w Graph.generate_graph
+def build_graph(x0, y0, x1, y1, edge_ids, length, road_class, direction, data_fc=None, merger=None):
+    code, way = _class_way(road_class, direction)
+    return _build(x0, y0, x1, y1, edge_ids, length, code, way, data_fc, merger)
+
+# kod klasy drogi (indeks w csr_graph.ROAD_CLASSES) i kierunkowość: bit 1 - ftl, bit 2 - ltf
+def _class_way(road_class, direction):
+    from csr_graph import ROAD_CLASSES
+
+    codes = {name: i for i, name in enumerate(ROAD_CLASSES)}
+    code = np.fromiter(map(codes.__getitem__, road_class), dtype=np.uint8, count=len(road_class))
+    way = np.fromiter(map(_DIRECTIONS.get, direction, repeat(0)), dtype=np.int8, count=len(direction))
+    return code, way
+
+# prędkość [km/h] dla kodów klas dróg
+def _class_speed(code):
+    from toolbox_core import speed_dict
+
+    return np.array(list(speed_dict.values()), dtype=np.int64)[code]
+
+#   geometry - pełna geometria dróg (geometry.EdgeGeometry), zapisywana razem z grafem
+#   nodes    - węzły już połączone: (x węzłów, y węzłów, numer węzła każdego końca) - np. z NodeMerger zasilanego
+#              w trakcie odczytu (build_parallel)
+def _build(x0, y0, x1, y1, edge_ids, length, code, way, data_fc=None, merger=None, geometry=None, nodes=None):
+    from csr_graph import CSRGraph
+
+    squares = None
+    if nodes is not None:
+        node_x, node_y, node_of = nodes
+    else:
+        x = np.column_stack((x0, x1)).ravel()
+        y = np.column_stack((y0, y1)).ravel()
+        if merger is None:
+            node_x, node_y, node_of = merge_nodes(x, y)
+            squares = end_squares(x, y, node_of)
+        else:
+            merger.add(x, y)
+            node_x, node_y, node_of = merger.finish()
+    ends = node_of.reshape(-1, 2)
+
+    length = np.asarray(length, dtype=np.float64)
+    time = length / (_class_speed(code) * 1000 / 3600)
+    ftl = (way & 1) > 0
+    ltf = (way & 2) > 0
+
+    # krawędzie skierowane w kolejności generate_graph: wiersz po wierszu, najpierw ftl, potem ltf
+    keep = np.column_stack((ftl, ltf)).ravel()
+    src = ends.ravel()[keep]
+    dst = ends[:, ::-1].ravel()[keep]
+    row = np.repeat(np.arange(len(length)), 2)[keep]
+    g = CSRGraph.from_arcs(node_x, node_y, src, dst, np.asarray(edge_ids)[row], length[row], time[row], data_fc,
+                           code[row])
+    g.geometry = geometry
+    g.squares = squares
+    return g
+
+# graf CSR z pliku źródłowego: shp - kolumny z ShapefileReader.batches (_read_part, bez pętli po wierszach),
+# arcpy - wiersze kursora zebrane w tablice
+#   geometry - kodowanie pełnej geometrii dróg zapisywanej z grafem (geometry.ENCODINGS), None - bez geometrii
+def load_graph(data_fc, loader=None, merger=None, geometry="float32"):
+    from geometry import EdgeGeometry
+    from toolbox_core import arcpy, read_rows
+
+    if loader is None:
+        loader = "arcpy" if arcpy is not None else "shp"
+    if loader == "shp":
+        part = _read_part((data_fc, 0, None, 0))
+        shape = EdgeGeometry.from_parts(part[4], *part[8:], geometry) if geometry else None
+        return _build(*part[:8], data_fc=data_fc, merger=merger, geometry=shape)
+
+    rows = list(read_rows(data_fc, loader))
+    edge_ids, first, last, length, road_class, direction = zip(*rows)
+    first, last = np.array(first, dtype=np.float64), np.array(last, dtype=np.float64)
+    code, way = _class_way(road_class, direction)
+    shape = EdgeGeometry.from_parts(*_read_vertices(data_fc), geometry) if geometry else None
+    return _build(first[:, 0], first[:, 1], last[:, 0], last[:, 1], edge_ids, length, code, way, data_fc, merger,
+                  shape)
+
+# wierzchołki dróg przez arcpy: (ID, liczba wierzchołków, wierzchołki) - kursor z explode_to_points zwraca
+# wierzchołki kolejnych obiektów po kolei
+def _read_vertices(data_fc):
+    import toolbox_core as toolbox
+
+    ids, xy = [], []
+    with toolbox.arcpy.da.SearchCursor(data_fc, [toolbox.IDFIELD, "SHAPE@XY"], explode_to_points=True) as cursor:
+        for edge_id, point in cursor:
+            ids.append(edge_id)
+            xy.append(point)
+    ids = np.array(ids, dtype=np.int64)
+    starts = np.flatnonzero(np.concatenate(([True], ids[1:] != ids[:-1])))
+    return ids[starts], np.diff(np.append(starts, len(ids))), np.array(xy, dtype=np.float64).reshape(-1, 2)
+
+# graf z plików shp z równoległym odczytem (np. powiatowe pliki BDOT10k L4_1_BDOT10k__OT_SKJZ_L.shp):
+# pliki dzielone na części po chunk rekordów, części czytane w procesach (odczyt geometrii i DBF, prędkość,
+# kierunek) i odbierane w kolejności plików i rekordów, niezależnie od kolejności zakończenia procesów.
+# Z NodeMerger końce są po odczycie dzielone na kafle, a kafle łączone w tych samych procesach (_new_tile) - proces
+# główny tylko zszywa kafle (NodeMerger.finish). Łączenie round_coords (merger=None) i CSRGraph.from_arcs są
+# sekwencyjne w procesie głównym - przyspieszenie ogranicza ta część.
+# Wynik jest identyczny z load_graph dla jednego pliku.
+#   paths   - plik lub lista plików; ID krawędzi to FID + liczba rekordów poprzednich plików
+#   workers - liczba procesów (domyślnie liczba rdzeni)
+#   geometry - jak w load_graph
+# W Windows (spawn) wywołanie musi być chronione przez if __name__ == "__main__".
+def build_parallel(paths, workers=None, chunk=250_000, merger=None, geometry="float32"):
+    from multiprocessing import Pool
+    from geometry import EdgeGeometry
+    from shp_reader import ShapefileReader
+
+    if isinstance(paths, str):
+        paths = [paths]
+    tasks = []
+    id_offset = 0
+    for path in paths:
+        count = len(ShapefileReader(path))
+        tasks += [(path, start, min(start + chunk, count), id_offset) for start in range(0, count, chunk)]
+        id_offset += count
+
+    if workers == 1:
+        columns, nodes = _read_parts(tasks, merger, map)
+    else:
+        with Pool(workers) as pool:
+            columns, nodes = _read_parts(tasks, merger, pool.imap)
+    shape = EdgeGeometry.from_parts(columns[4], *columns[8:], geometry) if geometry else None
+    return _build(*columns[:8], data_fc=paths[0] if len(paths) == 1 else None, merger=merger, geometry=shape,
+                  nodes=nodes)
+
+# kolumny wszystkich części (_read_part) i węzły z NodeMerger (None - łączenie round_coords w _build):
+# odczyt części i łączenie kafli przez map, końce w kolejności wierszy jak w _build
+def _read_parts(tasks, merger, map):
+    parts = list(map(_read_part, tasks))
+    columns = [np.concatenate([part[i] for part in parts]) for i in range(10)]
+    del parts
+    if merger is None:
+        return columns, None
+    merger.add(np.column_stack((columns[0], columns[2])).ravel(), np.column_stack((columns[1], columns[3])).ravel(),
+               map)
+    return columns, merger.finish()
+
+# część pliku shp: kolumny liczbowe (x0, y0, x1, y1, ID, długość, kod klasy drogi, kierunek) rekordów z geometrią
+# oraz liczba wierzchołków tych rekordów i ich wierzchołki
+def _read_part(task):
+    from shp_reader import ShapefileReader
+
+    path, start, stop, id_offset = task
+    batches = list(ShapefileReader(path, ["KLASA_DROG", "DIRECTION"]).batches(start, stop, geometry=True))
+    if not batches:                     # pusty zakres rekordów
+        empty = np.zeros(0)
+        return [empty, empty, empty, empty, np.zeros(0, dtype=np.int64), empty] + list(_class_way([], [])) + \
+               [np.zeros(0, dtype=np.int64), np.zeros((0, 2))]
+    valid = np.concatenate([b["valid"] for b in batches])
+    columns = [np.concatenate([b[name] for b in batches])[valid] for name in ("x0", "y0", "x1", "y1", "fid", "length")]
+    columns[4] = columns[4] + id_offset
+    road_class = [c for b in batches for c, v in zip(b["KLASA_DROG"], b["valid"]) if v]
+    direction = [d for b in batches for d, v in zip(b["DIRECTION"], b["valid"]) if v]
+    counts = np.concatenate([b["counts"] for b in batches])[valid]
+    xy = np.concatenate([b["xy"] for b in batches]).reshape(-1, 2)
+    return columns + list(_class_way(road_class, direction)) + [counts, xy]
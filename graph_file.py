@@ -0,0 +1,283 @@
+# Authors:  PAGistyczna Drużyna Cybergeodetów
+# Created:  2026-10-18
+#
+# Binarny plik grafu (.pfg) odczytywany przez mmap - bez deserializacji obiektów.
+# Procesy na jednym komputerze współdzielą strony pliku w pamięci podręcznej systemu.
+#
+# Układ pliku (little-endian):
+#   nagłówek (64 B):  magic "PFGRAPH\0", wersja (u32), zarezerwowane (u32),
+#                     przesunięcie katalogu (u64), długość katalogu (u64), suma kontrolna katalogu (u32)
+#   sekcje:           tablice o stałej szerokości elementu, każda wyrównana do 64 B
+#   katalog (JSON):   {"meta": {...}, "sections": {nazwa: {dtype, shape, offset, crc32}}}
+# Katalog jest na końcu pliku - dopisanie sekcji nie wymaga przepisywania danych.
+# Suma kontrolna katalogu obejmuje sumy crc32 wszystkich sekcji, więc identyfikuje całą zawartość pliku.
+# Miejsce po zastąpionych i usuniętych sekcjach jest zapisywane w katalogu ("free", "released") i wykorzystywane
+# przy kolejnych dopisaniach (np. sekcje zmian grafu upd_*, graph_update).
+
+import json
+import mmap
+import os
+import struct
+import zlib
+import numpy as np
+
+MAGIC = b"PFGRAPH\0"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQQI24x")   # 64 B
+ALIGN = 64
+
+# sekcje z tablicami grafu CSR
+CSR_SECTIONS = ("x", "y", "offsets", "targets", "edge_ids", "length", "time")
+# sekcje zmian grafu (graph_update.GraphDelta) - graf z pliku to graf z sekcji CSR po tych zmianach
+DELTA_SECTIONS = ("upd_removed", "upd_x", "upd_y", "upd_src", "upd_dst", "upd_edge_ids", "upd_length", "upd_time",
+                  "upd_road_class", "upd_squares", "upd_square_nodes")
+
+class GraphFileError(Exception):
+    pass
+
+def _crc(array):
+    return zlib.crc32(memoryview(np.ascontiguousarray(array)).cast("B"))
+
+# suma kontrolna grafu z sum crc32 sekcji CSR (GraphFile.graph_checksum)
+def _graph_checksum(crcs):
+    return zlib.crc32(json.dumps(crcs).encode())
+
+# suma kontrolna grafu CSR przed zapisem (np. do metadanych zapisywanych razem z grafem)
+def graph_checksum(g):
+    return _graph_checksum([_crc(getattr(g, name)) for name in CSR_SECTIONS])
+
+def _padding(position):
+    return (-position) % ALIGN
+
+# zapis sekcji (słownik nazwa -> tablica NumPy) i metadanych do pliku
+def write_sections(path, sections, meta=None):
+    directory = {"meta": meta or {}, "sections": {}}
+    with open(path, "wb") as f:
+        f.write(b"\0" * HEADER.size)
+        position = _write_arrays(f, HEADER.size, sections, directory)
+        _write_directory(f, position, directory)
+
+# zapis tablic od pozycji position (plik ustawiony na tej pozycji) - zwraca pozycję końca danych
+#   free    - wolne obszary pliku [przesunięcie, rozmiar] (wyrównane do ALIGN) - tablica trafia do pierwszego
+#             wystarczającego, a reszta obszaru zostaje wolna; bez free - wszystko od position
+#   reserve - zapas za tablicą zapisaną na końcu (ułamek jej rozmiaru), od razu dopisywany do free - dla sekcji
+#             przepisywanych przy każdej zmianie, które powoli rosną (sekcje zmian grafu)
+def _write_arrays(f, position, sections, directory, free=None, reserve=0.0):
+    spare_holes = []
+    for name, array in sections.items():
+        array = np.ascontiguousarray(array)
+        array = array.astype(array.dtype.newbyteorder("<"), copy=False)
+        hole = next((h for h in free if h[1] >= array.nbytes), None) if free and array.nbytes else None
+        if hole is not None:
+            offset = hole[0]
+            used = array.nbytes + _padding(array.nbytes)
+            hole[0] += used
+            hole[1] -= used
+            if hole[1] <= 0:
+                free.remove(hole)
+            f.seek(offset)
+        else:
+            f.seek(position)
+            f.write(b"\0" * _padding(position))
+            position += _padding(position)
+            offset = position
+        directory["sections"][name] = {
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": offset,
+            "crc32": _crc(array),
+        }
+        f.write(memoryview(array).cast("B"))
+        if hole is None:
+            position += array.nbytes
+            spare = int(array.nbytes * reserve)
+            if spare:
+                start = position + _padding(position)
+                spare += _padding(spare)
+                f.write(b"\0" * (start + spare - position))
+                spare_holes.append([start, spare])
+                position = start + spare
+    if spare_holes:
+        free.extend(spare_holes)
+    return position
+
+# katalog na końcu pliku i aktualizacja nagłówka
+def _write_directory(f, position, directory):
+    raw = json.dumps(directory, ensure_ascii=False).encode("utf-8")
+    f.seek(position)
+    f.write(raw)
+    f.truncate()
+    f.seek(0)
+    f.write(HEADER.pack(MAGIC, VERSION, 0, position, len(raw), zlib.crc32(raw)))
+
+# dopisanie sekcji do istniejącego pliku (np. struktur przyspieszających zbudowanych później).
+# Dane istniejących sekcji nie są przesuwane - procesy, które mają plik otwarty przez mmap, mogą dalej z nich czytać.
+# Sekcja o istniejącej nazwie jest zastępowana, a sekcje remove usuwane. Ich miejsce jest zwalniane ("released")
+# i wykorzystywane dopiero przy następnym dopisaniu - procesy, które wczytały plik przed tą zmianą, czytają jeszcze
+# stare dane, a po zmianie sumy kontrolnej pliku (route_cache, routing_server) wczytują plik od nowa.
+#   reserve - zapas miejsca za sekcjami dopisanymi na końcu pliku (_write_arrays)
+def append_sections(path, sections, meta=None, remove=(), reserve=0.0):
+    with open(path, "r+b") as f:
+        magic, version, _, dir_offset, dir_len, checksum = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise GraphFileError(f"{path} is not a PathFinding graph file")
+        f.seek(dir_offset)
+        directory = json.loads(f.read(dir_len).decode("utf-8"))
+        directory["meta"].update(meta or {})
+
+        # obszary zwolnione przy poprzednim dopisaniu są już wolne, sąsiednie obszary łączone
+        free = _merge_holes(directory.pop("free", []) + directory.pop("released", []))
+        released = []
+        for name in list(sections) + [name for name in remove if name not in sections]:
+            info = directory["sections"].pop(name, None)
+            if info is not None:
+                size = np.dtype(info["dtype"]).itemsize * int(np.prod(info["shape"], dtype=np.int64))
+                if size:
+                    released.append([info["offset"], size + _padding(size)])
+        # wolny obszar tuż przed katalogiem - katalog (i dane dopisywane na końcu) przesuwa się na jego miejsce
+        position = dir_offset
+        while free and sum(free[-1]) >= position:
+            position = free.pop()[0]
+
+        position = _write_arrays(f, position, sections, directory, free, reserve)
+        directory["free"] = _merge_holes(free)
+        directory["released"] = _merge_holes(released)
+        _write_directory(f, position, directory)
+
+# wolne obszary [przesunięcie, rozmiar] posortowane, sąsiednie połączone
+def _merge_holes(holes):
+    merged = []
+    for offset, size in sorted(holes):
+        if merged and merged[-1][0] + merged[-1][1] >= offset:
+            merged[-1][1] = max(merged[-1][1], offset + size - merged[-1][0])
+        elif size > 0:
+            merged.append([offset, size])
+    return merged
+
+class GraphFile:
+    def __init__(self, path, verify=False):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, dir_offset, dir_len, checksum = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise GraphFileError(f"{path} is not a PathFinding graph file")
+        if version > VERSION:
+            raise GraphFileError(f"{path}: unsupported graph file version {version}")
+        raw = self._mm[dir_offset:dir_offset + dir_len]
+        if zlib.crc32(raw) != checksum:
+            raise GraphFileError(f"{path}: directory checksum mismatch")
+
+        directory = json.loads(raw.decode("utf-8"))
+        self.version = version
+        self.checksum = checksum        # zmienia się przy każdej zmianie zawartości pliku
+        # suma kontrolna samego grafu (sekcje CSR i sekcje zmian) - nie zmienia się po dopisaniu indeksów i heurystyk;
+        # base_checksum - tylko sekcje CSR (graf sprzed zmian z sekcji upd_*, bez nich równa graph_checksum)
+        crcs = [directory["sections"][name]["crc32"] for name in CSR_SECTIONS if name in directory["sections"]]
+        self.base_checksum = _graph_checksum(crcs)
+        self.graph_checksum = self.base_checksum
+        if "upd_src" in directory["sections"]:
+            self.graph_checksum = _graph_checksum(crcs + [directory["sections"][name]["crc32"]
+                                                          for name in DELTA_SECTIONS if name in directory["sections"]])
+        self.meta = directory["meta"]
+        self.section_info = directory["sections"]
+        self.sections = {}              # nazwa -> tablica NumPy na stronach mmap (tylko do odczytu)
+        for name, info in self.section_info.items():
+            dtype = np.dtype(info["dtype"])
+            count = int(np.prod(info["shape"], dtype=np.int64))
+            array = np.frombuffer(self._mm, dtype=dtype, count=count, offset=info["offset"])
+            self.sections[name] = array.reshape(info["shape"])
+
+        if verify:
+            self.verify()
+
+    # pełna weryfikacja sum kontrolnych (odczytuje cały plik)
+    def verify(self):
+        for name, info in self.section_info.items():
+            if _crc(self.sections[name]) != info["crc32"]:
+                raise GraphFileError(f"{self.path}: checksum mismatch in section '{name}'")
+
+    def __contains__(self, name):
+        return name in self.sections
+
+    def __getitem__(self, name):
+        return self.sections[name]
+
+    # graf CSR na tablicach z pliku. Plik ze zmianami (sekcje upd_*, graph_update.update_graph_file) - graf
+    # z sekcji CSR po tych zmianach, składany w pamięci (kopie tablic, do compact_graph_file);
+    # edits=False - graf z sekcji CSR bez zmian
+    def graph(self, edits=True):
+        from csr_graph import CSRGraph
+
+        from cost_profiles import load_profiles
+        from geometry import EdgeGeometry
+
+        g = CSRGraph(*(self.sections[name] for name in CSR_SECTIONS), data_fc=self.meta.get("data_fc"),
+                     road_class=self.sections.get("road_class"))
+        g.geometry = EdgeGeometry.from_graph_file(self)
+        if "node_squares" in self:
+            g.squares = (self.sections["node_squares"], self.sections["node_square_nodes"])
+        g.graph_file = self
+        if edits and "upd_src" in self:
+            from graph_update import GraphDelta
+            g = GraphDelta.from_graph_file(self).merge(g)
+            g.graph_file = self
+        load_profiles(g, self)
+        return g
+
+    # suma kontrolna grafu wczytanego z tego pliku: graph() - graph_checksum, graph(edits=False) - base_checksum
+    def checksum_of(self, graph):
+        return self.graph_checksum if getattr(graph, "_edits", None) is not None else self.base_checksum
+
+# sekcje i metadane grafu CSR (z klasami dróg i pełną geometrią dróg, jeśli graf je ma)
+def graph_sections(g):
+    sections = {name: getattr(g, name) for name in CSR_SECTIONS}
+    if getattr(g, "road_class", None) is not None:
+        sections["road_class"] = g.road_class
+    meta = {"data_fc": g.data_fc, "node_count": g.node_count, "edge_count": g.edge_count}
+    if getattr(g, "squares", None) is not None:
+        sections["node_squares"], sections["node_square_nodes"] = g.squares
+    if getattr(g, "geometry", None) is not None:
+        geometry_sections, geometry_meta = g.geometry.sections()
+        sections.update(geometry_sections)
+        meta.update(geometry_meta)
+    return sections, meta
+
+# zapis grafu CSR (opcjonalnie z dodatkowymi sekcjami, np. strukturami przyspieszającymi)
+def save_graph(path, g, extra=None, meta=None):
+    sections, graph_meta = graph_sections(g)
+    sections.update(extra or {})
+    graph_meta.update(meta or {})
+    write_sections(path, sections, graph_meta)
+
+# suma kontrolna pliku z nagłówka (jak GraphFile.checksum) bez odczytu katalogu - np. do sprawdzenia,
+# czy plik zmienił się od wczytania
+def file_checksum(path):
+    with open(path, "rb") as f:
+        magic, _, _, _, _, checksum = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC:
+        raise GraphFileError(f"{path} is not a PathFinding graph file")
+    return checksum
+
+def load_graph(path, verify=False):
+    return GraphFile(path, verify).graph()
+
+# konwersja pliku pickle z generate_launcher do pliku .pfg
+def convert_pickle(in_graph_file="PF_graph.pkl", out_graph_file="PF_graph.pfg"):
+    from csr_graph import CSRGraph, load_graph_pickle
+    from spatial_index import SpatialIndex
+
+    g = load_graph_pickle(in_graph_file)
+    if not isinstance(g, CSRGraph):
+        g = CSRGraph.from_graph(g)
+    save_graph(out_graph_file, g, *SpatialIndex.build(g).sections())
+    return out_graph_file
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) < 2:
+        print("usage: python graph_file.py in_graph_file.pkl [out_graph_file.pfg]")
+        sys.exit(1)
+    out = convert_pickle(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(sys.argv[1])[0] + ".pfg")
+    print(f"Created graph file '{out}'.")
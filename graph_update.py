@@ -0,0 +1,379 @@
+# Authors:  PAGistyczna Drużyna Cybergeodetów
+# Created:  2026-10-18
+#
+# Zmiany w grafie bez budowy od nowa z całej warstwy (np. po edycji dróg, edit_skjzl.py):
+#   added    - nowe drogi jako wiersze jak z read_rows: (ID, pierwszy punkt, ostatni punkt, długość, klasa drogi,
+#              kierunek)
+#   removed  - ID usuniętych dróg
+#   modified - zmienione drogi (wiersze jak added) - krawędzie o tym ID są zastępowane nowymi
+# Wiersz może mieć na końcu listę wierzchołków drogi (pełna geometria grafu, geometry); bez niej geometria nowej
+# drogi to odcinek między jej końcami.
+# Zmiany są zbierane w GraphDelta względem grafu bazowego (sekcje CSR pliku .pfg): ID usuniętych dróg, nowe węzły
+# i krawędzie skierowane nowych dróg - dodatkowe pozycje list sąsiedztwa węzłów. update_graph_file zapisuje w pliku
+# tylko sekcje zmian (upd_*) w miejscu poprzednich (graph_file.append_sections) - czas i rozmiar zapisu zależą od
+# liczby dróg zmienionych od ostatniego przepisania pliku, nie od rozmiaru grafu (100 dróg: kilka ms, kilka KB).
+# Graf z pliku (GraphFile.graph) to graf bazowy po zmianach składany w pamięci (GraphDelta.merge - kopie tablic);
+# gdy zmian przybędzie (compact), compact_graph_file przepisuje plik ze zmianami w sekcjach grafu.
+# Struktury pomocnicze zapisane dla grafu bazowego: indeks przestrzenny i model pory dnia są poprawiane o zmiany
+# przy odczycie (tylko wpisy zmienionych dróg i węzłów), profile kosztów przeliczane przy pierwszym użyciu
+# (cost_profiles.profile). Heurystyki ALT (w pliku) i hierarchie CH (obok pliku) zależą od odległości w całym
+# grafie - są zapisane z sumą kontrolną grafu, więc po zmianie są nieaktualne i budowane od nowa przy następnym
+# użyciu (routing_server.prepare_graph_file zapisuje je od nowa).
+
+import math
+import os
+import numpy as np
+
+# tablice zmian (sekcje upd_<nazwa> pliku .pfg) i ich typy
+DELTA_FIELDS = {"removed": np.int64, "x": np.float64, "y": np.float64, "src": np.int64, "dst": np.int64,
+                "edge_ids": np.int32, "length": np.float64, "time": np.float64, "road_class": np.uint8,
+                "squares": np.int64, "square_nodes": np.int64}
+# update_graph_file: przepisanie pliku, gdy sekcje zmian mają więcej krawędzi niż ta część krawędzi grafu
+COMPACT = 0.05
+
+# zmiany grafu bazowego o node_count węzłach:
+#   removed               - ID dróg grafu bazowego, których krawędzie wypadają (usunięte i zmienione drogi)
+#   x, y                  - nowe węzły (numery node_count, node_count + 1, ...)
+#   src, dst              - krawędzie skierowane nowych dróg (numery węzłów grafu bazowego i nowych węzłów)
+#                           w kolejności zmian
+#   edge_ids, length, time, road_class - jak w CSRGraph
+#   squares, square_nodes - kwadraty końców nowych dróg (graph_builder.end_squares) i ich węzły
+#   geometry              - linie nowych dróg (geometry.EdgeGeometry, float64; None - graf bez pełnej geometrii)
+class GraphDelta:
+    def __init__(self, node_count, arrays=None, geometry=None):
+        self.node_count = node_count
+        for name, dtype in DELTA_FIELDS.items():
+            setattr(self, name, np.array((arrays or {}).get(name, ()), dtype=dtype))
+        self.geometry = geometry
+
+    # zmiany z pliku .pfg (kopie tablic - plik jest przepisywany przy kolejnej zmianie); None - plik bez zmian
+    @classmethod
+    def from_graph_file(cls, graph_file):
+        from geometry import EdgeGeometry
+
+        if "upd_src" not in graph_file:
+            return None
+        geometry = None
+        if "upd_geom_coords" in graph_file:
+            geometry = EdgeGeometry(*(np.array(graph_file["upd_geom_" + name])
+                                      for name in ("ids", "offsets", "coords")))
+        arrays = {name: graph_file["upd_" + name] for name in DELTA_FIELDS if "upd_" + name in graph_file}
+        return cls(graph_file.meta["upd_node_count"], arrays, geometry)
+
+    @property
+    def edge_count(self):
+        return len(self.src)
+
+    # sekcje i metadane do zapisu w pliku .pfg
+    def sections(self):
+        sections = {"upd_" + name: getattr(self, name) for name in DELTA_FIELDS}
+        if self.geometry is not None:
+            sections.update({"upd_" + name: array for name, array in self.geometry.sections()[0].items()})
+        return sections, {"upd_node_count": self.node_count}
+
+    # kolejna zmiana: drogi drop wypadają (nowe drogi z wcześniejszych zmian - z tablic zmian, drogi grafu
+    # bazowego - przez removed), drogi rows dochodzą z końcami połączonymi z węzłami grafu bazowego i wcześniejszych
+    # zmian (_edit_nodes)
+    def edit(self, graph, rows, drop, tolerance=None):
+        from geometry import EdgeGeometry
+        from graph_builder import _class_speed, _class_way
+
+        drop = np.fromiter(drop, dtype=np.int64)
+        self.removed = np.union1d(self.removed, drop)
+        keep = ~np.isin(self.edge_ids, drop)
+        for name in ("src", "dst", "edge_ids", "length", "time", "road_class"):
+            setattr(self, name, getattr(self, name)[keep])
+        if self.geometry is not None:
+            self.geometry = self.geometry.replace(drop)
+        self._prune()
+        if not rows:
+            return
+
+        ends, points, squares = _edit_nodes(graph, self, rows, tolerance)
+        ends = np.array(ends, dtype=np.int64).reshape(-1, 2)
+        points = np.array(points, dtype=np.float64).reshape(-1, 2)
+        self.x = np.concatenate((self.x, points[:, 0]))
+        self.y = np.concatenate((self.y, points[:, 1]))
+        if squares is not None:
+            codes = np.array(sorted(squares), dtype=np.int64)
+            self.squares, self.square_nodes = codes, np.array([squares[c] for c in codes.tolist()], dtype=np.int64)
+
+        # krawędzie skierowane nowych dróg w kolejności generate_graph: wiersz po wierszu, najpierw ftl, potem ltf
+        code, way = _class_way([row[4] for row in rows], [row[5] for row in rows])
+        length = np.array([row[3] for row in rows], dtype=np.float64)
+        time = length / (_class_speed(code) * 1000 / 3600)
+        add = np.column_stack(((way & 1) > 0, (way & 2) > 0)).ravel()
+        row = np.repeat(np.arange(len(rows)), 2)[add]
+        self.src = np.concatenate((self.src, ends.ravel()[add]))
+        self.dst = np.concatenate((self.dst, ends[:, ::-1].ravel()[add]))
+        self.edge_ids = np.concatenate((self.edge_ids, np.array([r[0] for r in rows], dtype=np.int32)[row]))
+        self.length = np.concatenate((self.length, length[row]))
+        self.time = np.concatenate((self.time, time[row]))
+        self.road_class = np.concatenate((self.road_class, code[row].astype(np.uint8)))
+
+        if graph.geometry is not None:
+            lines = [(r[0], r[6] if len(r) > 6 else (r[1], r[2])) for r in rows]
+            if self.geometry is None:
+                xy = [np.asarray(points, dtype=np.float64).reshape(-1, 2) for _, points in lines]
+                self.geometry = EdgeGeometry.from_parts([edge_id for edge_id, _ in lines], [len(p) for p in xy],
+                                                        np.concatenate(xy), "float64")
+            else:
+                self.geometry = self.geometry.replace((), lines)
+
+    # nowe węzły bez krawędzi (po usunięciu ich dróg) wypadają razem z kwadratami, pozostałe są numerowane od nowa
+    def _prune(self):
+        n = self.node_count
+        used = np.zeros(len(self.x), dtype=bool)
+        used[self.src[self.src >= n] - n] = True
+        used[self.dst[self.dst >= n] - n] = True
+        if used.all():
+            return
+        renumber = np.arange(n + len(used))
+        renumber[n:] = n + np.cumsum(used) - 1
+        renumber[n:][~used] = -1
+        self.x, self.y = self.x[used], self.y[used]
+        self.src, self.dst = renumber[self.src], renumber[self.dst]
+        nodes = renumber[self.square_nodes]
+        self.squares, self.square_nodes = self.squares[nodes >= 0], nodes[nodes >= 0]
+
+    # linie nowych dróg (ID, wierzchołki)
+    def _lines(self):
+        if self.geometry is None:
+            return []
+        offsets = self.geometry.offsets
+        return [(edge_id, self.geometry.coords[offsets[i]:offsets[i + 1]])
+                for i, edge_id in enumerate(self.geometry.ids.tolist())]
+
+    # graf CSR po zmianach - taki sam jak zbudowany od nowa (CSRGraph.from_arcs), ale bez sortowania wszystkich
+    # węzłów i krawędzi: pozostałe węzły i krawędzie zachowują kolejność, a nowe są wstawiane w swoje miejsca
+    # (np.insert). W g._edits zostają dane do poprawienia struktur grafu bazowego (indeks, model pory dnia).
+    def merge(self, graph):
+        from csr_graph import CSRGraph
+
+        n = graph.node_count
+        if n != self.node_count:
+            raise ValueError(f"Graph changes were recorded for a graph with {self.node_count} nodes, not {n}")
+        src, dst = graph.arc_sources(), np.asarray(graph.targets)
+        keep = ~np.isin(graph.edge_ids, self.removed)
+        points = np.column_stack((self.x, self.y))
+
+        # końce usuniętych dróg, z których nie wychodzi ani do których nie prowadzi już żadna krawędź - usuwane
+        # (graf zbudowany od nowa też by ich nie miał)
+        used = np.zeros(n + len(points), dtype=bool)
+        used[src[keep]] = True
+        used[dst[keep]] = True
+        used[self.src] = True
+        used[self.dst] = True
+        ends_removed = np.concatenate((src[~keep], dst[~keep]))
+        alive = np.ones(n + len(points), dtype=bool)
+        alive[ends_removed[~used[ends_removed]]] = False
+
+        # nowa numeracja węzłów (porządek (x, y) jak w from_arcs): nowe węzły wstawione między węzły grafu bazowego
+        new_id = _node_numbering(graph, points, alive)
+        x = np.empty(int(alive.sum()))
+        y = np.empty(len(x))
+        x[new_id[alive]] = np.concatenate((graph.x, points[:, 0]))[alive]
+        y[new_id[alive]] = np.concatenate((graph.y, points[:, 1]))[alive]
+
+        # krawędzie: nowe krawędzie węzła za jego pozostałymi krawędziami (jak sortowanie stabilne w from_arcs)
+        kept_src = new_id[src[keep]]
+        new_src = new_id[self.src]
+        order = np.argsort(new_src, kind="stable")
+        at = np.searchsorted(kept_src, new_src[order], "right")
+        offsets = np.zeros(len(x) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(kept_src, minlength=len(x)) + np.bincount(new_src, minlength=len(x)), out=offsets[1:])
+        g = CSRGraph(
+            x, y, offsets,
+            np.insert(new_id[dst[keep]], at, new_id[self.dst][order]).astype(np.int32),
+            np.insert(graph.edge_ids[keep], at, self.edge_ids[order]).astype(np.int32),
+            np.insert(graph.length[keep], at, self.length[order]),
+            np.insert(graph.time[keep], at, self.time[order]),
+            graph.data_fc,
+            np.insert(graph.road_class[keep], at, self.road_class[order]) if graph.road_class is not None else None
+        )
+        if graph.geometry is not None:
+            g.geometry = graph.geometry.replace(self.removed, self._lines())
+        if graph.squares is not None:
+            codes = np.concatenate((graph.squares[0], self.squares))
+            nodes = new_id[np.concatenate((graph.squares[1], self.square_nodes))]
+            codes, nodes = codes[nodes >= 0], nodes[nodes >= 0]
+            codes, first = np.unique(codes, return_index=True)
+            g.squares = (codes, nodes[first].astype(np.int32))
+
+        # pozycje nowych krawędzi po np.insert i pierwsza krawędź skierowana każdej nowej drogi (odcinki indeksu)
+        inserted = at + np.arange(len(at))
+        _, first = np.unique(self.edge_ids[order], return_index=True)
+        g._edits = {"removed": self.removed, "roads": inserted[first], "inserted": inserted, "keep": keep,
+                    "new_id": new_id, "base": graph}
+        return g
+
+# nowy graf CSR po zmianach (w pamięci)
+#   tolerance - końce nowych dróg łączone z najbliższym węzłem w tej odległości [m] (jak graph_builder.NodeMerger);
+#               domyślnie jak merge_nodes / Graph.generate_graph (narożniki round_coords)
+# Indeks przestrzenny starego grafu (w pamięci albo w pliku) jest zmieniany tylko dla zmienionych dróg.
+def apply_edits(graph, added=(), removed=(), modified=(), tolerance=None):
+    from spatial_index import SpatialIndex
+
+    delta = GraphDelta(graph.node_count)
+    delta.edit(graph, list(added) + list(modified), set(removed) | {row[0] for row in modified}, tolerance)
+    g = delta.merge(graph)
+    index = graph._index if graph._index is not None else SpatialIndex.from_graph_file(graph)
+    if index is not None:
+        g._index = index.patch(g, delta.removed, g._edits["roads"], g._edits["new_id"])
+    return g
+
+# numer w nowym grafie dla węzłów starego grafu i nowych węzłów points (-1 - węzeł usunięty, ~alive)
+def _node_numbering(graph, points, alive):
+    n = graph.node_count
+    # miejsce nowego węzła wśród węzłów starego grafu (przed węzłem o tym numerze)
+    order = np.lexsort((points[:, 1], points[:, 0]))
+    place = np.empty(len(points), dtype=np.int64)
+    for i in order.tolist():
+        lo = int(np.searchsorted(graph.x, points[i, 0], "left"))
+        hi = int(np.searchsorted(graph.x, points[i, 0], "right"))
+        place[i] = lo + int(np.searchsorted(graph.y[lo:hi], points[i, 1], "left"))
+
+    before = np.concatenate(([0], np.cumsum(alive[:n])))      # pozostałe węzły starego grafu przed danym numerem
+    rank = np.empty(len(points), dtype=np.int64)
+    rank[order] = np.arange(len(points))
+    new_id = np.empty(n + len(points), dtype=np.int64)
+    new_id[:n] = before[:-1] + np.searchsorted(np.sort(place), np.arange(n), "right")
+    new_id[n:] = before[place] + rank
+    new_id[~alive] = -1
+    return new_id
+
+# kwadraty końców grafu (CSRGraph.squares), a dla grafu bez nich (np. z pliku pickle) - kwadraty 1 x 1 m
+# z węzłem w narożniku (floor x, ceil y) jak dla końca o niecałkowitych współrzędnych
+def _node_squares(graph):
+    from graph_builder import square_codes
+
+    if graph.squares is not None:
+        return np.asarray(graph.squares[0]), np.asarray(graph.squares[1])
+    codes = square_codes(np.asarray(graph.x) + 0.5, np.asarray(graph.y) - 0.5)
+    order = np.argsort(codes, kind="stable")
+    return codes[order], order
+
+# węzły końców nowych dróg (kolejno początek i koniec każdego wiersza), współrzędne nowych węzłów i kwadraty końców
+# (kod -> węzeł, razem z kwadratami wcześniejszych zmian; None przy tolerance):
+#   tolerance None - jak merge_nodes: koniec należy do węzła kwadratu (grafu bazowego, wcześniejszych zmian albo
+#                    wcześniejszego końca), do którego należy narożnik jego kwadratu - narożniki w kolejności
+#                    round_coords; bez takiego kwadratu - nowy węzeł w narożniku (floor x, ceil y)
+#   tolerance      - najbliższy węzeł grafu bazowego albo nowy węzeł w odległości do tolerance
+def _edit_nodes(graph, delta, rows, tolerance):
+    from graph_builder import corner_squares, square_codes
+    from toolbox_core import round_coords
+
+    n = graph.node_count
+    first = n + len(delta.x)            # numer pierwszego nowego węzła tej zmiany
+    points = []
+    ends = []
+    if tolerance is None:
+        codes, nodes = _node_squares(graph)
+        squares = dict(zip(delta.squares.tolist(), delta.square_nodes.tolist()))
+        for row in rows:
+            for coords in (row[1], row[2]):
+                variants = round_coords(coords)
+                v = None
+                for cr in variants:
+                    v = _corner_node(corner_squares(*cr), codes, nodes, squares)
+                    if v is not None:
+                        break
+                if v is None:
+                    v = first + len(points)
+                    points.append(variants[0])
+                squares.setdefault(int(square_codes(coords[0], coords[1])), v)
+                ends.append(v)
+        return ends, points, squares
+
+    index = graph.spatial_index()
+    known = list(zip(delta.x.tolist(), delta.y.tolist()))      # węzły wcześniejszych zmian i nowe węzły
+    for row in rows:
+        for coords in (row[1], row[2]):
+            best = index.nearest_node(coords, tolerance)
+            for i, p in enumerate(known):
+                d = math.hypot(p[0] - coords[0], p[1] - coords[1])
+                if d <= tolerance and (best is None or d < best[1]):
+                    best = (n + i, d)
+            if best is None:
+                v = first + len(points)
+                points.append((coords[0], coords[1]))
+                known.append(points[-1])
+            else:
+                v = best[0]
+            ends.append(v)
+    return ends, points, None
+
+# węzeł kwadratu z narożnikiem candidates (graph_builder.corner_squares): kwadraty grafu (codes, nodes)
+# albo zmian (squares); przy kilku - najmniejszy numer (węzeł wcześniejszy w grafie); None - brak
+def _corner_node(candidates, codes, nodes, squares):
+    found = [squares[c] for c in candidates.tolist() if c in squares]
+    if len(codes):
+        pos = np.minimum(np.searchsorted(codes, candidates), len(codes) - 1)
+        hit = codes[pos] == candidates
+        found += nodes[pos[hit]].tolist()
+    return min(found) if found else None
+
+# zmiany zapisane w pliku .pfg: sekcje zmian w miejscu poprzednich (tablice grafu, geometria, indeks i inne
+# struktury nie są przepisywane)
+#   compact - gdy sekcje zmian mają więcej krawędzi niż ta część krawędzi grafu - compact_graph_file;
+#             None - bez przepisywania pliku
+def update_graph_file(path, added=(), removed=(), modified=(), tolerance=None, compact=COMPACT):
+    from graph_file import GraphFile, append_sections
+
+    f = GraphFile(path)
+    graph = f.graph(edits=False)
+    delta = GraphDelta.from_graph_file(f) or GraphDelta(graph.node_count)
+    delta.edit(graph, list(added) + list(modified), set(removed) | {row[0] for row in modified}, tolerance)
+    sections, meta = delta.sections()
+    # indeks i heurystyki ALT zapisane bez sumy kontrolnej grafu - oznaczenie sumą grafu sprzed tej zmiany
+    if "si_grid" in f.meta:
+        meta["si_graph_checksum"] = f.meta.get("si_graph_checksum", f.graph_checksum)
+    for name in f.meta:
+        if name.startswith("alt_") and name.endswith("_scale"):
+            prefix = name[:-len("_scale")]
+            meta[prefix + "_graph_checksum"] = f.meta.get(prefix + "_graph_checksum", f.graph_checksum)
+    meta["updates"] = f.meta.get("updates", 0) + 1
+    edge_count = graph.edge_count
+    del f, graph
+    # zapas miejsca za sekcjami zmian - kolejne zmiany mieszczą się w tym samym miejscu pliku
+    append_sections(path, sections, meta, reserve=1.0)
+    if compact is not None and delta.edge_count > compact * edge_count:
+        compact_graph_file(path)
+
+# przepisanie pliku bez miejsca po zastąpionych sekcjach; plik ze zmianami - ze zmianami w sekcjach grafu (znów
+# czytany bez kopiowania tablic), z indeksem przestrzennym i modelem pory dnia poprawionymi o zmiany i profilami
+# kosztów przeliczonymi z zapisanych definicji (nieaktualne heurystyki ALT nie są przepisywane).
+# Nowy plik podmieniany na koniec - procesy z otwartym starym plikiem czytają go dalej.
+def compact_graph_file(path):
+    from cost_profiles import add_profile, profile_sections
+    from graph_file import GraphFile, graph_checksum, graph_sections, write_sections
+    from time_dependent import TimeDependentModel
+
+    f = GraphFile(path)
+    tmp = path + ".tmp"
+    if "upd_src" not in f:
+        write_sections(tmp, f.sections, f.meta)
+    else:
+        graph = f.graph()
+        checksum = graph_checksum(graph)
+        meta = {name: value for name, value in f.meta.items()
+                if not name.startswith(("upd_", "si_", "alt_", "td_", "cost_", "geom_"))}
+        sections, graph_meta = graph_sections(graph)
+        meta.update(graph_meta)
+        index_sections, index_meta = graph.spatial_index().sections()
+        sections.update(index_sections)
+        meta.update(index_meta, si_graph_checksum=checksum)
+        model = TimeDependentModel.from_graph_file(graph)
+        if model is not None:
+            model_sections, model_meta = model.sections()
+            sections.update(model_sections)
+            meta.update(model_meta, td_graph_checksum=checksum)
+        profiles = [add_profile(graph, name, d.get("speeds"), d.get("overrides"))
+                    for name, d in f.meta.get("profiles", {}).items()]
+        cost_sections, cost_meta = profile_sections(graph, profiles, checksum)
+        sections.update(cost_sections)
+        meta.update(cost_meta)
+        write_sections(tmp, sections, meta)
+        del graph, model, profiles, sections
+    del f
+    os.replace(tmp, path)
@@ -0,0 +1,190 @@
+# Authors:  PAGistyczna Drużyna Cybergeodetów
+# Created:  2026-10-18
+#
+# Izochrony (wielokąty zasięgu) z wyniku reach bez triangulacji Delaunaya wszystkich osiągniętych węzłów.
+#   1. krawędzie w zasięgu są próbkowane co pół komórki siatki; czas w punkcie krawędzi to czas dotarcia
+#      do jej początku + ułamek kosztu krawędzi, więc krawędzie osiągnięte częściowo kończą się na granicy czasu
+#   2. każda komórka siatki dostaje najmniejszy czas z próbek w niej leżących, a następnie najmniejszy czas
+#      z komórek w promieniu buffer (bufor wokół dróg)
+#   3. dla każdego progu komórki o czasie <= próg są obrysowywane - granice komórek łączone w pierścienie
+# Jedna siatka czasów obsługuje wszystkie progi (zagnieżdżone izochrony z jednego przeszukiwania).
+# Wielokąt to lista pierścieni [zewnętrzny, dziury...], pierścień - lista (x, y) z powtórzonym pierwszym punktem;
+# pierścień zewnętrzny jest przeciwny do ruchu wskazówek zegara, dziury - zgodne (jak w GeoJSON).
+
+import math
+import numpy as np
+
+# wielokąty izochron: lista (dla każdego progu) list wielokątów
+#   r          - wynik reach.reach (także z wieloma źródłami i węzłami wirtualnymi)
+#   thresholds - progi w metryce przeszukiwania (domyślnie limit przeszukiwania)
+#   cell       - bok komórki siatki [m]
+#   buffer     - szerokość pasa wokół osiągniętych dróg [m]
+#   min_hole   - dziury o mniejszej powierzchni [m2] są wypełniane (jak alpha w otoczce wklęsłej)
+def isochrones(r, thresholds=None, cell=25.0, buffer=100.0, min_hole=40000.0):
+    thresholds = sorted(thresholds) if thresholds is not None else [r.limit]
+    r._limit(thresholds[-1])
+    raster, x0, y0 = time_grid(r, thresholds[-1], cell, buffer)
+    return [_polygons(raster <= t, x0, y0, cell, min_hole) for t in thresholds]
+
+# siatka najmniejszych czasów dotarcia (inf - poza zasięgiem): (tablica ny x nx, x0, y0 lewego dolnego narożnika)
+def time_grid(r, limit, cell=25.0, buffer=100.0):
+    ax, ay, bx, by, da, w = _arcs(r, limit)
+    if len(da) == 0:
+        return np.full((1, 1), math.inf), 0.0, 0.0
+
+    # próbki co najwyżej co pół komórki (także początek i koniec krawędzi)
+    length = np.hypot(bx - ax, by - ay)
+    k = np.maximum(np.ceil(length / (cell / 2)).astype(np.int64), 1)
+    owner = np.repeat(np.arange(len(k)), k + 1)
+    f = (np.arange(len(owner)) - np.repeat(np.cumsum(k + 1) - (k + 1), k + 1)) / k[owner]
+    t = da[owner] + f * w[owner]
+    keep = t <= limit
+    owner, f, t = owner[keep], f[keep], t[keep]
+    px = ax[owner] + f * (bx - ax)[owner]
+    py = ay[owner] + f * (by - ay)[owner]
+
+    # siatka obejmująca próbki z marginesem bufora
+    b = int(math.ceil(buffer / cell))
+    x0 = math.floor(px.min() / cell) * cell - (b + 1) * cell
+    y0 = math.floor(py.min() / cell) * cell - (b + 1) * cell
+    nx = int((px.max() - x0) // cell) + b + 2
+    ny = int((py.max() - y0) // cell) + b + 2
+    ix = ((px - x0) // cell).astype(np.int64)
+    iy = ((py - y0) // cell).astype(np.int64)
+    base = np.full(ny * nx, math.inf)
+    np.minimum.at(base, iy * nx + ix, t)
+    base = base.reshape(ny, nx)
+
+    # bufor - najmniejszy czas w kole o promieniu buffer (przesunięcia siatki)
+    raster = base.copy()
+    for di in range(-b, b + 1):
+        for dj in range(-b, b + 1):
+            if (di == 0 and dj == 0) or di * di + dj * dj > b * b:
+                continue
+            dst = raster[max(di, 0):ny + min(di, 0), max(dj, 0):nx + min(dj, 0)]
+            np.minimum(dst, base[max(-di, 0):ny + min(-di, 0), max(-dj, 0):nx + min(-dj, 0)], out=dst)
+    return raster, x0, y0
+
+# krawędzie skierowane z osiągniętym początkiem: współrzędne końców, czas dotarcia do początku, koszt
+def _arcs(r, limit):
+    g = r.graph
+    n = g.node_count
+    x, y = np.asarray(g.x), np.asarray(g.y)
+    src, dst = g.arc_sources(), np.asarray(g.targets)
+    dist = r.dist
+    sel = np.flatnonzero(dist[:n][src] <= limit)
+    src, dst = src[sel], dst[sel]
+    arcs = [x[src], y[src], x[dst], y[dst], dist[:n][src], np.asarray(getattr(g, r.cost))[sel]]
+
+    # krawędzie węzłów wirtualnych (fragmenty krawędzi grafu od punktu rzutu)
+    virtual = r.virtual
+    if virtual:
+        w = getattr(g, r.cost)
+        extra = [(virtual.coords(u), virtual.coords(v), dist[u], f * w[k])
+                 for u, out in virtual.out.items() if dist[u] <= limit for v, k, f in out]
+        if extra:
+            a = np.array([e[0] for e in extra], dtype=np.float64)
+            b = np.array([e[1] for e in extra], dtype=np.float64)
+            more = [a[:, 0], a[:, 1], b[:, 0], b[:, 1], np.array([e[2] for e in extra]), np.array([e[3] for e in extra])]
+            arcs = [np.concatenate((arc, m)) for arc, m in zip(arcs, more)]
+    return arcs
+
+# obrys komórek mask (ny x nx) - wielokąty w układzie współrzędnych siatki
+def _polygons(mask, x0, y0, cell, min_hole):
+    ny, nx = mask.shape
+    m = np.zeros((ny + 2, nx + 2), dtype=bool)
+    m[1:-1, 1:-1] = mask
+    W = nx + 3                                          # wierzchołki siatki: v = i * W + j (z obramowaniem)
+
+    # krawędzie granicy skierowane tak, że komórka wypełniona jest po lewej: kierunki 0: +x, 1: +y, 2: -x, 3: -y
+    # (dolna, prawa, górna i lewa krawędź komórki, której sąsiad z tej strony jest pusty)
+    inner = m[1:-1, 1:-1]
+    parts = []
+    for d, other, (si, sj) in ((0, m[:-2, 1:-1], (0, 0)), (1, m[1:-1, 2:], (0, 1)),
+                               (2, m[2:, 1:-1], (1, 1)), (3, m[1:-1, :-2], (1, 0))):
+        i, j = np.nonzero(inner & ~other)
+        parts.append((np.full(len(i), d, dtype=np.int8), (i + 1 + si) * W + j + 1 + sj))
+    direction = np.concatenate([p[0] for p in parts])
+    start = np.concatenate([p[1] for p in parts])
+    if len(start) == 0:
+        return []
+    step = np.array([1, W, -1, -W])
+    end = start + step[direction]
+
+    # następna krawędź: jedyna wychodząca z końca, a w wierzchołku z dwiema (komórki stykające się narożnikiem)
+    # - skręt w lewo (komórki stykające się tylko narożnikiem należą do osobnych wielokątów)
+    order = np.argsort(start, kind="stable")
+    first = np.searchsorted(start[order], end)
+    nxt = order[first]
+    two = np.flatnonzero((first + 1 < len(order)) & (start[order[np.minimum(first + 1, len(order) - 1)]] == end))
+    alt = order[first[two] + 1]
+    left = (direction + 1) % 4
+    nxt[two] = np.where(direction[alt] == left[two], alt, nxt[two])
+
+    # pierścienie - tylko narożniki (zmiana kierunku)
+    rings = []
+    seen = np.zeros(len(start), dtype=bool)
+    nxt_list = nxt.tolist()
+    for e in range(len(start)):
+        if seen[e]:
+            continue
+        cycle = []
+        while not seen[e]:
+            seen[e] = True
+            cycle.append(e)
+            e = nxt_list[e]
+        cycle = np.array(cycle)
+        dirs = direction[cycle]
+        corners = start[cycle[dirs != np.roll(dirs, 1)]]
+        xs = x0 + (corners % W - 1) * cell
+        ys = y0 + (corners // W - 1) * cell
+        area = 0.5 * float(np.dot(xs, np.roll(ys, -1)) - np.dot(np.roll(xs, -1), ys))
+        # punkt wewnątrz wypełnionej komórki po lewej stronie pierwszej krawędzi
+        dx, dy = (1, 0, -1, 0)[dirs[0]], (0, 1, 0, -1)[dirs[0]]
+        inside = (x0 + (start[cycle[0]] % W - 1 + 0.5 * (dx - dy)) * cell,
+                  y0 + (start[cycle[0]] // W - 1 + 0.5 * (dy + dx)) * cell)
+        rings.append((area, xs, ys, inside))
+
+    # przypisanie dziur do najmniejszego pierścienia zewnętrznego, który je zawiera
+    outer = sorted((ring for ring in rings if ring[0] > 0), key=lambda ring: ring[0])
+    polygons = [[_closed(xs, ys)] for _, xs, ys, _ in outer]
+    for area, xs, ys, (px, py) in rings:
+        if area > 0 or -area < min_hole:
+            continue
+        for p, (_, oxs, oys, _) in enumerate(outer):
+            if _contains(oxs, oys, px, py):
+                polygons[p].append(_closed(xs, ys))
+                break
+    return polygons
+
+def _closed(xs, ys):
+    ring = list(zip(xs.tolist(), ys.tolist()))
+    ring.append(ring[0])
+    return ring
+
+# punkt w wielokącie (parzystość przecięć półprostej poziomej)
+def _contains(xs, ys, px, py):
+    if px < xs.min() or px > xs.max() or py < ys.min() or py > ys.max():
+        return False
+    xn, yn = np.roll(xs, -1), np.roll(ys, -1)
+    cross = (ys > py) != (yn > py)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        xi = xs + (py - ys) * (xn - xs) / (yn - ys)
+    return bool(np.count_nonzero(cross & (px < xi)) % 2)
+
+# GeoJSON (FeatureCollection) - jeden MultiPolygon na próg, od największego (mniejsze przykrywają większe na mapie)
+def to_geojson(bands, thresholds):
+    from writers import feature
+
+    features = [feature("MultiPolygon", polygons, {"threshold": t}) for t, polygons in _largest_first(bands, thresholds)]
+    return {"type": "FeatureCollection", "features": features}
+
+# zapis izochron do pliku (writers - format z rozszerzenia: .geojson, .ndjson, .csv z WKB, .gpkg)
+def write_isochrones(path, bands, thresholds, layer="isochrones"):
+    from writers import open_writer
+
+    with open_writer(path, "MultiPolygon", layer) as writer:
+        writer.write_many((polygons, {"threshold": t}) for t, polygons in _largest_first(bands, thresholds))
+
+def _largest_first(bands, thresholds):
+    return sorted(zip(thresholds, bands), key=lambda band: -band[0])
@@ -0,0 +1,185 @@
+# Authors:  PAGistyczna Drużyna Cybergeodetów
+# Created:  2026-10-18
+#
+# Heurystyka ALT (A*, Landmarks, Triangle inequality - Goldberg i Harrelson, 2005).
+# Dla kilku węzłów-punktów orientacyjnych L zapisane są koszty d(L, v) i d(v, L) do wszystkich węzłów.
+# Z nierówności trójkąta:  d(v, t) >= d(L, t) - d(L, v)  oraz  d(v, t) >= d(v, L) - d(t, L).
+# W odróżnieniu od h_time (odległość / 140 km/h) oszacowanie uwzględnia faktyczne prędkości na sieci.
+#
+# Tablice są zapisane jako liczby całkowite uint16 (2 B na węzeł na punkt) w jednostkach "scale"
+# (koszt zaokrąglony w dół). Wartość maksymalna typu oznacza węzeł nieosiągalny.
+
+import random
+import weakref
+import numpy as np
+
+_built = weakref.WeakKeyDictionary()      # graf -> {metryka: Landmarks} zbudowane w pamięci (alt_heuristic)
+
+# wybór punktów orientacyjnych
+#   "farthest" - kolejno węzeł najdalszy od już wybranych
+#   "avoid"    - Goldberg i Werneck (2005): liść drzewa najkrótszych ścieżek z losowego węzła,
+#                w którego poddrzewie obecne punkty najsłabiej szacują odległość
+def select_landmarks(graph, count, cost="time", method="avoid", seed=0):
+    rng = random.Random(seed)
+    n = graph.node_count
+
+    # pierwszy punkt: najdalszy od losowego węzła
+    dist = graph.one_to_all(cost, [rng.randrange(n)])
+    landmarks = [int(np.argmax(np.where(np.isfinite(dist), dist, -1)))]
+    fwd = [graph.one_to_all(cost, landmarks[-1:])]
+    bwd = [graph.one_to_all(cost, landmarks[-1:], reverse=True)]
+
+    while len(landmarks) < count:
+        if method == "farthest":
+            dist = graph.one_to_all(cost, landmarks)
+            dist = np.where(np.isfinite(dist), dist, -1)
+            dist[landmarks] = -1
+            candidate = int(np.argmax(dist))
+        elif method == "avoid":
+            candidate = _avoid_candidate(graph, cost, rng.randrange(n), fwd, bwd, landmarks)
+        else:
+            raise ValueError(f"Unknown landmark selection method: {method}")
+
+        if candidate in landmarks:
+            break
+        landmarks.append(candidate)
+        fwd.append(graph.one_to_all(cost, [candidate]))
+        bwd.append(graph.one_to_all(cost, [candidate], reverse=True))
+
+    return landmarks, fwd, bwd
+
+def _avoid_candidate(graph, cost, root, fwd, bwd, landmarks):
+    dist, parent, order = graph.one_to_all(cost, [root], tree=True)
+
+    # obecne dolne oszacowanie d(root, v) i "waga" węzła = błąd tego oszacowania
+    with np.errstate(invalid="ignore"):
+        bound = np.zeros(graph.node_count)
+        for f, b in zip(fwd, bwd):
+            bound = np.maximum(bound, np.nan_to_num(f - f[root], nan=0, posinf=0, neginf=0))
+            bound = np.maximum(bound, np.nan_to_num(b[root] - b, nan=0, posinf=0, neginf=0))
+    weight = np.where(np.isfinite(dist), dist - bound, 0)
+
+    # rozmiar poddrzewa = suma wag, 0 jeśli w poddrzewie jest punkt orientacyjny (od liści do korzenia)
+    size = weight.copy()
+    blocked = np.zeros(graph.node_count, dtype=bool)
+    blocked[landmarks] = True
+    for v in order[::-1].tolist():
+        if blocked[v]:
+            size[v] = 0
+        p = parent[v]
+        if p >= 0:
+            size[p] += size[v]
+            blocked[p] |= blocked[v]
+
+    # zejście od korzenia do liścia przez dziecko o największym rozmiarze
+    children = {}
+    for v in order.tolist():
+        if parent[v] >= 0:
+            children.setdefault(int(parent[v]), []).append(v)
+    v = root
+    while v in children:
+        v = max(children[v], key=lambda c: size[c])
+    return v
+
+# jednostka zapisu: największy skończony koszt mieści się w typie całkowitym
+def _scale(tables, dtype):
+    finite = [t[np.isfinite(t)].max() for t in tables if np.isfinite(t).any()]
+    if not finite:
+        return 1.0
+    return max(float(max(finite)) / (np.iinfo(dtype).max - 1), 1e-9)
+
+# zamiana kosztów na liczby całkowite (w dół), nieosiągalne = maksimum typu
+def _quantize(tables, scale, dtype):
+    out = np.full((len(tables[0]), len(tables)), np.iinfo(dtype).max, dtype=dtype)
+    for j, t in enumerate(tables):
+        mask = np.isfinite(t)
+        out[mask, j] = np.floor(t[mask] / scale).astype(dtype)
+    return out
+
+class Landmarks:
+    def __init__(self, graph, cost, landmarks, fwd, bwd, scale):
+        self.graph = graph
+        self.cost = cost
+        self.landmarks = np.asarray(landmarks, dtype=np.int32)
+        self.fwd = fwd                      # (n, k): d(L, v) w jednostkach scale
+        self.bwd = bwd                      # (n, k): d(v, L)
+        self.scale = scale
+        self.unreachable = np.iinfo(fwd.dtype).max
+        self._fwd = memoryview(np.ascontiguousarray(fwd)).cast("B").cast(fwd.dtype.char)
+        self._bwd = memoryview(np.ascontiguousarray(bwd)).cast("B").cast(bwd.dtype.char)
+        self.k = fwd.shape[1]
+        # zaokrąglone odległości dają oszacowanie dopuszczalne, ale nie spójne: node_h jest mniejsze od
+        # dokładnego (spójnego) oszacowania ALT o mniej niż 2 * scale - algorytmy otwierają wtedy ponownie węzły z S
+        self.slack = 2 * scale
+
+    @classmethod
+    def build(cls, graph, cost="time", count=8, method="avoid", dtype=np.uint16):
+        landmarks, fwd, bwd = select_landmarks(graph, count, cost, method)
+        scale = _scale(fwd + bwd, dtype)
+        return cls(graph, cost, landmarks, _quantize(fwd, scale, dtype), _quantize(bwd, scale, dtype), scale)
+
+    def nbytes(self):
+        return self.fwd.nbytes + self.bwd.nbytes + self.landmarks.nbytes
+
+    def _row(self, table, v):
+        return table[v * self.k:(v + 1) * self.k].tolist()
+
+    # dolne oszacowanie d(v, t) - węzły jako id
+    def node_h(self, v, t):
+        top = self.unreachable
+        best = 0
+        for lv, lt in zip(self._row(self._fwd, v), self._row(self._fwd, t)):
+            if lv != top and lt != top and lt - lv > best:
+                best = lt - lv
+        for lv, lt in zip(self._row(self._bwd, v), self._row(self._bwd, t)):
+            if lv != top and lt != top and lv - lt > best:
+                best = lv - lt
+        # -1: zaokrąglenie w dół obu wartości może zawyżyć różnicę o jedną jednostkę
+        return (best - 1) * self.scale if best > 1 else 0.0
+
+    # dolne oszacowanie d(s, v) - dla kierunku wstecznego w aShift8_bidirectional
+    def node_h_reverse(self, v, s):
+        return self.node_h(s, v)
+
+    # wywołanie jak h_length / h_time: h(current, end) na współrzędnych
+    def __call__(self, current, end):
+        return self.node_h(self.graph.node_id(current), self.graph.node_id(end))
+
+    # zapis jako sekcje pliku grafu: alt_<koszt>_landmarks / _fwd / _bwd, skala w metadanych
+    def sections(self):
+        prefix = f"alt_{self.cost}"
+        return {prefix + "_landmarks": self.landmarks, prefix + "_fwd": self.fwd, prefix + "_bwd": self.bwd}, \
+               {prefix + "_scale": self.scale}
+
+    @classmethod
+    def from_graph_file(cls, graph, cost="time"):
+        f = getattr(graph, "graph_file", None)
+        prefix = f"alt_{cost}"
+        if f is None or prefix + "_fwd" not in f:
+            return None
+        if f.meta.get(prefix + "_graph_checksum", f.graph_checksum) != f.graph_checksum:
+            return None                     # zbudowane dla grafu sprzed zmian (graph_update)
+        return cls(graph, cost, f[prefix + "_landmarks"], f[prefix + "_fwd"], f[prefix + "_bwd"], f.meta[prefix + "_scale"])
+
+# heurystyka ALT do przekazania jako h_funct w aS8_launcher: z pliku grafu, a jeśli jej tam nie ma -
+# budowana w pamięci (raz dla grafu i metryki). Plik grafu nie jest zmieniany w czasie zapytań (mogą go czytać
+# inne procesy) - do zapisu służy save_landmarks (routing_server.prepare_graph_file); generate_launcher zapisuje
+# z grafem tylko indeks przestrzenny
+def alt_heuristic(graph, cost="time", count=8, method="avoid"):
+    built = _built.setdefault(graph, {})
+    if cost not in built:
+        built[cost] = Landmarks.from_graph_file(graph, cost) or Landmarks.build(graph, cost, count, method)
+    return built[cost]
+
+# budowa punktów orientacyjnych i dopisanie do pliku grafu (jeśli nie ma w nim aktualnych)
+def save_landmarks(graph, cost="time", count=8, method="avoid"):
+    from graph_file import append_sections
+
+    alt = Landmarks.from_graph_file(graph, cost)
+    if alt is None:
+        alt = Landmarks.build(graph, cost, count, method)
+        f = graph.graph_file
+        sections, meta = alt.sections()
+        meta[f"alt_{cost}_graph_checksum"] = f.graph_checksum
+        append_sections(f.path, sections, meta)
+    return alt
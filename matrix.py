@@ -0,0 +1,56 @@
+# Authors:  PAGistyczna Drużyna Cybergeodetów
+# Created:  2026-10-18
+#
+# Macierz kosztów przejazdu wiele-do-wielu (np. wszystkie punkty test_1.shp x wszystkie punkty test_2.shp).
+# Wszystkie punkty są snapowane raz (rzut na najbliższą krawędź, virtual_nodes), a macierz jest liczona:
+#   "dijkstra" - jedno przeszukiwanie z każdego źródła, kończone po dotarciu do wszystkich celów
+#   "ch"       - kubełki na Contraction Hierarchies (ContractionHierarchy.many_to_many)
+
+import math
+import numpy as np
+from virtual_nodes import VirtualNodes, snap_points
+
+# macierz kosztów len(sources) x len(targets) (inf - brak połączenia lub punkt poza siecią)
+#   cost      - "length" [m] lub "time" [s]
+#   method    - "dijkstra" lub "ch" (hierarchia z pliku obok grafu, jeśli jest; inaczej budowana)
+#   paths     - opcjonalnie funkcja paths(i, j, węzły ścieżki, ID krawędzi) wywoływana dla każdej
+#               znalezionej ścieżki zaraz po jej wyznaczeniu (bez przechowywania wszystkich ścieżek)
+#   snap_cost - doliczenie dojazdu od punktów do grafu (jak snap_length / snap_time w aS8_launcher)
+def distance_matrix(graph, sources, targets, cost="time", method="dijkstra", paths=None, snap_cost=True,
+                    max_dist=500, ch=None):
+    from csr_graph import trace_path
+
+    virtual = VirtualNodes(graph)
+    src, src_cost = snap_points(graph, virtual, sources, cost, max_dist)
+    dst, dst_cost = snap_points(graph, virtual, targets, cost, max_dist)
+    rows = [i for i, s in enumerate(src) if s is not None]
+    cols = [j for j, t in enumerate(dst) if t is not None]
+    matrix = np.full((len(src), len(dst)), math.inf)
+
+    if method == "ch":
+        if ch is None:
+            from contraction import load_or_build
+            graph_file = getattr(graph, "graph_file", None)
+            ch = load_or_build(graph, cost, graph_file.path if graph_file is not None else None)
+        matrix[np.ix_(rows, cols)] = ch.many_to_many([src[i] for i in rows], [dst[j] for j in cols], virtual)
+        if paths is not None:
+            for i in rows:
+                for j in cols:
+                    if matrix[i, j] < math.inf:
+                        node_path, edge_ids, _, _ = ch.query(virtual.coords(src[i]), virtual.coords(dst[j]), virtual)
+                        paths(i, j, node_path, edge_ids)
+    elif method == "dijkstra":
+        for i in rows:
+            dist, p = graph.one_to_many(cost, src[i], [dst[j] for j in cols], virtual)
+            for j in cols:
+                if dst[j] in dist:
+                    matrix[i, j] = dist[dst[j]]
+                    if paths is not None:
+                        node_path, edge_ids = trace_path(p, src[i], dst[j])
+                        paths(i, j, [virtual.coords(v) for v in node_path], edge_ids)
+    else:
+        raise ValueError(f"Unknown distance matrix method: {method}")
+
+    if snap_cost:
+        matrix += src_cost[:, None] + dst_cost[None, :]
+    return matrix
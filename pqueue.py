@@ -0,0 +1,209 @@
+# Authors:  PAGistyczna Drużyna Cybergeodetów
+# Created:  2026-10-18
+#
+# Kolejki priorytetowe dla pętli wyszukiwania na grafie CSR (węzły to liczby całkowite 0..n-1).
+# Wspólny interfejs:
+#   push(v, key)  - dodanie węzła lub zmniejszenie jego klucza (większy klucz jest ignorowany)
+#   pop()         - (v, key) o najmniejszym kluczu
+#   peek()        - (v, key) o najmniejszym kluczu, bez usuwania
+#   v in Q        - czy węzeł czeka w kolejce
+#   key(v)        - bieżący klucz węzła w kolejce
+#   len(Q), bool(Q)
+
+import heapq
+from heapdict import heapdict
+
+# kopiec 4-arny indeksowany tablicą pozycji - decrease-key w miejscu, bez słownika.
+# Płytszy od binarnego (log4 n poziomów), a dzieci węzła leżą obok siebie w liście.
+class QuaternaryHeap:
+    def __init__(self, n):
+        self.heap = []              # id węzłów w porządku kopca
+        self.keys = []              # klucze równoległe do heap
+        self.pos = [-1] * n         # pozycja węzła w heap (-1: poza kolejką)
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __bool__(self):
+        return bool(self.heap)
+
+    def __contains__(self, v):
+        return self.pos[v] >= 0
+
+    def key(self, v):
+        return self.keys[self.pos[v]]
+
+    def push(self, v, key):
+        i = self.pos[v]
+        if i < 0:
+            i = len(self.heap)
+            self.heap.append(v)
+            self.keys.append(key)
+        elif key < self.keys[i]:
+            self.keys[i] = key
+        else:
+            return
+        self._sift_up(i, v, key)
+
+    def _sift_up(self, i, v, key):
+        heap, keys, pos = self.heap, self.keys, self.pos
+        while i > 0:
+            parent = (i - 1) >> 2
+            if keys[parent] <= key:
+                break
+            heap[i] = heap[parent]
+            keys[i] = keys[parent]
+            pos[heap[i]] = i
+            i = parent
+        heap[i] = v
+        keys[i] = key
+        pos[v] = i
+
+    def peek(self):
+        return self.heap[0], self.keys[0]
+
+    def pop(self):
+        heap, keys, pos = self.heap, self.keys, self.pos
+        top, top_key = heap[0], keys[0]
+        pos[top] = -1
+        v = heap.pop()
+        key = keys.pop()
+        size = len(heap)
+        if size:
+            # przesunięcie ostatniego elementu w dół od korzenia
+            i = 0
+            while True:
+                first = (i << 2) + 1
+                if first >= size:
+                    break
+                best = first
+                best_key = keys[first]
+                for c in range(first + 1, min(first + 4, size)):
+                    if keys[c] < best_key:
+                        best = c
+                        best_key = keys[c]
+                if best_key >= key:
+                    break
+                heap[i] = heap[best]
+                keys[i] = best_key
+                pos[heap[i]] = i
+                i = best
+            heap[i] = v
+            keys[i] = key
+            pos[v] = i
+        return top, top_key
+
+# heapq z leniwym usuwaniem - decrease-key dodaje nowy wpis, nieaktualne wpisy są pomijane przy pop
+class LazyHeap:
+    def __init__(self, n=None):
+        self.heap = []              # (klucz, węzeł), także nieaktualne
+        self.best = {}              # węzeł -> aktualny klucz (tylko węzły w kolejce)
+
+    def __len__(self):
+        return len(self.best)
+
+    def __bool__(self):
+        return bool(self.best)
+
+    def __contains__(self, v):
+        return v in self.best
+
+    def key(self, v):
+        return self.best[v]
+
+    def push(self, v, key):
+        if key < self.best.get(v, float("inf")):
+            self.best[v] = key
+            heapq.heappush(self.heap, (key, v))
+
+    def peek(self):
+        heap, best = self.heap, self.best
+        while best.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0][1], heap[0][0]
+
+    def pop(self):
+        heap, best = self.heap, self.best
+        while True:
+            key, v = heapq.heappop(heap)
+            if best.get(v) == key:
+                del best[v]
+                return v, key
+
+# heapdict (dotychczasowa kolejka) w tym samym interfejsie - do porównań
+class HeapDictQueue:
+    def __init__(self, n=None):
+        self.q = heapdict()
+
+    def __len__(self):
+        return len(self.q)
+
+    def __bool__(self):
+        return bool(self.q)
+
+    def __contains__(self, v):
+        return v in self.q
+
+    def key(self, v):
+        return self.q[v]
+
+    def push(self, v, key):
+        if v not in self.q or key < self.q[v]:
+            self.q[v] = key
+
+    def peek(self):
+        return self.q.peekitem()
+
+    def pop(self):
+        return self.q.popitem()
+
+QUEUES = {
+    "quaternary": QuaternaryHeap,
+    "lazy": LazyHeap,
+    "heapdict": HeapDictQueue,
+}
+
+# kolejka o podanej nazwie dla grafu o n węzłach
+def make_queue(name, n):
+    try:
+        return QUEUES[name](n)
+    except KeyError:
+        raise ValueError(f"Unknown priority queue '{name}', expected one of: {', '.join(QUEUES)}")
+
+# kolejka zapisująca wykonane operacje - ślad do mikrobenchmarku (odtwarzany funkcją replay)
+class RecordingQueue:
+    def __init__(self, queue, trace):
+        self.queue = queue
+        self.trace = trace          # lista (operacja, węzeł, klucz)
+
+    def __len__(self):
+        return len(self.queue)
+
+    def __bool__(self):
+        return bool(self.queue)
+
+    def __contains__(self, v):
+        return v in self.queue
+
+    def key(self, v):
+        return self.queue.key(v)
+
+    def push(self, v, key):
+        self.trace.append((0, v, key))
+        self.queue.push(v, key)
+
+    def peek(self):
+        return self.queue.peek()
+
+    def pop(self):
+        self.trace.append((1, 0, 0))
+        return self.queue.pop()
+
+# odtworzenie śladu operacji na kolejce
+def replay(queue, trace):
+    push, pop = queue.push, queue.pop
+    for op, v, key in trace:
+        if op:
+            pop()
+        else:
+            push(v, key)
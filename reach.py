@@ -0,0 +1,106 @@
+# Authors:  PAGistyczna Drużyna Cybergeodetów
+# Created:  2026-10-18
+#
+# Zasięg z jednego lub wielu źródeł jednocześnie (np. wszystkie remizy straży pożarnej) - jedno
+# przeszukiwanie Dijkstry od wszystkich źródeł naraz, ograniczone największym progiem.
+# Wynik to tablice dla wszystkich węzłów: koszt dotarcia z najbliższego źródła i numer tego źródła.
+# Krawędzie w zasięgu i podział na progi (np. 5, 10, 15 min) są wyznaczane operacjami na tablicach NumPy,
+# w czasie liniowym względem liczby krawędzi - bez ponownego przeszukiwania dla każdego progu.
+
+import heapq
+import math
+import numpy as np
+
+class Reach:
+    def __init__(self, graph, cost, dist, source, limit, virtual=None):
+        self.graph = graph
+        self.cost = cost
+        self.dist = dist            # koszt dotarcia z najbliższego źródła (inf - poza zasięgiem); także węzły wirtualne
+        self.source = source        # numer najbliższego źródła na liście sources (-1 - poza zasięgiem)
+        self.limit = limit          # największy próg przeszukiwania
+        self.virtual = virtual      # węzły wirtualne punktów źródłowych (virtual_nodes.VirtualNodes) albo None
+
+    def _limit(self, limit):
+        if limit is None:
+            return self.limit
+        if limit > self.limit:
+            raise ValueError(f"Threshold {limit} exceeds the search limit {self.limit}")
+        return limit
+
+    # id węzłów grafu w zasięgu
+    def nodes(self, limit=None):
+        return np.flatnonzero(self.dist[:self.graph.node_count] <= self._limit(limit))
+
+    # współrzędne węzłów w zasięgu (jak wynik dijkstra_with_time_limit)
+    def coords(self, limit=None):
+        ids = self.nodes(limit)
+        return list(zip(self.graph.x[ids].tolist(), self.graph.y[ids].tolist()))
+
+    # maska krawędzi skierowanych, których oba końce są w zasięgu
+    def arcs(self, limit=None):
+        limit = self._limit(limit)
+        n = self.graph.node_count
+        return (self.dist[:n][self.graph.arc_sources()] <= limit) & (self.dist[:n][self.graph.targets] <= limit)
+
+    # ID krawędzi z pliku źródłowego w zasięgu (każda raz)
+    def edge_ids(self, limit=None):
+        return np.unique(self.graph.edge_ids[self.arcs(limit)])
+
+    # numer progu dla każdego węzła grafu: 0 - do thresholds[0], 1 - do thresholds[1], ..., len(thresholds) - poza
+    def node_bands(self, thresholds):
+        thresholds = np.sort(np.asarray(thresholds, dtype=np.float64))
+        self._limit(thresholds[-1])
+        return np.searchsorted(thresholds, self.dist[:self.graph.node_count], side="left")
+
+    # ID krawędzi w zasięgu każdego progu (progi zagnieżdżone: krawędzie progu 5 min są też w progu 10 min)
+    def edge_bands(self, thresholds):
+        band = self.node_bands(thresholds)
+        arc_band = np.maximum(band[self.graph.arc_sources()], band[self.graph.targets])
+        return [np.unique(self.graph.edge_ids[arc_band <= i]) for i in range(len(thresholds))]
+
+# przeszukiwanie od wszystkich źródeł naraz do kosztu limit
+#   sources - id węzłów (także wirtualnych - virtual_nodes.VirtualNodes przekazane jako virtual)
+def reach(graph, sources, limit, cost="time", virtual=None):
+    mv = graph.views()
+    offsets, targets, w = mv["offsets"], mv["targets"], mv[cost]
+    extra = virtual.out if virtual else {}
+    size = virtual.node_count if virtual else graph.node_count
+
+    dist = [math.inf] * size
+    label = [-1] * size
+    heap = []
+    for i, s in enumerate(sources):
+        if s is not None and dist[s] > 0:
+            dist[s] = 0.0
+            label[s] = i
+            heap.append((0.0, s))
+    heapq.heapify(heap)
+
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue                                        # nieaktualny wpis (leniwe usuwanie)
+        lu = label[u]
+        if u in extra:
+            T, W, _ = virtual.adjacent(u, cost)
+            arcs = range(len(T))
+        else:
+            T, W = targets, w
+            arcs = range(offsets[u], offsets[u + 1])
+        for k in arcs:
+            v = T[k]
+            nd = d + W[k]
+            if nd < dist[v] and nd <= limit:
+                dist[v] = nd
+                label[v] = lu
+                heapq.heappush(heap, (nd, v))
+
+    return Reach(graph, cost, np.array(dist), np.array(label, dtype=np.int32), limit, virtual)
+
+# zasięg z punktów (rzutowanych na najbliższe krawędzie): (Reach, węzły wirtualne)
+def reach_from_points(graph, points, limit, cost="time", max_dist=500):
+    from virtual_nodes import VirtualNodes, snap_points
+
+    virtual = VirtualNodes(graph)
+    ids, _ = snap_points(graph, virtual, points, cost, max_dist)
+    return reach(graph, ids, limit, cost, virtual), virtual
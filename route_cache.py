@@ -0,0 +1,92 @@
+# Authors:  PAGistyczna Drużyna Cybergeodetów
+# Created:  2026-10-18
+#
+# Pamięć podręczna wyznaczonych tras - powtarzające się pary punktów (np. baza - szpital) bez ponownego A*.
+#   klucz    - punkty po snapowaniu (start, end) i metryka ("time" / "length")
+#   wartość  - współrzędne wierzchołków ścieżki (float64, n x 2), ID krawędzi (int32) i koszt
+#   max_bytes - budżet pamięci; po jego przekroczeniu usuwane są najdawniej używane trasy (LRU)
+#   ttl      - czas ważności trasy [s] (None - bez limitu)
+# Trasy są ważne tylko dla jednej zawartości pliku grafu: validate(checksum) z sumą kontrolną pliku .pfg
+# (GraphFile.checksum, graph_file.file_checksum) czyści pamięć, gdy plik się zmienił.
+
+import time
+from collections import OrderedDict
+import numpy as np
+
+ENTRY_OVERHEAD = 200            # przybliżony narzut słownika, krotek i obiektów NumPy na jedną trasę [B]
+
+class RouteCache:
+    def __init__(self, max_bytes=64 * 2**20, ttl=None, checksum=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.checksum = checksum    # suma kontrolna pliku grafu, dla którego zapisane są trasy
+        self.entries = OrderedDict()    # klucz -> (czas zapisu, ścieżka, ID krawędzi, koszt, rozmiar); od najdawniej użytej
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0          # usunięte z powodu budżetu pamięci
+        self.expired = 0            # usunięte po czasie ttl
+        self.invalidations = 0      # wyczyszczenia po zmianie pliku grafu
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def key(start, end, metric):
+        return float(start[0]), float(start[1]), float(end[0]), float(end[1]), metric
+
+    # (ścieżka, ID krawędzi, koszt) albo None
+    def get(self, start, end, metric):
+        key = self.key(start, end, metric)
+        entry = self.entries.get(key)
+        if entry is not None and self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+            self._remove(key)
+            self.expired += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1], entry[2], entry[3]
+
+    def put(self, start, end, metric, path, edge_ids, cost):
+        key = self.key(start, end, metric)
+        path = np.array(path, dtype=np.float64).reshape(-1, 2)
+        edge_ids = np.array(edge_ids, dtype=np.int32)
+        size = path.nbytes + edge_ids.nbytes + ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = (time.monotonic(), path, edge_ids, cost, size)
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+
+    def _remove(self, key):
+        self.nbytes -= self.entries.pop(key)[4]
+
+    def clear(self):
+        self.entries.clear()
+        self.nbytes = 0
+
+    # sprawdzenie sumy kontrolnej pliku grafu - przy zmianie trasy są usuwane; zwraca False, jeśli plik się zmienił
+    def validate(self, checksum):
+        if checksum == self.checksum:
+            return True
+        if self.entries:
+            self.invalidations += 1
+        self.clear()
+        self.checksum = checksum
+        return False
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"entries": len(self.entries), "nbytes": self.nbytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions, "expired": self.expired, "invalidations": self.invalidations}
+
+# wspólna pamięć tras procesu (np. kolejne wywołania aS8_launcher w jednej sesji ArcGIS Pro)
+default_cache = RouteCache()
@@ -0,0 +1,458 @@
+# Authors:  PAGistyczna Drużyna Cybergeodetów
+# Created:  2026-10-18
+#
+# Serwer wyznaczania tras - graf wczytywany raz, zapytania przez HTTP (TCP albo gniazdo Unix) z odpowiedziami JSON.
+#   POST /route   {"start": [x, y], "end": [x, y], "cost": "time", "method": "astar"}
+#                 cost: "time", "length" albo profil kosztów (cost_profiles), np. "truck"
+#                 method: "astar", "dijkstra", "bidirectional", "alt", "ch"; "geometry": false - bez współrzędnych ścieżki
+#                 (path - linia trasy z pełnej geometrii dróg, jeśli graf ją ma, inaczej węzły ścieżki)
+#                 "departure": "07:45" - czas przejazdu w zależności od pory dnia (time_dependent, astar / dijkstra)
+#                 "turns": true - zakazy i koszty skrętów (turns; astar / dijkstra / bidirectional)
+#   POST /matrix  {"sources": [[x, y], ...], "targets": [[x, y], ...], "cost": "time", "method": "dijkstra"}
+#   POST /reach   {"points": [[x, y], ...], "limit": 600, "thresholds": [300, 600], "polygons": false}
+#   GET  /stats   liczba zapytań i opóźnienia (średnie, p50, p95, p99, max) dla każdego typu zapytania,
+#                 trafienia pamięci tras (route_cache) w procesach roboczych
+# Zapytania są liczone w procesach roboczych (ProcessPoolExecutor). Każdy proces otwiera plik .pfg przez mmap
+# (graph_file), więc strony grafu są współdzielone w pamięci podręcznej systemu, a nie kopiowane.
+# Generator obciążenia: python routing_server.py load PF_graph.pfg --requests 1000 --concurrency 8
+#
+# Uruchomienie: python routing_server.py serve PF_graph.pfg [--port 8765 | --unix /tmp/pf.sock] [--workers 4]
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+LATENCY_WINDOW = 10000          # liczba ostatnich zapytań każdego typu w statystykach
+
+# stan procesu roboczego: graf z pliku, pamięć tras i struktury przyspieszające wczytane przy pierwszym użyciu
+_state = {}
+
+#   cache_bytes - budżet pamięci tras procesu (route_cache), 0 - bez pamięci tras
+#   cache_ttl   - czas ważności trasy w pamięci [s]
+def _init_worker(in_graph_file, cache_bytes=0, cache_ttl=None):
+    from route_cache import RouteCache
+
+    _state.clear()
+    _state["cache"] = RouteCache(cache_bytes, cache_ttl) if cache_bytes else None
+    _load(in_graph_file)
+
+# graf z pliku - po zmianie pliku (np. graph_update.update_graph_file) wczytywany od nowa razem z ALT / CH,
+# a pamięć tras jest czyszczona
+def _load(in_graph_file):
+    from graph_file import load_graph
+
+    for key in [key for key in _state if isinstance(key, tuple)]:
+        del _state[key]
+    _state["path"] = in_graph_file
+    _state["graph"] = load_graph(in_graph_file)
+    _state["checksum"] = _state["graph"].graph_file.checksum
+    if _state["cache"] is not None:
+        _state["cache"].validate(_state["checksum"])
+
+# obsługa zapytania w procesie roboczym: (status HTTP, odpowiedź)
+def _handle(kind, params):
+    from graph_file import file_checksum
+
+    t0 = time.perf_counter()
+    if file_checksum(_state["path"]) != _state["checksum"]:
+        _load(_state["path"])
+    try:
+        result = HANDLERS[kind](_state["graph"], params)
+        status = 200
+    except (KeyError, TypeError, ValueError) as e:
+        result, status = {"error": f"{type(e).__name__}: {e}"}, 400
+    result["compute_ms"] = (time.perf_counter() - t0) * 1000
+    return status, result
+
+# heurystyka metryki: "time", "length" albo profil kosztów (cost_profiles, np. "truck")
+def _metric(g, cost):
+    from cost_profiles import profile
+    from toolbox_core import h_length, h_time
+
+    if cost == "time":
+        return h_time
+    if cost == "length":
+        return h_length
+    return profile(g, cost).h
+
+def _route(g, params):
+    from csr_graph import h_zero
+
+    cost = params.get("cost", "time")
+    method = params.get("method", "astar")
+    h = _metric(g, cost)
+    departure = params.get("departure")
+    turns = params.get("turns", False)
+    if turns and departure is not None:
+        raise ValueError("Turn costs cannot be combined with departure time")
+    # graf krawędziowy ze skrętami - punkty przenoszone do węzłów grafu
+    if turns:
+        (start, end), snap_length, snap_time = g.snap(params["start"], params["end"],
+                                                      max_dist=params.get("max_dist", 500))
+        virtual = None
+    else:
+        (start, end), snap_length, snap_time, virtual = g.snap_split(params["start"], params["end"],
+                                                                     max_dist=params.get("max_dist", 500))
+    snap = snap_length if cost == "length" else snap_time
+    key = cost
+    if departure is not None:
+        from time_dependent import departure_seconds
+        key = f"{cost}@{departure_seconds(departure):g}"
+    elif turns:
+        key = cost + "+turns"
+
+    # trasa z pamięci (klucz: punkty po snapowaniu, metryka, godzina odjazdu / skręty)
+    cache = _state["cache"]
+    cached = cache.get(start, end, key) if cache is not None else None
+    if cached is not None:
+        path, edge_ids, path_cost = cached
+        result = {"found": True, "cost": path_cost + snap, "path_cost": path_cost, "snap_cost": snap, "visited": 0,
+                  "cached": True, "edge_ids": edge_ids.tolist()}
+        if params.get("geometry", True):
+            result["path"] = g.route_geometry(path, edge_ids).tolist()
+        return result
+
+    if departure is not None:
+        from time_dependent import td_aShift8
+        if method not in ("astar", "dijkstra"):
+            raise ValueError(f"Route method {method} does not support departure time")
+        result = td_aShift8(g, _time_model(g, cost), start, end, departure, h if method == "astar" else h_zero,
+                            virtual)
+    elif turns:
+        if method not in ("astar", "dijkstra", "bidirectional"):
+            raise ValueError(f"Route method {method} does not support turn costs")
+        tg = _turn_graph(g)
+        result = tg.aShift8_bidirectional(cost, h, start, end) if method == "bidirectional" else \
+            tg.aShift8(cost, h if method == "astar" else h_zero, start, end)
+    elif method == "astar":
+        result = g.aShift8(cost, h, start, end, virtual=virtual)
+    elif method == "dijkstra":
+        result = g.dijkstra(cost, start, end, virtual=virtual)
+    elif method == "bidirectional":
+        result = g.aShift8_bidirectional(cost, h, start, end, virtual=virtual)
+    elif method == "alt":
+        result = g.aShift8(cost, _landmarks(g, cost), start, end, virtual=virtual)
+    elif method == "ch":
+        result = _hierarchy(g, cost).query(start, end, virtual)
+    else:
+        raise ValueError(f"Unknown route method: {method}")
+
+    if result is None:
+        return {"found": False}
+    path, edge_ids, path_cost, visited = result
+    if cache is not None:
+        cache.put(start, end, key, path, edge_ids, path_cost)
+    result = {"found": True, "cost": path_cost + snap, "path_cost": path_cost, "snap_cost": snap, "visited": visited,
+              "edge_ids": [int(e) for e in edge_ids]}
+    if params.get("geometry", True):
+        result["path"] = g.route_geometry(path, edge_ids).tolist()
+    return result
+
+def _matrix(g, params):
+    from matrix import distance_matrix
+
+    _metric(g, params.get("cost", "time"))
+    matrix = distance_matrix(g, params["sources"], params["targets"], params.get("cost", "time"),
+                             params.get("method", "dijkstra"), max_dist=params.get("max_dist", 500),
+                             ch=_hierarchy(g, params.get("cost", "time")) if params.get("method") == "ch" else None)
+    return {"matrix": [[v if math.isfinite(v) else None for v in row] for row in matrix.tolist()]}
+
+def _reach(g, params):
+    from reach import reach_from_points
+
+    thresholds = sorted(params.get("thresholds") or [params["limit"]])
+    _metric(g, params.get("cost", "time"))
+    r, _ = reach_from_points(g, params["points"], thresholds[-1], params.get("cost", "time"),
+                             params.get("max_dist", 500))
+    result = {"thresholds": thresholds, "nodes": [len(r.nodes(t)) for t in thresholds],
+              "edge_ids": [ids.tolist() for ids in r.edge_bands(thresholds)]}
+    if params.get("polygons"):
+        from isochrone import isochrones, to_geojson
+        result["polygons"] = to_geojson(isochrones(r, thresholds), thresholds)
+    return result
+
+HANDLERS = {"route": _route, "matrix": _matrix, "reach": _reach}
+
+# heurystyka ALT z pliku grafu, a jeśli jej tam nie ma - budowana w pamięci procesu (bez zapisu do pliku,
+# z którego czytają inne procesy; do zapisu służy serve --prepare alt)
+def _landmarks(g, cost):
+    from landmarks import Landmarks
+
+    key = ("alt", cost)
+    if key not in _state:
+        _state[key] = Landmarks.from_graph_file(g, cost) or Landmarks.build(g, cost)
+    return _state[key]
+
+# hierarchia CH z pliku obok grafu, a jeśli go nie ma - budowana w pamięci procesu
+def _hierarchy(g, cost):
+    from contraction import ContractionHierarchy, ch_path
+    from graph_file import GraphFileError
+
+    key = ("ch", cost)
+    if key not in _state:
+        try:
+            _state[key] = ContractionHierarchy.load(ch_path(_state["path"], cost), g)
+        except (OSError, GraphFileError):
+            _state[key] = ContractionHierarchy.build(g, cost)
+    return _state[key]
+
+# model pory dnia z pliku grafu, a jeśli go tam nie ma - budowany w pamięci procesu (do zapisu: serve --prepare td)
+def _time_model(g, cost):
+    from time_dependent import TimeDependentModel
+
+    key = ("td", cost)
+    if key not in _state:
+        model = TimeDependentModel.from_graph_file(g)
+        _state[key] = model if model is not None and model.cost == cost else TimeDependentModel.build(g, cost=cost)
+    return _state[key]
+
+# graf krawędziowy z domyślnymi kosztami skrętów (turns), budowany raz w procesie
+def _turn_graph(g):
+    from turns import TurnGraph
+
+    if ("turns",) not in _state:
+        _state[("turns",)] = TurnGraph.build(g)
+    return _state[("turns",)]
+
+# zapis indeksu przestrzennego, heurystyk ALT i modelu pory dnia (w pliku grafu) oraz hierarchii CH (obok pliku)
+# przed uruchomieniem procesów roboczych - procesy tylko czytają plik grafu, a brakujące struktury budują w pamięci
+#   prepare - np. ["index", "alt", "ch", "td"]
+def prepare_graph_file(in_graph_file, prepare, costs=("time", "length")):
+    if not prepare:
+        return
+    from graph_file import load_graph
+
+    g = load_graph(in_graph_file)
+    if "index" in prepare:
+        from spatial_index import save_spatial_index
+        save_spatial_index(g)
+    for cost in costs:
+        if "alt" in prepare:
+            from landmarks import save_landmarks
+            save_landmarks(g, cost)
+        if "ch" in prepare:
+            from contraction import load_or_build
+            load_or_build(g, cost, in_graph_file)
+        if "td" in prepare and cost != "length":
+            from time_dependent import save_time_model
+            save_time_model(g, cost)
+
+class RoutingServer:
+    #   workers - liczba procesów roboczych; 0 - zapytania liczone w procesie serwera (jeden wątek)
+    #   prepare - struktury budowane i zapisywane przed uruchomieniem procesów, np. ["alt", "ch"]
+    #   cache_bytes, cache_ttl - pamięć tras każdego procesu roboczego (route_cache)
+    def __init__(self, in_graph_file, workers=None, prepare=(), cache_bytes=64 * 2**20, cache_ttl=None):
+        self.in_graph_file = in_graph_file
+        self.latency = {}           # typ zapytania -> ostatnie opóźnienia [ms]
+        self.count = {}             # typ zapytania -> liczba zapytań
+        self.cache_hits = {}        # typ zapytania -> liczba odpowiedzi z pamięci tras
+        self.started = time.time()
+
+        prepare_graph_file(in_graph_file, prepare)
+        if workers == 0:
+            _init_worker(in_graph_file, cache_bytes, cache_ttl)
+            self.executor = ThreadPoolExecutor(1)
+        else:
+            self.executor = ProcessPoolExecutor(workers or os.cpu_count(), initializer=_init_worker,
+                                                initargs=(in_graph_file, cache_bytes, cache_ttl))
+
+    async def dispatch(self, method, target, body):
+        path = target.split("?", 1)[0].strip("/")
+        if path == "stats" and method == "GET":
+            return 200, self.stats()
+        if path == "health" and method == "GET":
+            return 200, {"status": "ok"}
+        if path not in HANDLERS:
+            return 404, {"error": f"Unknown endpoint: /{path}"}
+        if method != "POST":
+            return 405, {"error": "Use POST with a JSON body"}
+        try:
+            params = json.loads(body or b"{}")
+        except ValueError as e:
+            return 400, {"error": f"Invalid JSON: {e}"}
+
+        t0 = time.perf_counter()
+        status, result = await asyncio.get_running_loop().run_in_executor(self.executor, _handle, path, params)
+        latency = (time.perf_counter() - t0) * 1000
+        result["latency_ms"] = latency
+        self.latency.setdefault(path, deque(maxlen=LATENCY_WINDOW)).append(latency)
+        self.count[path] = self.count.get(path, 0) + 1
+        self.cache_hits[path] = self.cache_hits.get(path, 0) + bool(result.get("cached"))
+        return status, result
+
+    def stats(self):
+        out = {"uptime_s": time.time() - self.started, "requests": {}}
+        for kind, values in self.latency.items():
+            out["requests"][kind] = dict(count=self.count[kind], cache_hits=self.cache_hits[kind],
+                                         **latency_summary(values))
+        return out
+
+    # jedno połączenie HTTP/1.1 (keep-alive: wiele zapytań po kolei)
+    async def connection(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target, _ = line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = header.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                try:
+                    status, result = await self.dispatch(method, target, body)
+                except Exception as e:
+                    status, result = 500, {"error": f"{type(e).__name__}: {e}"}
+                data = json.dumps(result).encode("utf-8")
+                writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765, unix=None, ready=None):
+        if unix:
+            server = await asyncio.start_unix_server(self.connection, unix)
+        else:
+            server = await asyncio.start_server(self.connection, host, port)
+        print(f"Routing server on {unix or f'http://{host}:{port}'} ({self.in_graph_file})", flush=True)
+        if ready is not None:
+            ready.set()
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.executor.shutdown()
+
+# średnia, percentyle i maksimum opóźnień [ms]
+def latency_summary(values):
+    values = sorted(values)
+    if not values:
+        return {}
+    pick = lambda q: values[min(int(q * len(values)), len(values) - 1)]
+    return {"mean_ms": sum(values) / len(values), "p50_ms": pick(0.5), "p95_ms": pick(0.95), "p99_ms": pick(0.99),
+            "max_ms": values[-1]}
+
+# klient HTTP na jednym połączeniu (keep-alive)
+class Client:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=8765, unix=None):
+        if unix:
+            return cls(*await asyncio.open_unix_connection(unix))
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def request(self, method, path, params=None):
+        body = json.dumps(params).encode("utf-8") if params is not None else b""
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                          f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            header = await self.reader.readline()
+            if header in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = header.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        return status, json.loads(await self.reader.readexactly(length))
+
+    def close(self):
+        self.writer.close()
+
+# generator obciążenia: requests zapytań kind między losowymi węzłami grafu, concurrency równoległych połączeń.
+# Zwraca opóźnienia po stronie klienta i przepustowość.
+async def load_test(in_graph_file, kind="route", requests=1000, concurrency=8, host="127.0.0.1", port=8765, unix=None,
+                    seed=0, **params):
+    from graph_file import load_graph
+
+    g = load_graph(in_graph_file)
+    rng = random.Random(seed)
+
+    # punkt do 20 m od losowego węzła
+    def point():
+        i = rng.randrange(g.node_count)
+        return [float(g.x[i]) + rng.uniform(-20, 20), float(g.y[i]) + rng.uniform(-20, 20)]
+
+    payloads = []
+    for _ in range(requests):
+        if kind == "route":
+            payloads.append(dict({"start": point(), "end": point()}, **params))
+        elif kind == "matrix":
+            payloads.append(dict({"sources": [point() for _ in range(5)], "targets": [point() for _ in range(5)]},
+                                 **params))
+        else:
+            payloads.append(dict({"points": [point()], "limit": 300}, **params))
+
+    latency = []
+    errors = 0
+    queue = deque(payloads)
+
+    async def worker():
+        nonlocal errors
+        client = await Client.connect(host, port, unix)
+        while queue:
+            payload = queue.popleft()
+            t0 = time.perf_counter()
+            status, _ = await client.request("POST", "/" + kind, payload)
+            latency.append((time.perf_counter() - t0) * 1000)
+            errors += status != 200
+        client.close()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    return dict({"requests": requests, "errors": errors, "seconds": elapsed, "per_second": requests / elapsed},
+                **latency_summary(latency))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="PathFinding routing server")
+    parser.add_argument("command", choices=["serve", "load"])
+    parser.add_argument("graph_file", help="graph file (.pfg)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="Unix socket path instead of TCP")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (0 - in the server process)")
+    parser.add_argument("--prepare", default="", help="structures built before start, e.g. index,alt,ch,td")
+    parser.add_argument("--cache-mb", type=float, default=64, help="route cache per worker [MB] (0 - off)")
+    parser.add_argument("--cache-ttl", type=float, default=None, help="route cache entry lifetime [s]")
+    parser.add_argument("--kind", default="route", choices=list(HANDLERS), help="load: request type")
+    parser.add_argument("--method", help="load: route / matrix method")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        server = RoutingServer(args.graph_file, args.workers, [p for p in args.prepare.split(",") if p],
+                               int(args.cache_mb * 2**20), args.cache_ttl)
+        try:
+            asyncio.run(server.serve(args.host, args.port, args.unix))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+    else:
+        extra = {"method": args.method} if args.method else {}
+        result = asyncio.run(load_test(args.graph_file, args.kind, args.requests, args.concurrency, args.host,
+                                       args.port, args.unix, **extra))
+        print(json.dumps(result, indent=2))
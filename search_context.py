@@ -0,0 +1,63 @@
+# Authors:  PAGistyczna Drużyna Cybergeodetów
+# Created:  2026-10-18
+#
+# Przestrzeń robocza przeszukiwania (A* / Dijkstra na grafie CSR) używana ponownie w kolejnych zapytaniach.
+# Zamiast nowych słowników i zbioru S dla każdego zapytania - listy indeksowane id węzła, przydzielane raz:
+#   g, h         - koszt dotarcia i wartość heurystyki
+#   parent       - poprzednik węzła, parent_edge - ID krawędzi od poprzednika
+#   seen, closed - numer zapytania (generation), w którym węzeł został odkryty / zdjęty z kolejki
+#   heap         - lista kopca heapq (f, węzeł), czyszczona na początku zapytania
+# Wartości z poprzednich zapytań nie są czyszczone - węzeł ma aktualne dane tylko gdy seen[v] == generation,
+# więc rozpoczęcie nowego zapytania to zwiększenie licznika (O(1) zamiast O(n)).
+# Jedna przestrzeń na wątek (CSRGraph.search_context) - nie wolno jej używać w dwóch przeszukiwaniach naraz.
+
+import sys
+
+class SearchContext:
+    def __init__(self, size=0):
+        self.size = 0
+        self.generation = 0
+        self.g = []
+        self.h = []
+        self.parent = []
+        self.parent_edge = []
+        self.seen = []
+        self.closed = []
+        self.heap = []
+        self.reserve(size)
+
+    # powiększenie list do size węzłów (np. graf z węzłami wirtualnymi)
+    def reserve(self, size):
+        extra = size - self.size
+        if extra > 0:
+            self.g.extend([0.0] * extra)
+            self.h.extend([0.0] * extra)
+            self.parent.extend([-1] * extra)
+            self.parent_edge.extend([-1] * extra)
+            self.seen.extend([0] * extra)
+            self.closed.extend([0] * extra)
+            self.size = size
+
+    # początek nowego zapytania na grafie o size węzłach - zwraca numer zapytania
+    def begin(self, size):
+        self.reserve(size)
+        self.heap.clear()
+        self.generation += 1
+        return self.generation
+
+    # węzły i ID krawędzi ścieżki od s do t (z poprzedników zapisanych w tym zapytaniu)
+    def path(self, s, t):
+        parent, parent_edge = self.parent, self.parent_edge
+        node_path = [t]
+        edge_ids_path = []
+        while node_path[-1] != s:
+            v = node_path[-1]
+            node_path.append(parent[v])
+            edge_ids_path.append(parent_edge[v])
+        node_path.reverse()
+        edge_ids_path.reverse()
+        return node_path, edge_ids_path
+
+    @property
+    def nbytes(self):
+        return sum(sys.getsizeof(a) for a in (self.g, self.h, self.parent, self.parent_edge, self.seen, self.closed))
@@ -0,0 +1,172 @@
+# Authors:  PAGistyczna Drużyna Cybergeodetów
+# Created:  2026-10-18
+#
+# Strumieniowy odczyt plików .shp / .shx / .dbf bez arcpy (działa też na Linuksie bez licencji ArcGIS).
+# Czytane są tylko potrzebne kolumny DBF oraz punkty linii - bez tworzenia obiektów geometrii.
+# Specyfikacja: ESRI Shapefile Technical Description (1998), dBASE III/IV.
+
+import os
+import struct
+import numpy as np
+
+SHP_NULL = 0
+SHP_POINT = 1
+SHP_POLYLINE = 3
+
+class ShapefileReader:
+    def __init__(self, path, fields=(), encoding=None):
+        self.base = os.path.splitext(path)[0]
+        self.fields = list(fields)  # kolumny DBF do odczytu (FID to numer rekordu, nie kolumna)
+
+        # .shx - liczba rekordów i ich położenie w pliku .shp
+        with open(self.base + ".shx", "rb") as f:
+            shx = f.read()
+        self.shape_type = struct.unpack_from("<i", shx, 32)[0]
+        self.bbox = struct.unpack_from("<4d", shx, 36)
+        index = np.frombuffer(shx, dtype=">i4", offset=100).reshape(-1, 2)
+        self.record_offsets = index[:, 0].astype(np.int64) * 2     # w bajtach
+        self.count = len(index)
+
+        # kodowanie DBF - z pliku .cpg (jak w ArcGIS), domyślnie UTF-8
+        if encoding is None:
+            encoding = "utf-8"
+            if os.path.exists(self.base + ".cpg"):
+                with open(self.base + ".cpg") as f:
+                    encoding = f.read().strip() or encoding
+        self.encoding = encoding
+        self._read_dbf_header()
+
+    def __len__(self):
+        return self.count
+
+    def _read_dbf_header(self):
+        with open(self.base + ".dbf", "rb") as f:
+            count, self.dbf_header_len, self.dbf_record_len = struct.unpack("<4xIHH20x", f.read(32))
+            self.dbf_fields = {}    # nazwa -> (przesunięcie w rekordzie, długość, typ)
+            position = 1            # pierwszy bajt rekordu to znacznik usunięcia
+            while True:
+                descriptor = f.read(32)
+                if not descriptor or descriptor[0] == 0x0D:
+                    break
+                name = descriptor[:11].split(b"\0")[0].decode("ascii")
+                self.dbf_fields[name] = (position, descriptor[16], chr(descriptor[11]))
+                position += descriptor[16]
+
+        if count != self.count:
+            raise ValueError(f"Record count mismatch: {self.count} in .shx, {count} in .dbf")
+        for name in self.fields:
+            if name not in self.dbf_fields:
+                raise ValueError(f"No field '{name}' in {self.base}.dbf")
+
+    # odczyt wybranych kolumn DBF dla rekordów start:stop
+    def _read_dbf(self, f, start, stop):
+        f.seek(self.dbf_header_len + start * self.dbf_record_len)
+        raw = f.read((stop - start) * self.dbf_record_len)
+        table = np.frombuffer(raw, dtype=np.uint8).reshape(stop - start, self.dbf_record_len)
+
+        columns = {}
+        for name in self.fields:
+            position, width, field_type = self.dbf_fields[name]
+            cells = np.ascontiguousarray(table[:, position:position + width]).view(f"S{width}").ravel()
+
+            # kolumny tekstowe mają mało różnych wartości - dekodujemy każdą raz
+            values, inverse = np.unique(cells, return_inverse=True)
+            decoded = [v.decode(self.encoding).strip() for v in values]
+            if field_type in "NF":
+                decoded = [float(v) if v else None for v in decoded]
+            columns[name] = [decoded[i] for i in inverse]
+        return columns
+
+    # odczyt punktów (wszystkie części linii) rekordów start:stop
+    def _read_shp(self, f, start, stop):
+        first = int(self.record_offsets[start])
+        if stop < self.count:
+            end = int(self.record_offsets[stop])
+        else:
+            end = os.fstat(f.fileno()).st_size
+        f.seek(first)
+        buf = f.read(end - first)
+
+        points = []             # tablice punktów kolejnych rekordów
+        point_counts = []       # liczba punktów rekordu (0 dla pustej geometrii)
+        part_starts = []        # indeksy (w obrębie rekordu) początków części linii
+        for offset in self.record_offsets[start:stop] - first:
+            offset = int(offset) + 8                                # nagłówek rekordu: numer i długość
+            shape_type = struct.unpack_from("<i", buf, offset)[0]
+            if shape_type == SHP_NULL:
+                point_counts.append(0)
+                part_starts.append(())
+            elif shape_type == SHP_POINT:
+                points.append(np.frombuffer(buf, dtype="<f8", count=2, offset=offset + 4))
+                point_counts.append(1)
+                part_starts.append((0,))
+            else:
+                num_parts, num_points = struct.unpack_from("<ii", buf, offset + 36)
+                part_starts.append(struct.unpack_from(f"<{num_parts}i", buf, offset + 44))
+                points.append(np.frombuffer(buf, dtype="<f8", count=2 * num_points, offset=offset + 44 + 4 * num_parts))
+                point_counts.append(num_points)
+
+        xy = np.concatenate(points).reshape(-1, 2) if points else np.empty((0, 2))
+        return xy, np.array(point_counts, dtype=np.int64), part_starts
+
+    # odczyt paczkami - słownik tablic / list dla kolejnych rekordów
+    #   fid               - numer rekordu (FID w ArcGIS dla plików shp)
+    #   x0, y0, x1, y1    - pierwszy i ostatni punkt geometrii (firstPoint, lastPoint)
+    #   length            - długość linii (suma długości wszystkich części)
+    #   valid             - False dla rekordów bez geometrii
+    #   <pole DBF>        - lista wartości kolumny
+    #   counts, xy        - przy geometry=True: liczba wierzchołków rekordów i wszystkie wierzchołki paczki (n x 2)
+    def batches(self, start=0, stop=None, batch_size=65536, geometry=False):
+        if stop is None:
+            stop = self.count
+        with open(self.base + ".shp", "rb") as shp, open(self.base + ".dbf", "rb") as dbf:
+            for batch_start in range(start, stop, batch_size):
+                batch_stop = min(batch_start + batch_size, stop)
+                xy, point_counts, part_starts = self._read_shp(shp, batch_start, batch_stop)
+
+                # indeksy pierwszego i ostatniego punktu rekordu w tablicy xy
+                first = np.zeros(len(point_counts), dtype=np.int64)
+                np.cumsum(point_counts[:-1], out=first[1:])
+                last = first + point_counts - 1
+                valid = point_counts > 0
+                first_v = np.where(valid, first, 0)
+                last_v = np.where(valid, last, 0)
+
+                # długość: suma odcinków, z pominięciem "odcinków" między częściami linii i rekordami
+                segment = np.hypot(np.diff(xy[:, 0]), np.diff(xy[:, 1]))
+                breaks = [first[i] + p - 1 for i, parts in enumerate(part_starts) for p in parts if p > 0 or first[i] > 0]
+                segment[np.array(breaks, dtype=np.int64)] = 0.0
+                cumulative = np.concatenate(([0.0], np.cumsum(segment)))
+
+                batch = {
+                    "fid": np.arange(batch_start, batch_stop, dtype=np.int64),
+                    "x0": xy[first_v, 0] if len(xy) else np.zeros(len(valid)),
+                    "y0": xy[first_v, 1] if len(xy) else np.zeros(len(valid)),
+                    "x1": xy[last_v, 0] if len(xy) else np.zeros(len(valid)),
+                    "y1": xy[last_v, 1] if len(xy) else np.zeros(len(valid)),
+                    "length": np.where(valid, cumulative[last_v] - cumulative[first_v], 0.0),
+                    "valid": valid,
+                }
+                if geometry:
+                    batch["counts"] = point_counts
+                    batch["xy"] = xy
+                batch.update(self._read_dbf(dbf, batch_start, batch_stop))
+                yield batch
+
+    # odczyt rekord po rekordzie: (fid, pierwszy punkt, ostatni punkt, długość, wartości pól DBF...)
+    def rows(self, start=0, stop=None):
+        for batch in self.batches(start, stop):
+            columns = [batch[name] for name in self.fields]
+            x0, y0, x1, y1 = batch["x0"].tolist(), batch["y0"].tolist(), batch["x1"].tolist(), batch["y1"].tolist()
+            length = batch["length"].tolist()
+            for i, fid in enumerate(batch["fid"].tolist()):
+                if batch["valid"][i]:
+                    yield (fid, (x0[i], y0[i]), (x1[i], y1[i]), length[i], *(column[i] for column in columns))
+
+# wiersze dla Graph.generate_graph: (FID, pierwszy punkt, ostatni punkt, długość, KLASA_DROG, DIRECTION)
+def read_road_rows(path):
+    return ShapefileReader(path, ["KLASA_DROG", "DIRECTION"]).rows()
+
+# punkty z pliku shp (np. data/test/test_1.shp z console_test.py)
+def read_points(path):
+    return [(p[1][0], p[1][1]) for p in ShapefileReader(path).rows()]
@@ -0,0 +1,316 @@
+# Authors:  PAGistyczna Drużyna Cybergeodetów
+# Created:  2026-10-18
+#
+# Indeks przestrzenny grafu CSR - regularna siatka kwadratowych komórek (bez arcpy.analysis.Near).
+# Dwie listy w układzie CSR (jak krawędzie w csr_graph):
+#   węzły:    komórka c -> node_items[node_offsets[c]:node_offsets[c + 1]] (id węzłów)
+#   odcinki:  komórka c -> seg_items[seg_offsets[c]:seg_offsets[c + 1]] (indeksy odcinków, każdy odcinek
+#             jest wpisany do wszystkich komórek, które przecina jego prostokąt ograniczający)
+# Odcinki (seg: x0, y0, x1, y1, seg_edge: ID krawędzi) to kolejne odcinki linii dróg między wierzchołkami
+# (z pełnej geometrii grafu, geometry.EdgeGeometry), a dla grafu bez geometrii - odcinki między węzłami końcowymi.
+# seg_f - położenie początku i końca odcinka na drodze (ułamek długości linii od jej pierwszego wierzchołka),
+# seg_node - węzeł grafu na początku linii drogi (ułamek 0).
+# Wyszukiwanie najbliższego obiektu przegląda kolejne "pierścienie" komórek wokół punktu.
+
+import math
+import numpy as np
+
+class SpatialIndex:
+    def __init__(self, graph, sections, grid):
+        self.graph = graph
+        for name, array in sections.items():
+            setattr(self, name, array)
+        self.x0, self.y0, self.cell, self.nx, self.ny = grid
+        self.nx = int(self.nx)
+        self.ny = int(self.ny)
+
+        # memoryview - szybki odczyt w pętli zapytania
+        self._mv = {name: memoryview(np.ascontiguousarray(array)) for name, array in sections.items()}
+        self._mv["seg"] = self._mv["seg"].cast("B").cast("d")          # (m, 4) -> płaska lista
+        self._mv["seg_f"] = self._mv["seg_f"].cast("B").cast("d")      # (m, 2) -> płaska lista
+
+    # budowa indeksu
+    #   cell - bok komórki [m]; domyślnie ok. 2 komórki na węzeł albo na odcinek (gdy odcinków jest więcej),
+    #          mniejsze komórki to mniej odcinków sprawdzanych w zapytaniu kosztem większego indeksu
+    @classmethod
+    def build(cls, graph, cell=None):
+        x, y = np.asarray(graph.x), np.asarray(graph.y)
+        seg, seg_edge, seg_f, seg_node = _segments(graph)
+
+        x0, y0 = float(x.min()), float(y.min())
+        width = max(float(x.max()) - x0, 1.0)
+        height = max(float(y.max()) - y0, 1.0)
+        if cell is None:
+            cell = max(math.sqrt(width * height / max(graph.node_count, len(seg), 1) / 2), 1.0)
+        nx = int(width // cell) + 1
+        ny = int(height // cell) + 1
+
+        grid = (x0, y0, cell, nx, ny)
+        node_items, node_offsets = _bucket(_node_cells(x, y, grid), nx * ny)
+        owner, cells = _seg_cells(seg, grid)
+        seg_items, seg_offsets = _bucket(cells, nx * ny)
+        seg_items = owner[seg_items]
+
+        sections = {
+            "si_node_offsets": node_offsets,
+            "si_node_items": node_items,
+            "si_seg_offsets": seg_offsets,
+            "si_seg_items": seg_items.astype(np.int32),
+            "seg": seg,
+            "seg_edge": seg_edge.astype(np.int32),
+            "seg_f": seg_f,
+            "seg_node": seg_node.astype(np.int32),
+        }
+        return cls(graph, sections, grid)
+
+    # indeks grafu po zmianach (graph_update.apply_edits, GraphDelta.merge) bez budowy od nowa - zmieniane są tylko
+    # wpisy zmienionych dróg i węzłów: odcinki krawędzi removed wypadają ze swoich komórek, odcinki nowych dróg
+    # (arcs - po jednej krawędzi skierowanej na drogę w nowym grafie) i nowe węzły są dopisywane na końcu swoich komórek.
+    #   new_id - numer węzła w nowym grafie dla węzłów starego grafu i kolejnych nowych węzłów (-1 - węzeł usunięty)
+    # Zwraca None, gdy nowy węzeł leży poza siatką (wtedy indeks trzeba zbudować od nowa).
+    def patch(self, graph, removed, arcs, new_id):
+        x, y = np.asarray(graph.x), np.asarray(graph.y)
+        fresh = new_id[int(self.si_node_offsets[-1]):]         # nowe węzły (za węzłami starego grafu)
+        fresh = fresh[fresh >= 0]
+        grid = (self.x0, self.y0, self.cell, self.nx, self.ny)
+        if np.any((x[fresh] < self.x0) | (y[fresh] < self.y0) |
+                  ((x[fresh] - self.x0) // self.cell >= self.nx) | ((y[fresh] - self.y0) // self.cell >= self.ny)):
+            return None
+
+        node_items = new_id[self.si_node_items]
+        node_items, node_offsets = _patch_bucket(node_items, self.si_node_offsets, node_items >= 0,
+                                                 fresh, _node_cells(x[fresh], y[fresh], grid))
+
+        keep = ~np.isin(self.seg_edge, np.fromiter(removed, dtype=np.int64))
+        seg, seg_edge, seg_f, seg_node = _segments(graph, arcs)
+        owner, cells = _seg_cells(seg, grid)
+        renumber = np.cumsum(keep) - 1
+        seg_items, seg_offsets = _patch_bucket(renumber[self.si_seg_items], self.si_seg_offsets,
+                                               keep[self.si_seg_items], owner + int(keep.sum()), cells)
+
+        sections = {
+            "si_node_offsets": node_offsets,
+            "si_node_items": node_items.astype(np.int32),
+            "si_seg_offsets": seg_offsets,
+            "si_seg_items": seg_items.astype(np.int32),
+            "seg": np.concatenate((self.seg[keep], seg)),
+            "seg_edge": np.concatenate((self.seg_edge[keep], seg_edge)).astype(np.int32),
+            "seg_f": np.concatenate((self.seg_f[keep], seg_f)),
+            "seg_node": np.concatenate((new_id[self.seg_node[keep]], seg_node)).astype(np.int32),
+        }
+        return SpatialIndex(graph, sections, grid)
+
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self._mv)
+
+    # komórki w odległości (w komórkach) dokładnie r od komórki (cx, cy)
+    def _ring(self, cx, cy, r):
+        nx, ny = self.nx, self.ny
+        if r == 0:
+            if 0 <= cx < nx and 0 <= cy < ny:
+                yield cy * nx + cx
+            return
+        for i in range(max(cx - r, 0), min(cx + r, nx - 1) + 1):
+            if cy - r >= 0:
+                yield (cy - r) * nx + i
+            if cy + r < ny:
+                yield (cy + r) * nx + i
+        for j in range(max(cy - r + 1, 0), min(cy + r - 1, ny - 1) + 1):
+            if cx - r >= 0:
+                yield j * nx + cx - r
+            if cx + r < nx:
+                yield j * nx + cx + r
+
+    # przegląd pierścieni komórek: visit(c) dla każdej komórki, dopóki najbliższy obiekt
+    # (best() - aktualna odległość) może jeszcze leżeć w kolejnym pierścieniu
+    def _search(self, point, max_dist, visit, best):
+        px, py = point[0], point[1]
+        cell = self.cell
+        fx = (px - self.x0) / cell
+        fy = (py - self.y0) / cell
+        cx, cy = math.floor(fx), math.floor(fy)
+
+        # punkt poza siatką - od pierwszego pierścienia, który do niej sięga
+        r = max(0, -cx, cx - self.nx + 1, -cy, cy - self.ny + 1)
+        r_max = int(max_dist // cell) + 1 if max_dist != math.inf else max(self.nx, self.ny) + r
+        # odległość punktu od brzegu własnej komórki - pierścień r + 1 jest od punktu dalej niż r * cell + margin
+        margin = min(fx - cx, cx + 1 - fx, fy - cy, cy + 1 - fy) * cell
+        while r <= r_max:
+            for c in self._ring(cx, cy, r):
+                visit(c)
+            if best() <= r * cell + margin:
+                break
+            r += 1
+
+    # najbliższy węzeł: (id węzła, odległość) albo None, gdy w promieniu max_dist nie ma węzła
+    def nearest_node(self, point, max_dist=math.inf):
+        mv = self._mv
+        offsets, items = mv["si_node_offsets"], mv["si_node_items"]
+        x, y = self.graph.views()["x"], self.graph.views()["y"]
+        px, py = float(point[0]), float(point[1])
+        found = [None, max_dist * max_dist]
+
+        def visit(c):
+            for k in range(offsets[c], offsets[c + 1]):
+                v = items[k]
+                d = (x[v] - px) ** 2 + (y[v] - py) ** 2
+                if d < found[1]:
+                    found[0], found[1] = v, d
+
+        self._search(point, max_dist, visit, lambda: math.sqrt(found[1]))
+        if found[0] is None:
+            return None
+        return found[0], math.sqrt(found[1])
+
+    # najbliższy punkt na drodze: (indeks odcinka, ID krawędzi, (x, y) rzutu, f, odległość) albo None
+    #   f - położenie rzutu na drodze: ułamek długości linii od węzła seg_node[odcinek] (0 i 1 - węzły końcowe)
+    def nearest_edge(self, point, max_dist=math.inf):
+        mv = self._mv
+        offsets, items, seg = mv["si_seg_offsets"], mv["si_seg_items"], mv["seg"]
+        px, py = float(point[0]), float(point[1])
+        seen = set()
+        found = [None, max_dist * max_dist, 0.0]
+
+        def visit(c):
+            for k in range(offsets[c], offsets[c + 1]):
+                s = items[k]
+                if s in seen:
+                    continue
+                seen.add(s)
+                ax, ay, bx, by = seg[4 * s], seg[4 * s + 1], seg[4 * s + 2], seg[4 * s + 3]
+                dx, dy = bx - ax, by - ay
+                dd = dx * dx + dy * dy
+                t = ((px - ax) * dx + (py - ay) * dy) / dd if dd > 0 else 0.0
+                t = 0.0 if t < 0 else 1.0 if t > 1 else t
+                d = (ax + t * dx - px) ** 2 + (ay + t * dy - py) ** 2
+                if d < found[1]:
+                    found[0], found[1], found[2] = s, d, t
+
+        self._search(point, max_dist, visit, lambda: math.sqrt(found[1]))
+        s, d, t = found
+        if s is None:
+            return None
+        ax, ay, bx, by = seg[4 * s], seg[4 * s + 1], seg[4 * s + 2], seg[4 * s + 3]
+        f0, f1 = mv["seg_f"][2 * s], mv["seg_f"][2 * s + 1]
+        return s, mv["seg_edge"][s], (ax + t * (bx - ax), ay + t * (by - ay)), f0 + t * (f1 - f0), math.sqrt(d)
+
+    # zapis jako sekcje pliku grafu, parametry siatki w metadanych
+    def sections(self):
+        return {name: getattr(self, name) for name in self._mv}, \
+               {"si_grid": [self.x0, self.y0, self.cell, self.nx, self.ny]}
+
+    @classmethod
+    def from_graph_file(cls, graph):
+        f = getattr(graph, "graph_file", None)
+        if f is None or "si_node_items" not in f or "seg_f" not in f:
+            return None                     # brak indeksu albo indeks z odcinkami bez położenia na drodze
+        names = ("si_node_offsets", "si_node_items", "si_seg_offsets", "si_seg_items", "seg", "seg_edge", "seg_f",
+                 "seg_node")
+        index = cls(graph, {name: f[name] for name in names}, f.meta["si_grid"])
+        stamp = f.meta.get("si_graph_checksum", f.base_checksum)
+        if stamp == f.checksum_of(graph):
+            return index
+        if graph._edits is None or stamp != f.base_checksum:
+            return None                     # zbudowany dla grafu sprzed zmian
+        # indeks grafu bazowego, a graf z sekcjami zmian (graph_update.GraphDelta.merge) - poprawiony o zmiany
+        edits = graph._edits
+        return index.patch(graph, edits["removed"], edits["roads"], edits["new_id"])
+
+# odcinki dróg grafu: (seg (m, 4), ID krawędzi, seg_f (m, 2), seg_node) - jedna droga na krawędź z pliku
+# źródłowego (dwie krawędzie skierowane "both" to jedna linia)
+#   arcs - tylko drogi tych krawędzi skierowanych (po jednej na drogę); domyślnie wszystkie drogi
+def _segments(graph, arcs=None):
+    x, y = np.asarray(graph.x), np.asarray(graph.y)
+    if arcs is None:
+        edge_ids, first = np.unique(np.asarray(graph.edge_ids), return_index=True)
+    else:
+        first = np.asarray(arcs, dtype=np.int64)
+        edge_ids = np.asarray(graph.edge_ids)[first]
+    src, dst = graph.arc_sources()[first], np.asarray(graph.targets)[first]
+    geometry = getattr(graph, "geometry", None)
+    if geometry is None:
+        seg = np.column_stack((x[src], y[src], x[dst], y[dst]))
+        return seg, edge_ids, np.tile([0.0, 1.0], (len(seg), 1)), src
+
+    xy, counts = geometry.lines(edge_ids)
+    ends = np.cumsum(counts)
+    # linia zaczyna się przy węźle src albo dst krawędzi skierowanej first
+    head, tail = xy[ends - counts], xy[ends - 1]
+    forward = (np.hypot(*(head - np.column_stack((x[src], y[src]))).T) +
+               np.hypot(*(tail - np.column_stack((x[dst], y[dst]))).T) <=
+               np.hypot(*(head - np.column_stack((x[dst], y[dst]))).T) +
+               np.hypot(*(tail - np.column_stack((x[src], y[src]))).T))
+
+    # odcinki między kolejnymi wierzchołkami tej samej linii
+    step = np.hypot(*np.diff(xy, axis=0).T)
+    inner = np.ones(len(xy) - 1, dtype=bool) if len(xy) else np.zeros(0, dtype=bool)
+    inner[ends[:-1] - 1] = False                                # między ostatnim wierzchołkiem linii i pierwszym następnej
+    owner = np.repeat(np.arange(len(edge_ids)), counts)[:-1][inner]
+    step = np.where(inner, step, 0.0)
+    along = np.concatenate(([0.0], np.cumsum(step)))            # długość od początku pierwszej linii
+    start = along[ends - counts]
+    total = along[ends - 1] - start
+    a = np.flatnonzero(inner)
+    scale = np.where(total[owner] > 0, total[owner], 1.0)
+    seg_f = np.column_stack(((along[a] - start[owner]) / scale, (along[a + 1] - start[owner]) / scale))
+    seg = np.column_stack((xy[a], xy[a + 1]))
+    return seg, edge_ids[owner], np.clip(seg_f, 0.0, 1.0), np.where(forward, src, dst)[owner]
+
+# komórki węzłów
+def _node_cells(x, y, grid):
+    x0, y0, cell, nx, ny = grid
+    ix = np.minimum(((x - x0) // cell).astype(np.int64), nx - 1)
+    iy = np.minimum(((y - y0) // cell).astype(np.int64), ny - 1)
+    return iy * nx + ix
+
+# komórki odcinków - wszystkie komórki prostokąta ograniczającego: (numer odcinka, komórka) dla każdego wpisu
+def _seg_cells(seg, grid):
+    x0, y0, cell, nx, ny = grid
+    ix0 = np.clip((np.minimum(seg[:, 0], seg[:, 2]) - x0) // cell, 0, nx - 1).astype(np.int64)
+    ix1 = np.clip((np.maximum(seg[:, 0], seg[:, 2]) - x0) // cell, 0, nx - 1).astype(np.int64)
+    iy0 = np.clip((np.minimum(seg[:, 1], seg[:, 3]) - y0) // cell, 0, ny - 1).astype(np.int64)
+    iy1 = np.clip((np.maximum(seg[:, 1], seg[:, 3]) - y0) // cell, 0, ny - 1).astype(np.int64)
+    w = ix1 - ix0 + 1
+    counts = w * (iy1 - iy0 + 1)
+    owner = np.repeat(np.arange(len(seg)), counts)
+    k = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)    # numer komórki w prostokącie
+    return owner, (iy0[owner] + k // w[owner]) * nx + ix0[owner] + k % w[owner]
+
+# zmiana listy obiektów w komórkach (_bucket): bez wpisów ~keep, z obiektami new_items dopisanymi na końcu
+# komórek new_cells
+def _patch_bucket(items, offsets, keep, new_items, new_cells):
+    n_cells = len(offsets) - 1
+    dropped = np.searchsorted(offsets, np.flatnonzero(~keep), "right") - 1    # komórki usuniętych wpisów
+    counts = np.diff(offsets) - np.bincount(dropped, minlength=n_cells)
+    order = np.argsort(new_cells, kind="stable")
+    items = np.insert(items[keep], np.cumsum(counts)[new_cells[order]], np.asarray(new_items)[order])
+    offsets = np.zeros(n_cells + 1, dtype=np.int64)
+    np.cumsum(counts + np.bincount(new_cells, minlength=n_cells), out=offsets[1:])
+    return items, offsets
+
+# numery obiektów pogrupowane według komórek: (obiekty, przesunięcia o długości n_cells + 1)
+def _bucket(cells, n_cells):
+    items = np.argsort(cells, kind="stable").astype(np.int32)
+    offsets = np.zeros(n_cells + 1, dtype=np.int64)
+    np.cumsum(np.bincount(cells, minlength=n_cells), out=offsets[1:])
+    return items, offsets
+
+# indeks grafu: z pliku grafu, a jeśli go tam nie ma - zbudowany w pamięci. Plik grafu nie jest zmieniany w czasie
+# zapytań (czytają go też inne procesy, np. routing_server) - indeks zapisują generate_launcher,
+# graph_update.compact_graph_file i routing_server.prepare_graph_file (save_spatial_index)
+def spatial_index(graph):
+    index = SpatialIndex.from_graph_file(graph)
+    return index if index is not None else SpatialIndex.build(graph)
+
+# budowa indeksu i dopisanie do pliku grafu (jeśli nie ma w nim aktualnego)
+def save_spatial_index(graph):
+    from graph_file import append_sections
+
+    index = SpatialIndex.from_graph_file(graph)
+    if index is None:
+        index = SpatialIndex.build(graph)
+        f = graph.graph_file
+        sections, meta = index.sections()
+        meta["si_graph_checksum"] = f.graph_checksum
+        append_sections(f.path, sections, meta)
+    return index
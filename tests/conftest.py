@@ -0,0 +1,36 @@
+# Authors:  PAGistyczna Drużyna Cybergeodetów
+# Created:  2026-10-18
+#
+# Wspólne dane testów: graf z danych Torunia (nowy_SKJZ_L.zip, jak w benchmark.py) i losowe pary węzłów.
+# Użycie:  python -m pytest tests
+
+import os
+import random
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)                # moduły projektu to pliki w katalogu głównym
+TORUN_ZIP = os.path.join(ROOT, "nowy_SKJZ_L.zip")
+
+@pytest.fixture(scope="session")
+def shp():
+    import benchmark
+
+    if not os.path.exists(TORUN_ZIP):
+        pytest.skip("Toruń data (nowy_SKJZ_L.zip) not available")
+    return benchmark.source_shp(TORUN_ZIP)
+
+@pytest.fixture(scope="session")
+def graph(shp):
+    import graph_builder
+
+    return graph_builder.load_graph(shp, "shp")
+
+# pary współrzędnych węzłów (start, koniec)
+@pytest.fixture(scope="session")
+def pairs(graph):
+    rng = random.Random(0)
+    return [(graph.coords(rng.randrange(graph.node_count)), graph.coords(rng.randrange(graph.node_count)))
+            for _ in range(40)]
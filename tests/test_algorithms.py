@@ -0,0 +1,163 @@
+# Authors:  PAGistyczna Drużyna Cybergeodetów
+# Created:  2026-10-18
+#
+# Zgodność algorytmów wyszukiwania tras: koszty A*, dwukierunkowego A*, Dijkstry, ALT i CH równe kosztom
+# z one_to_all (Dijkstra do wszystkich węzłów), macierz CH równa macierzy Dijkstry.
+
+import math
+
+import numpy as np
+import pytest
+
+import pqueue
+
+COSTS = ("length", "time")
+
+@pytest.fixture(scope="module")
+def hierarchies(graph):
+    from contraction import ContractionHierarchy
+
+    return {cost: ContractionHierarchy.build(graph, cost) for cost in COSTS}
+
+@pytest.fixture(scope="module")
+def landmarks(graph):
+    from landmarks import Landmarks
+
+    return {cost: Landmarks.build(graph, cost) for cost in COSTS}
+
+# koszty z one_to_all dla par (inf - brak ścieżki)
+def reference_costs(graph, pairs, cost):
+    return [float(graph.one_to_all(cost, [graph.node_id(start)])[graph.node_id(end)]) for start, end in pairs]
+
+def assert_costs(results, expected):
+    for result, cost in zip(results, expected):
+        if math.isinf(cost):
+            assert result is None
+        else:
+            assert result is not None and result[2] == pytest.approx(cost, rel=1e-9, abs=1e-6)
+
+@pytest.mark.parametrize("cost", COSTS)
+def test_point_to_point_matches_one_to_all(graph, pairs, hierarchies, landmarks, cost):
+    from toolbox_core import h_length, h_time
+
+    h = h_length if cost == "length" else h_time
+    expected = reference_costs(graph, pairs, cost)
+    assert_costs([graph.aShift8(cost, h, start, end) for start, end in pairs], expected)
+    assert_costs([graph.aShift8_bidirectional(cost, h, start, end) for start, end in pairs], expected)
+    assert_costs([graph.dijkstra(cost, start, end) for start, end in pairs], expected)
+    assert_costs([graph.aShift8(cost, landmarks[cost], start, end) for start, end in pairs], expected)
+    assert_costs([hierarchies[cost].query(start, end) for start, end in pairs], expected)
+
+# krawędzie ścieżki A* składają się na jej koszt
+def test_path_edges_add_up_to_cost(graph, pairs):
+    from toolbox_core import h_time
+
+    for start, end in pairs:
+        result = graph.aShift8("time", h_time, start, end)
+        if result is None:
+            continue
+        path, edge_ids, cost = result[0], result[1], result[2]
+        nodes = [graph.node_id(xy) for xy in path]
+        total = 0.0
+        for u, v, edge_id in zip(nodes, nodes[1:], edge_ids):
+            arcs = [k for k in range(graph.offsets[u], graph.offsets[u + 1])
+                    if graph.targets[k] == v and graph.edge_ids[k] == edge_id]
+            total += min(graph.time[k] for k in arcs)
+        assert total == pytest.approx(cost)
+
+@pytest.mark.parametrize("queue", list(pqueue.QUEUES))
+def test_queues_give_same_costs(graph, pairs, queue):
+    from toolbox_core import h_time
+
+    expected = reference_costs(graph, pairs, "time")
+    assert_costs([graph.aShift8("time", h_time, start, end, queue=queue) for start, end in pairs], expected)
+    assert_costs([graph.aShift8_bidirectional("time", h_time, start, end, queue=queue) for start, end in pairs],
+                 expected)
+
+def test_ch_matrix_matches_dijkstra_matrix(graph, pairs, hierarchies):
+    from matrix import distance_matrix
+
+    sources = [start for start, _ in pairs[:10]]
+    targets = [end for _, end in pairs[:10]]
+    m_dijkstra = distance_matrix(graph, sources, targets, "time", "dijkstra")
+    m_ch = distance_matrix(graph, sources, targets, "time", "ch", ch=hierarchies["time"])
+    np.testing.assert_array_equal(np.isinf(m_ch), np.isinf(m_dijkstra))
+    finite = np.isfinite(m_dijkstra)
+    np.testing.assert_allclose(m_ch[finite], m_dijkstra[finite], rtol=1e-9)
+
+# macierz dla dowolnych punktów (węzły wirtualne) jak snap_split + A* dla każdej pary
+def test_matrix_matches_pairwise_snap(graph):
+    from benchmark import test_points
+    from matrix import distance_matrix
+    from toolbox_core import h_time
+
+    points, _ = test_points(graph, "", "", grid=4)
+    pairwise = np.full((len(points), len(points)), math.inf)
+    for i, start in enumerate(points):
+        for j, end in enumerate(points):
+            try:
+                (s, e), _, snap_time, virtual = graph.snap_split(start, end)
+            except ValueError:
+                continue                                    # punkt poza siecią
+            r = graph.aShift8("time", h_time, s, e, virtual=virtual)
+            if r is not None:
+                pairwise[i, j] = r[2] + snap_time
+    m = distance_matrix(graph, points, points, "time", "dijkstra")
+    np.testing.assert_array_equal(np.isinf(m), np.isinf(pairwise))
+    finite = np.isfinite(pairwise)
+    np.testing.assert_allclose(m[finite], pairwise[finite], rtol=1e-9, atol=1e-6)
+
+# zasięg: węzły osiągnięte w limicie to węzły o koszcie z one_to_all nie większym niż limit
+def test_reach_matches_one_to_all(graph):
+    from reach import reach
+
+    start = int(np.argmin((graph.x - graph.x.mean()) ** 2 + (graph.y - graph.y.mean()) ** 2))
+    r = reach(graph, [start], 300.0)
+    dist = graph.one_to_all("time", [start])
+    assert sorted(r.nodes().tolist()) == np.flatnonzero(dist <= 300.0).tolist()
+
+# model pory dnia ze stałymi współczynnikami 1.0 - koszty jak statyczny A*
+def test_time_dependent_with_constant_factors_matches_static(graph, pairs):
+    from time_dependent import TimeDependentModel, td_aShift8
+
+    flat = TimeDependentModel(np.ones((1, 97)), np.zeros(graph.edge_count, dtype=np.uint16), 900)
+    assert_costs([td_aShift8(graph, flat, start, end, 0) for start, end in pairs],
+                 reference_costs(graph, pairs, "time"))
+
+# trasy z pamięci tras mają te same koszty co wyszukane
+def test_route_cache_returns_search_costs(graph, pairs):
+    from route_cache import RouteCache
+    from toolbox_core import h_time
+
+    cache = RouteCache(2**20)
+    for start, end in pairs + pairs[:10]:
+        result = graph.aShift8("time", h_time, start, end)
+        cached = cache.get(start, end, "time")
+        if cached is None and result is not None:
+            cache.put(start, end, "time", result[0], result[1], result[2])
+        elif result is not None:
+            assert cached[2] == result[2] and list(cached[1]) == list(result[1])
+
+# przestrzeń robocza wątku używana ponownie - te same wyniki co nowa dla każdego zapytania
+def test_shared_search_context(graph, pairs):
+    from search_context import SearchContext
+    from toolbox_core import h_time
+
+    for start, end in pairs:
+        shared = graph.aShift8("time", h_time, start, end)
+        fresh = graph.aShift8("time", h_time, start, end, context=SearchContext(graph.node_count))
+        assert (shared is None) == (fresh is None)
+        if shared is not None:
+            assert shared[:3] == fresh[:3]
+
+def test_route_batch_in_processes_matches_serial(graph, pairs, tmp_path):
+    from batch_routing import route_batch
+    from graph_file import save_graph
+    from spatial_index import SpatialIndex
+
+    pfg = str(tmp_path / "PF_graph.pfg")
+    save_graph(pfg, graph, *SpatialIndex.build(graph).sections())
+    serial = [result.get("cost") for _, result in route_batch(pairs, "time", 0, pfg)]
+    parallel = [result.get("cost") for _, result in route_batch(pairs, "time", 2, pfg)]
+    assert parallel == serial
+    assert_costs([None if c is None else (None, None, c) for c in serial], reference_costs(graph, pairs, "time"))
@@ -0,0 +1,143 @@
+# Authors:  PAGistyczna Drużyna Cybergeodetów
+# Created:  2026-10-18
+#
+# Budowa i zmiany grafu: graph_builder i build_parallel dają ten sam graf co Graph.generate_graph,
+# graph_update ten sam co budowa od nowa, indeks przestrzenny te same wyniki co pełny przegląd odcinków.
+
+import os
+import random
+
+import numpy as np
+import pytest
+
+CSR_ARRAYS = ("x", "y", "offsets", "targets", "edge_ids", "length", "time")
+
+def assert_same_graph(a, b, names=CSR_ARRAYS):
+    for name in names:
+        np.testing.assert_array_equal(getattr(a, name), getattr(b, name), err_msg=name)
+
+# krawędzie skierowane jako krotki współrzędnych końców (niezależne od numeracji węzłów i kolejności krawędzi)
+def arcs(g):
+    s = g.arc_sources()
+    return sorted(zip(g.x[s].tolist(), g.y[s].tolist(), g.x[g.targets].tolist(), g.y[g.targets].tolist(),
+                      g.edge_ids.tolist(), g.time.tolist()))
+
+def test_builder_matches_generate_graph(shp, graph):
+    from csr_graph import CSRGraph
+    from toolbox_core import Graph
+
+    assert_same_graph(CSRGraph.from_graph(Graph(shp, loader="shp")), graph)
+
+# pętla Graph.generate_graph i graph_builder na tych samych wierszach sieci syntetycznej
+def test_builder_matches_generate_graph_on_synthetic_rows():
+    import graph_builder
+    from benchmark import _loop_graph, synthetic_rows
+    from csr_graph import CSRGraph
+
+    columns = synthetic_rows(20_000)
+    assert_same_graph(CSRGraph.from_graph(_loop_graph(columns)), graph_builder.build_graph(*columns))
+
+def test_shp_loader_matches_arcpy_cursor(shp):
+    import toolbox_core as tb
+
+    if tb.arcpy is None:
+        pytest.skip("arcpy not available")
+    g = tb.Graph(shp, loader="shp")
+    id_field, tb.IDFIELD = tb.IDFIELD, "FID"
+    try:
+        g_arcpy = tb.Graph(shp, loader="arcpy")
+    finally:
+        tb.IDFIELD = id_field
+    assert list(g.nodes) == list(g_arcpy.nodes)
+    for xy in g.nodes:
+        assert [(e.id, e.edge_id) for e in g.nodes[xy].edges] == [(e.id, e.edge_id) for e in g_arcpy.nodes[xy].edges]
+
+# zasięg i wybór krawędzi jak w dawnym Dijsktra_launcher
+def test_reach_matches_dict_graph(shp, graph):
+    from reach import reach
+    from toolbox_core import Graph
+
+    g = Graph(shp, loader="shp")
+    start = graph.coords(int(np.argmin((graph.x - graph.x.mean()) ** 2 + (graph.y - graph.y.mean()) ** 2)))
+    r = reach(graph, [graph.node_id(start)], 300.0)
+    reachable = g.dijkstra_with_time_limit(start, 300.0)
+    assert sorted(reachable) == sorted(r.coords())
+    edge_ids = {edge.edge_id for node in reachable for edge in g.nodes[node].edges if edge.id in reachable}
+    assert sorted(edge_ids) == r.edge_ids().tolist()
+
+@pytest.mark.parametrize("tolerance", [None, 1.0])
+def test_build_parallel_matches_load_graph(shp, tolerance):
+    import graph_builder
+
+    merger = lambda: graph_builder.NodeMerger(tolerance, tile=2000) if tolerance is not None else None
+    single = graph_builder.load_graph(shp, "shp", merger())
+    for workers in (1, 2):
+        g = graph_builder.build_parallel(shp, workers, 5000, merger())
+        assert_same_graph(g, single, ("x", "y", "offsets", "targets", "edge_ids"))
+        # długości liczone w częściach - różnice rzędu błędu zaokrąglenia
+        np.testing.assert_allclose(g.length, single.length, rtol=1e-9)
+        np.testing.assert_allclose(g.time, single.time, rtol=1e-9)
+
+def test_nearest_edge_matches_brute_force(graph):
+    from spatial_index import SpatialIndex
+
+    index = SpatialIndex.build(graph)
+    rng = random.Random(0)
+    a, d = index.seg[:, :2], index.seg[:, 2:] - index.seg[:, :2]
+    dd = np.where((d * d).sum(1) > 0, (d * d).sum(1), 1)
+    for _ in range(200):
+        v = rng.randrange(graph.node_count)
+        p = np.array((graph.x[v] + rng.uniform(-100, 100), graph.y[v] + rng.uniform(-100, 100)))
+        t = np.clip(((p - a) * d).sum(1) / dd, 0, 1)
+        brute = np.sqrt(((a + t[:, None] * d - p) ** 2).sum(1)).min()
+        assert index.nearest_edge(tuple(p))[4] == pytest.approx(brute)
+
+# zmiany w pliku .pfg: graf po zmianach jak zbudowany od nowa z wierszy po zmianach, także po kolejnych zmianach
+# i po przepisaniu pliku; końce nowych dróg przesunięte o ułamki metra (łączenie przez narożniki kwadratów)
+def test_update_graph_file_matches_rebuild(shp, graph, tmp_path):
+    import graph_builder
+    from graph_file import load_graph, save_graph
+    from graph_update import compact_graph_file, update_graph_file
+    from landmarks import Landmarks, save_landmarks
+    from shp_reader import read_road_rows
+    from spatial_index import SpatialIndex
+
+    pfg = str(tmp_path / "PF_graph.pfg")
+    save_graph(pfg, graph, *SpatialIndex.build(graph).sections())
+    save_landmarks(load_graph(pfg), "time")
+    current = {row[0]: row for row in read_road_rows(shp)}
+    next_id = max(current) + 1
+    rng = random.Random(0)
+    for _ in range(3):
+        picked = rng.sample(sorted(current), 60)
+        removed = picked[:20]
+        modified = [(i, *current[i][1:4], "droga lokalna", "ltf") for i in picked[20:40]]
+        added = []
+        for i in picked[40:]:
+            first, last = current[i][1], current[i][2]
+            added.append((next_id, (first[0] + rng.choice((0.0, 0.4, -0.6)), first[1] + rng.choice((0.5, -0.3))),
+                          (last[0] + 25.3, last[1] + 13.1), 30.0, "droga lokalna", "both"))
+            next_id += 1
+        size = os.path.getsize(pfg)
+        update_graph_file(pfg, added, removed, modified, compact=None)
+        assert os.path.getsize(pfg) - size < 2**20          # tylko sekcje zmian, nie kopia grafu
+        for i in removed:
+            del current[i]
+        current.update({row[0]: row for row in modified + added})
+
+        updated = load_graph(pfg)
+        columns = list(zip(*current.values()))
+        first, last = np.array(columns[1]), np.array(columns[2])
+        rebuilt = graph_builder.build_graph(first[:, 0], first[:, 1], last[:, 0], last[:, 1], columns[0],
+                                            columns[3], columns[4], columns[5])
+        assert_same_graph(updated, rebuilt, ("x", "y"))
+        assert arcs(updated) == arcs(rebuilt)
+        assert Landmarks.from_graph_file(updated) is None
+        assert SpatialIndex.from_graph_file(updated) is not None
+
+    before = arcs(updated)
+    compact_graph_file(pfg)
+    compacted = load_graph(pfg)
+    assert compacted._edits is None
+    assert arcs(compacted) == before
+    assert SpatialIndex.from_graph_file(compacted) is not None
@@ -0,0 +1,288 @@
+# Authors:  PAGistyczna Drużyna Cybergeodetów
+# Created:  2026-10-18
+#
+# Wyznaczanie tras zależnych od pory dnia (godziny szczytu) - czas przejazdu krawędzi zależy od chwili wjazdu na nią:
+#   czas(k, t) = koszt(k) * współczynnik(profil(k), t)
+# koszt(k) to czas przejazdu krawędzi w ruchu swobodnym ("time" albo profil kosztów z cost_profiles),
+# a współczynnik to funkcja kawałkami liniowa pory dnia (okres 24 h) - osobna dla klasy drogi albo dla krawędzi.
+# Zapis zwarty: funkcje próbkowane co step sekund w tablicy factors (liczba funkcji x (86400 / step + 1)) i numer
+# funkcji dla każdej krawędzi skierowanej (profile) - obliczenie współczynnika to interpolacja między dwiema
+# sąsiednimi próbkami bez wyszukiwania przedziału.
+# Wymagana własność FIFO: późniejszy wjazd na krawędź nie daje wcześniejszego zjazdu (spadek współczynnika
+# nie szybszy niż 1 / koszt(k) na sekundę) - wtedy A* z etykietami czasu przyjazdu daje trasy optymalne.
+
+import heapq
+import math
+import weakref
+from itertools import repeat
+import numpy as np
+
+DAY = 86400
+_built = weakref.WeakKeyDictionary()      # graf -> {metryka: TimeDependentModel} zbudowane w pamięci
+
+# współczynniki czasu przejazdu dla klas dróg: lista (godzina, współczynnik), między punktami interpolacja liniowa
+MAIN_ROADS = [(0, 1.0), (6, 1.0), (7.5, 1.6), (9, 1.2), (15, 1.3), (16.5, 1.7), (18, 1.3), (20, 1.0)]
+EXPRESS_ROADS = [(0, 1.0), (6.5, 1.0), (7.5, 1.3), (9, 1.1), (15.5, 1.2), (16.5, 1.4), (18, 1.1), (20, 1.0)]
+LOCAL_ROADS = [(0, 1.0), (7, 1.0), (8, 1.2), (9, 1.05), (16, 1.1), (17, 1.25), (18.5, 1.0)]
+RUSH_HOURS = {
+    "autostrada": EXPRESS_ROADS,
+    "droga ekspresowa": EXPRESS_ROADS,
+    "droga główna ruchu przyśpieszonego": MAIN_ROADS,
+    "droga główna": MAIN_ROADS,
+    "droga zbiorcza": MAIN_ROADS,
+    "droga lokalna": LOCAL_ROADS,
+    "droga dojazdowa": LOCAL_ROADS,
+    "droga wewnętrzna": LOCAL_ROADS,
+}
+
+# funkcja (lista (godzina, współczynnik)) próbkowana co step sekund, z powtórzoną pierwszą próbką na końcu doby
+def _sample(points, step):
+    hours = np.array([p[0] for p in points], dtype=np.float64) * 3600
+    values = np.array([p[1] for p in points], dtype=np.float64)
+    if len(hours) == 0 or hours.min() < 0 or hours.max() >= DAY or np.any(np.diff(hours) <= 0):
+        raise ValueError("Time-dependent profile needs increasing hours in [0, 24)")
+    if np.any(values <= 0):
+        raise ValueError("Time-dependent factors must be positive")
+    grid = np.arange(DAY // step + 1, dtype=np.float64) * step
+    # okresowość: punkt przed północą i po północy
+    return np.interp(grid, np.concatenate(([hours[-1] - DAY], hours, [hours[0] + DAY])),
+                     np.concatenate(([values[-1]], values, [values[0]])))
+
+class TimeDependentModel:
+    #   factors - tablica (liczba funkcji, 86400 / step + 1) współczynników
+    #   profile - numer funkcji dla każdej krawędzi skierowanej
+    def __init__(self, factors, profile, step, cost="time"):
+        self.factors = np.ascontiguousarray(factors, dtype=np.float64)
+        self.profile = np.asarray(profile)
+        self.step = step
+        self.cost = cost                # metryka czasu ruchu swobodnego
+        self.width = self.factors.shape[1]
+        self.min_factor = float(self.factors.min())
+        self._mv = None
+
+    # model dla grafu: funkcje klas dróg (classes: klasa -> lista (godzina, współczynnik), klasy nie podane - 1.0)
+    # i pojedynczych krawędzi (overrides: ID krawędzi -> lista (godzina, współczynnik))
+    @classmethod
+    def build(cls, graph, classes=None, overrides=None, step=900, cost="time"):
+        from cost_profiles import road_classes
+        from csr_graph import ROAD_CLASSES
+
+        if DAY % step:
+            raise ValueError("step must divide 24 h")
+        classes = RUSH_HOURS if classes is None else classes
+        unknown = set(classes) - set(ROAD_CLASSES)
+        if unknown:
+            raise ValueError(f"Unknown road classes in time-dependent profile: {', '.join(sorted(unknown))}")
+        factors = [_sample(classes.get(name, [(0, 1.0)]), step) for name in ROAD_CLASSES]
+        profile = road_classes(graph, factors).astype(np.int32)
+
+        for edge_id, points in (overrides or {}).items():
+            arcs = [k for k, _ in graph.arcs_of_edge(int(edge_id))]
+            if not arcs:
+                raise ValueError(f"Edge {edge_id} is not in the graph")
+            profile[arcs] = len(factors)
+            factors.append(_sample(points, step))
+
+        model = cls(np.array(factors), profile.astype(np.uint16 if len(factors) < 2**16 else np.int32), step, cost)
+        bad = model.fifo_violations(graph)
+        if len(bad):
+            raise ValueError(f"Time-dependent profile breaks the FIFO property on {len(bad)} arcs "
+                             f"(e.g. edge {int(graph.edge_ids[bad[0]])}): travel time falls faster than time passes")
+        return model
+
+    # krawędzie skierowane, na których późniejszy wjazd daje wcześniejszy zjazd:
+    # koszt(k) * spadek współczynnika między próbkami > step
+    def fifo_violations(self, graph):
+        drop = np.maximum(self.factors[:, :-1] - self.factors[:, 1:], 0).max(axis=1)
+        base = np.asarray(getattr(graph, self.cost))
+        finite = np.isfinite(base)
+        return np.flatnonzero(finite & (np.where(finite, base, 0) * drop[self.profile] > self.step))
+
+    # współczynnik dla krawędzi skierowanej k przy wjeździe w chwili t [s od północy, dowolnej doby]
+    def factor(self, k, t):
+        s = (t % DAY) / self.step
+        i = int(s)
+        row = self.factors[self.profile[k]]
+        return float(row[i] + (row[i + 1] - row[i]) * (s - i))
+
+    def travel_time(self, graph, k, t):
+        return getattr(graph, self.cost)[k] * self.factor(k, t)
+
+    def views(self):
+        if self._mv is None:
+            self._mv = (memoryview(self.factors.ravel()), memoryview(np.ascontiguousarray(self.profile)))
+        return self._mv
+
+    @property
+    def nbytes(self):
+        return self.factors.nbytes + self.profile.nbytes
+
+    def sections(self):
+        return ({"td_factors": self.factors.astype(np.float32), "td_profile": self.profile},
+                {"td_step": self.step, "td_cost": self.cost})
+
+    # model z pliku .pfg, jeśli zapisano go dla tego samego grafu albo dla grafu bazowego grafu z sekcjami zmian
+    # (graph_update.GraphDelta.merge - wtedy poprawiony o zmiany); inaczej None
+    @classmethod
+    def from_graph_file(cls, graph):
+        f = getattr(graph, "graph_file", None)
+        if f is None or "td_factors" not in f:
+            return None
+        model = cls(f["td_factors"], f["td_profile"], f.meta["td_step"], f.meta.get("td_cost", "time"))
+        stamp = f.meta.get("td_graph_checksum")
+        if stamp == f.checksum_of(graph):
+            return model
+        if graph._edits is None or stamp != f.base_checksum:
+            return None
+        return model._patch(graph, graph._edits)
+
+    # model grafu bazowego dla grafu po zmianach: krawędzie pozostałych dróg zachowują funkcje, krawędzie nowych dróg
+    # dostają funkcję klasy drogi, a drogi grafu bazowego z własną funkcją (overrides) - tę funkcję;
+    # None, jeśli nowe krawędzie łamią własność FIFO (model do zbudowania od nowa)
+    def _patch(self, graph, edits):
+        from cost_profiles import road_classes
+        from csr_graph import ROAD_CLASSES
+
+        keep, inserted = edits["keep"], edits["inserted"]
+        fresh = np.zeros(graph.edge_count, dtype=bool)
+        fresh[inserted] = True
+        profile = np.empty(graph.edge_count, dtype=self.profile.dtype)
+        profile[~fresh] = self.profile[keep]
+        new = road_classes(graph)[inserted].astype(profile.dtype)
+        own = ~keep & (self.profile >= len(ROAD_CLASSES))
+        if own.any():
+            ids, first = np.unique(np.asarray(edits["base"].edge_ids)[own], return_index=True)
+            new_ids = np.asarray(graph.edge_ids)[inserted]
+            pos = np.minimum(np.searchsorted(ids, new_ids), len(ids) - 1)
+            hit = ids[pos] == new_ids
+            new[hit] = self.profile[own][first][pos[hit]]
+        profile[inserted] = new
+        model = TimeDependentModel(self.factors, profile, self.step, self.cost)
+        return None if len(model.fifo_violations(graph)) else model
+
+# model z pliku grafu, a jeśli go tam nie ma - zbudowany w pamięci (godziny szczytu RUSH_HOURS, raz dla grafu
+# i metryki). Plik grafu nie jest zmieniany w czasie zapytań (mogą go czytać inne procesy) - do zapisu służy
+# save_time_model (routing_server.prepare_graph_file)
+def time_dependent_model(graph, cost="time"):
+    model = TimeDependentModel.from_graph_file(graph)
+    if model is not None and model.cost == cost:
+        return model
+    built = _built.setdefault(graph, {})
+    if cost not in built:
+        built[cost] = TimeDependentModel.build(graph, cost=cost)
+    return built[cost]
+
+# budowa modelu i dopisanie do pliku grafu (jeśli nie ma w nim aktualnego modelu dla tej metryki)
+def save_time_model(graph, cost="time"):
+    from graph_file import append_sections
+
+    model = TimeDependentModel.from_graph_file(graph)
+    if model is None or model.cost != cost:
+        model = TimeDependentModel.build(graph, cost=cost)
+        f = graph.graph_file
+        sections, meta = model.sections()
+        meta["td_graph_checksum"] = f.graph_checksum
+        append_sections(f.path, sections, meta)
+    return model
+
+# godzina odjazdu: liczba sekund od północy albo tekst "HH:MM" / "HH:MM:SS"
+def departure_seconds(departure):
+    if isinstance(departure, str):
+        parts = [float(p) for p in departure.split(":")]
+        return sum(p * 60 ** (2 - i) for i, p in enumerate(parts + [0] * (3 - len(parts))))
+    return float(departure)
+
+# A* zależny od czasu - wynik jak CSRGraph.aShift8: (węzły ścieżki, ID krawędzi, czas przejazdu [s], liczba węzłów w S)
+#   departure - chwila wyjazdu (departure_seconds)
+#   h         - dolne oszacowanie czasu w ruchu swobodnym (np. h_time, CostProfile.h, ALT); mnożone przez najmniejszy
+#               współczynnik modelu, więc pozostaje dopuszczalne
+def td_aShift8(graph, model, start, end, departure, h=None, virtual=None, context=None):
+    from toolbox_core import h_time
+
+    mv = graph.views()
+    offsets, targets, edge_ids, x, y = mv["offsets"], mv["targets"], mv["edge_ids"], mv["x"], mv["y"]
+    w = mv[model.cost]
+    F, P = model.views()
+    width, step = model.width, model.step
+    n = graph.node_count
+    extra = virtual.out if virtual else {}
+    nodes = virtual if virtual else graph
+    s = nodes.node_id(start)
+    t = nodes.node_id(end)
+    t0 = departure_seconds(departure)
+    h = h or h_time
+    scale = model.min_factor
+    node_h = getattr(h, "node_h", None)                 # heurystyka na id węzłów (ALT)
+    if node_h and virtual:
+        node_h = virtual.bound(node_h, model.cost)
+    reopen = getattr(h, "slack", 0) > 0                 # heurystyka niespójna (ALT) - jak w CSRGraph.aShift8
+
+    context = context or graph.search_context()
+    gen = context.begin(nodes.node_count)
+    g, hv, p, pe = context.g, context.h, context.parent, context.parent_edge
+    seen, closed, heap = context.seen, context.closed, context.heap
+    g[s] = 0.0
+    seen[s] = gen
+    closed[s] = gen
+    volume = 1
+    curr, curr_g = s, 0.0
+    heappush, heappop = heapq.heappush, heapq.heappop
+
+    while True:
+        if curr == t:
+            node_path, edge_ids_path = context.path(s, t)
+            return [nodes.coords(i) for i in node_path], edge_ids_path, curr_g, volume
+
+        if closed[curr] != gen:
+            closed[curr] = gen
+            volume += 1
+        # chwila wjazdu na krawędzie wychodzące - próbka i ułamek wspólne dla wszystkich krawędzi węzła
+        phase = ((t0 + curr_g) % DAY) / step
+        i = int(phase)
+        fr = phase - i
+        # krawędzie (węzeł, indeks krawędzi skierowanej, ułamek) - dla węzłów przy podzielonej krawędzi z virtual.out
+        lo, hi = (offsets[curr], offsets[curr + 1]) if curr < n else (0, 0)
+        arcs = zip(targets[lo:hi], range(lo, hi), repeat(1.0))
+        if curr in extra:
+            arcs = list(arcs) + extra[curr]
+        for v, k, part in arcs:
+            a = P[k] * width + i
+            new_g = curr_g + part * w[k] * (F[a] + (F[a + 1] - F[a]) * fr)
+            if closed[v] == gen:
+                if not reopen or new_g >= g[v]:
+                    continue
+                closed[v] = 0
+            if seen[v] != gen:
+                future_h = (node_h(v, t) if node_h else h((x[v], y[v]) if v < n else nodes.coords(v), end)) * scale
+                seen[v] = gen
+                hv[v] = future_h
+                heappush(heap, (new_g + future_h, v))
+                g[v] = new_g
+                p[v] = curr
+                pe[v] = edge_ids[k]
+            elif new_g < g[v]:
+                heappush(heap, (new_g + hv[v], v))
+                g[v] = new_g
+                p[v] = curr
+                pe[v] = edge_ids[k]
+
+        while heap:
+            f, curr = heappop(heap)
+            if closed[curr] != gen and f == g[curr] + hv[curr]:
+                break
+        else:
+            return None
+        curr_g = g[curr]
+        if curr_g == math.inf:
+            return None
+
+def td_dijkstra(graph, model, start, end, departure, virtual=None, context=None):
+    from csr_graph import h_zero
+
+    return td_aShift8(graph, model, start, end, departure, h_zero, virtual, context)
+
+# czasy przejazdu jednej trasy dla wielu godzin odjazdu (np. co 15 minut w ciągu doby)
+def departure_profile(graph, model, start, end, departures, h=None, virtual=None):
+    return [(d, result[2] if result is not None else math.inf)
+            for d in departures
+            for result in [td_aShift8(graph, model, start, end, d, h, virtual)]]
@@ -0,0 +1,487 @@
+# Authors:  PAGistyczna Drużyna Cybergeodetów
+# Created:  2026-10-18
+#
+# Wspólna część narzędzia ToolboxScript_Improved_v3: graf słownikowy (Node, Edge, Graph), heurystyki, prędkości klas
+# dróg, eksport wyników i komunikaty. Importowana przez skrypt narzędzia i moduły grafu CSR - skrypt narzędzia
+# uruchomiony w ArcGIS jako __main__ nie jest wtedy importowany drugi raz (druga kopia bez IDFIELD, a_map, OUTPUT
+# i komunikatów ustawionych przez narzędzie). Narzędzie ustawia te zmienne w tym module (toolbox_core.IDFIELD = ...).
+
+from heapdict import heapdict
+import math
+
+try:
+    import arcpy
+except ImportError:     # bez ArcGIS (np. Linux) - graf tylko z plików shp, bez eksportu do geobazy
+    arcpy = None
+
+snap_call_counter = 0   # licznik dla poprawnego zapisu wielokrotnie wywoływanej funkcji snap
+IDFIELD = None          # nazwa kolumny id w pliku źródłowym (kompatybilność gdb i shp)
+a_map = None            # aktywna mapa
+mess = ""               # zamiast print w ArcGisie
+OUTPUT = None           # plik wynikowy bez arcpy (.gpkg, .geojson, .ndjson, .csv - writers) zamiast geobazy
+
+class Node:
+    def __init__(self):  # współrzędne węzła są zapisane jako klucz w słowniku w klasie Graph
+        self.edges = []  # lista krawędzi wychodzących z węzła
+    
+    def add_edge(self, x, y, edge_id, length, time):
+        self.edges.append(Edge(x, y, edge_id, length, time))
+
+class Edge:
+    def __init__(self, x, y, edge_id, length, time):
+        self.id = (x, y)        # współrzędne węzła do którego prowadzi krawędź
+        self.edge_id = edge_id  # ID krawędzi z pliku źródłowego
+        self.length = length
+        self.time = time
+
+# funkcje heurystyczne
+def h_length(current, end):
+    return math.sqrt((current[0] - end[0]) ** 2 + (current[1] - end[1]) ** 2)
+
+def h_time(current, end):
+    return math.sqrt((current[0] - end[0]) ** 2 + (current[1] - end[1]) ** 2) / 38.889  # (140 * 1000 / 3600) ~ 38.(8)
+
+# funkcja zaokrąglająca (rozwiązanie problemów z topologią)
+def round_coords(coords):
+    if coords is None:
+        raise ValueError("No coordinates for rounding. check input data.")
+    if arcpy is not None and isinstance(coords, arcpy.Point):
+        coords = [coords.X, coords.Y]
+    
+    xy = (math.floor(coords[0]), math.ceil(coords[1]))
+    xy1 = (math.ceil(coords[0]), math.floor(coords[1]))
+    xy2 = (math.floor(coords[0]), math.floor(coords[1]))
+    xy3 = (math.ceil(coords[0]), math.ceil(coords[1]))
+    
+    return xy, xy1, xy2, xy3
+
+# odczyt krawędzi z pliku źródłowego: (id, pierwszy punkt, ostatni punkt, długość, klasa drogi, kierunek)
+#   loader - "arcpy" (kursor) lub "shp" (shp_reader, bez arcpy)
+def read_rows(data_fc, loader):
+    if loader == "shp":
+        from shp_reader import read_road_rows
+        yield from read_road_rows(data_fc)
+        return
+    
+    with arcpy.da.SearchCursor(data_fc, [IDFIELD, "SHAPE@", 'KLASA_DROG', 'DIRECTION']) as cursor:
+        for row in cursor:
+            shape = row[1]                  # geometria krawędzi
+            first_point = shape.firstPoint  # pierwszy węzeł krawędzi
+            last_point = shape.lastPoint    # drugi węzeł krawędzi
+            yield row[0], (first_point.X, first_point.Y), (last_point.X, last_point.Y), shape.length, row[2], row[3]
+    
+    arcpy.management.AddSpatialIndex(data_fc)
+
+class Graph:
+    def __init__(self, data_fc, loader=None):
+        self.data_fc = data_fc  # nazwa pliku źródłowego
+        self.nodes = {}         # słownik węzłów
+        
+        # sposób odczytu danych: "arcpy" (kursor) lub "shp" (shp_reader, bez arcpy)
+        if loader is None:
+            loader = "arcpy" if arcpy is not None else "shp"
+        self.loader = loader
+        
+        self.generate_graph()   # utworzenie grafu
+    
+    # odczyt krawędzi z pliku źródłowego: (id, pierwszy punkt, ostatni punkt, długość, klasa drogi, kierunek)
+    def read_rows(self):
+        return read_rows(self.data_fc, self.loader)
+    
+    def generate_graph(self):
+        temp_nodes = {}                         # tymczasowy słownik ze zwielokrotnionymi kluczami
+        for edge_id, first_point, last_point, length, road_class, direction in self.read_rows():
+            speed = speed_dict[road_class]      # prędkość krawędzi (na podstawie klasy drogi)
+            
+            xy_arr = []                                     # lista ostatecznych współrzędych węzłów krawędzi
+            for coords in [first_point, last_point]:        # współrzędne przed zaokrągleniem
+                xy, xy1, xy2, xy3 = round_coords(coords)    # wszystkie warianty zaoakrąglenia współrzędnych
+                
+                # nowy węzeł / pobranie współrzędnych istniejącego
+                for i, cr in enumerate([xy, xy1, xy2, xy3]):
+                    if cr in temp_nodes:
+                        xyf = temp_nodes[cr]                # współrzędne, dla których w poprzednich iteracjach już utworzono węzeł
+                        break
+                    elif i == 3:
+                        self.nodes[xy] = Node()             # utworzenie nowego nietymczasowego węzła
+                        xyf = xy                            # współrzędne utworzonego węzła
+                
+                # wszystkie klucze w słowniku tymczasowym wskazują na ten sam węzeł
+                temp_nodes[xy] = xyf
+                temp_nodes[xy1] = xyf
+                temp_nodes[xy2] = xyf
+                temp_nodes[xy3] = xyf
+                xy_arr.append(xyf)
+            
+            # czas przejazdu krawędzi
+            time = length / (speed * 1000 / 3600)
+            
+            # utworzenie krawędzi z uwzględnieniem kierunkowości dróg
+            if direction == "both" or direction == "ftl":
+                self.nodes[xy_arr[0]].add_edge(xy_arr[1][0], xy_arr[1][1], edge_id, length, time)
+            if direction == "both" or direction == "ltf":
+                self.nodes[xy_arr[1]].add_edge(xy_arr[0][0], xy_arr[0][1], edge_id, length, time)
+    
+    # eksport grafu do pliku tekstowego
+    def export_graph_txt(self):
+        with open("my_graph.txt", "w") as f:
+            for node in self.nodes:
+                f.write(f"\n\n\t<-- {node} -->\n")
+                for edge in self.nodes[node].edges:
+                    f.write(f"{edge.id}\t{edge.edge_id}\t{edge.length}\t{edge.time}\n")
+    
+    # implementacja algorytmu A*
+    def aShift8(self, cost, h, start, end):
+        # deklaracja struktur danych
+        S = set()                                           # zbiór odwiedzonych węzłów
+        S.add(start)
+        Q = heapdict()                                      # kolejka priorytetowa sąsiadów odwiedzonych węzłów
+        p = {start: (None, None)}                           # słownik poprzedników
+        
+        # sąsiedzi pierwszego węzła
+        for edge in self.nodes[start].edges:
+            future_h = h(edge.id, end)                                                  # h dla węzła na końcu krawędzi, raz obliczone nie zmienia się
+            Q[edge.id] = getattr(edge, cost) + future_h, getattr(edge, cost), future_h  # dodanie f, g, h dla węzła na końcu krawędzi
+            p[edge.id] = start, edge.edge_id                                            # dodanie poprzednika i id prowadzącej do niego krawędzi
+        
+        # główna pętla
+        while Q:                                            # wyjście z pętli w razie nieznalezienia ścieżki
+            curr, (curr_f, curr_g, curr_h) = Q.popitem()    # f, g, h dla bieżącego węzła
+            
+            # wyniki końcowe po dotarciu do celu
+            if curr == end:
+                node_path = [end]
+                edge_ids = []
+                curr = (end, None)                          # zmiana do iteracji w poniższej pętli
+                
+                while curr[0] != start:
+                    curr = p[curr[0]]                       # zmiana zmiennej curr
+                    node_path.append(curr[0])               # dodanie węzła
+                    edge_ids.append(curr[1])                # dodanie krawędzi
+                
+                # powrót do dobrej kolejności
+                node_path.reverse()
+                edge_ids.reverse()
+                
+                return node_path, edge_ids, curr_g, len(S)  # węzły ścieżki, krawędzie ścieżki, koszt, ilość węzłów w S
+            
+            # dodanie węzła do zbioru S
+            S.add(curr)
+            for edge in self.nodes[curr].edges:
+                if edge.id not in S:
+                    if edge.id not in Q:
+                        future_h = h(edge.id, end)                                      # h dla węzła na końcu krawędzi, raz obliczone nie zmienia się
+                        future_g = curr_g + getattr(edge, cost)                         # g dla węzła na końcu krawędzi
+                        Q[edge.id] = future_g + future_h, future_g, future_h            # dodanie f, g, h dla węzła na końcu krawędzi
+                        p[edge.id] = curr, edge.edge_id
+                    else:
+                        new_old_h = Q[edge.id][2]                                       # odczyt oblilczonego wcześniej h
+                        new_g = curr_g + getattr(edge, cost)                            # nowa wartość g
+                        new_f = new_g + new_old_h                                       # nowa wartość f
+                        
+                        # relaksacja krawędzi
+                        if new_f < Q[edge.id][0]:                                       # Q[edge.xy][0] = stara wartość f
+                            Q[edge.id] = new_f, new_g, new_old_h                        # f, g, h
+                            p[edge.id] = curr, edge.edge_id                             # dodanie do tablicy poprzedników
+    
+    # wyznaczanie zasięgu na podstawie algorytmu Dijkstry
+    def dijkstra_with_time_limit(self, start, max_time):
+        visited = set()                                     # odwiedzone węzły
+        times = {start: 0}                                  # odległości od startu
+        queue = heapdict()                                  # kolejka priorytetowa dla algorytmu Dijkstry
+        queue[start] = 0
+        reachable_nodes = []                                # lista osiągalnych węzłów
+        
+        while queue:
+            # Pobieranie węzła o najmniejszym koszcie z kolejki
+            current_node, current_time = queue.popitem()
+            # Sprawdzanie, czy węzeł przekracza maksymalny dystans
+            if current_time > max_time:
+                continue  # Pomijanie węzłów, które przekraczają maksymalny dystans
+            
+            # Dodawanie węzła do odwiedzonych
+            visited.add(current_node)
+            reachable_nodes.append(current_node)
+            
+            # Iteracja po sąsiadach bieżącego węzła
+            for edge in self.nodes[current_node].edges:
+                neighbor = edge.id
+                new_time = current_time + edge.time
+                # Jeśli węzeł został odwiedzony lub nowa odległość przekracza maksymalny dystans, pomijamy
+                if neighbor in visited or new_time > max_time:
+                    continue
+                # Jeśli nowa odległość jest lepsza, aktualizujemy i dodajemy do kolejki
+                if neighbor not in times or new_time < times[neighbor]:
+                    times[neighbor] = new_time
+                    queue[neighbor] = new_time
+        
+        return reachable_nodes
+    
+    # eksport wybranych dróg do nowej warstwy i klasy
+    #   path - węzły ścieżki (używane przez CSRGraph z pełną geometrią dróg; tu drogi kopiowane z warstwy źródłowej)
+    def export_fc(self, ids, name, path=None):
+        filter = f"{IDFIELD} IN ({', '.join(str(id) for id in ids)})"
+        edges = arcpy.management.SelectLayerByAttribute(self.data_fc, "NEW_SELECTION", filter)
+        arcpy.management.CopyFeatures(edges, name)
+        add_fc_to_map(name)
+        arc_prnt(f"Created feature class '{name}'.")
+    
+    # eksport wyników Dijkstry jako otoczka wklęsła
+    def export_dijkstra_as_concave_hull(self, reachable_nodes, name, alpha=40000.0):
+        from shapely.geometry import MultiPoint, Polygon
+        from shapely.ops import triangulate, unary_union
+        
+        # utworzenie otoczki wklęsłej
+        multi_point = MultiPoint(reachable_nodes)
+        triangles = triangulate(multi_point)
+        arc_prnt(f"Count of triangles: {len(triangles)}")
+        
+        # filtrowanie: 'alpha'= obszar trójkąta
+        concave_hull = unary_union([tri for tri in triangles if tri.area < alpha])
+        
+        # różne typy geometrii
+        polygons = []
+        if concave_hull.geom_type == "Polygon":
+            polygons = [concave_hull]
+        elif concave_hull.geom_type == "MultiPolygon":
+            polygons = list(concave_hull.geoms)
+        elif concave_hull.geom_type == "GeometryCollection":
+            polygons = [geom for geom in concave_hull.geoms if isinstance(geom, Polygon)]
+        
+        arc_prnt(f"concave hull geometry: {concave_hull.geom_type}")
+        if not polygons:
+            arc_prnt("No polygons to write in concave hull.")
+            return
+        if OUTPUT:
+            write_output(name, "Polygon", (([list(poly.exterior.coords)] + [list(r.coords) for r in poly.interiors], None)
+                                           for poly in polygons))
+            return
+        
+        # utworzenie warstwy z otoczką wklęsłą
+        arcpy.management.CreateFeatureclass(
+            arcpy.env.workspace, name, geometry_type="POLYGON",spatial_reference=arcpy.env.outputCoordinateSystem
+        )
+        with arcpy.da.InsertCursor(name, ["SHAPE@"]) as cursor:
+            for poly in polygons:
+                arc_polygon = arcpy.Polygon(
+                    arcpy.Array([arcpy.Point(*coords) for coords in poly.exterior.coords])
+                )
+                cursor.insertRow([arc_polygon])
+        
+        # dodanie warstwy do mapy
+        add_fc_to_map(name)
+        arc_prnt(f"Created feature class '{name}' as a concave hull.")
+    
+    # eksport izochron (isochrone.isochrones) - jeden wielokąt z dziurami na obiekt
+    def export_isochrone(self, polygons, name):
+        if not polygons:
+            arc_prnt("No polygons to write in isochrone.")
+            return
+        if OUTPUT:
+            write_output(name, "Polygon", ((poly, None) for poly in polygons))
+            return
+        arcpy.management.CreateFeatureclass(
+            arcpy.env.workspace, name, geometry_type="POLYGON",spatial_reference=arcpy.env.outputCoordinateSystem
+        )
+        with arcpy.da.InsertCursor(name, ["SHAPE@"]) as cursor:
+            for poly in polygons:
+                # w Esri pierścień zewnętrzny jest zgodny z ruchem wskazówek zegara, dziury - przeciwnie
+                arc_polygon = arcpy.Polygon(
+                    arcpy.Array([arcpy.Array([arcpy.Point(*coords) for coords in reversed(ring)]) for ring in poly]),
+                    arcpy.env.outputCoordinateSystem
+                )
+                cursor.insertRow([arc_polygon])
+        
+        add_fc_to_map(name)
+        arc_prnt(f"Created feature class '{name}' as an isochrone.")
+    
+    # funkcja dociągająca punkty do grafu
+    # write_fc - dodanie klas punktów wejściowych i odcinków łączących do mapy
+    def snap(self, start, end, write_fc=True):     
+        global snap_call_counter
+        snap_call_counter += 1                                              # licznik wywołań funkcji snap
+        input_points_name = f"PF_input_points_{snap_call_counter}"
+        snap_to_graph_name = f"PF_snap_to_graph_{snap_call_counter}"
+        
+        # posprzątanie po snapowaniu w poprzednim wywołaniu skryptu
+        try:
+            arcpy.Delete_management(snap_to_graph_name)
+            remove_layer_from_map(snap_to_graph_name)
+        except:
+            pass
+
+        # utworzenie klasy punktów wejściowych
+        arcpy.management.CreateFeatureclass(arcpy.env.workspace, input_points_name, 'POINT')
+        with arcpy.da.InsertCursor(input_points_name, ["SHAPE@"]) as insert_cursor:
+            for point in [start, end]:
+                insert_cursor.insertRow([arcpy.Point(point[0], point[1])])
+        
+        outside_graph = []                                                  # punkty spoza grafu
+        start_end_final = [None, None]                                      # ostateczne punkty startu i końca                    
+        
+        # sprawdzenie, czy punkty są w grafie
+        for i, point in enumerate([start, end]):
+            xy, xy1, xy2, xy3 = round_coords(point)
+            for j, cr in enumerate([xy, xy1, xy2, xy3]):
+                if cr in self.nodes:
+                    start_end_final[i] = cr
+                    break
+                elif j == 3:
+                    outside_graph.append(point)
+        
+        # czas i długość dotarcia do grafu
+        time = 0
+        length = 0
+        
+        if len(outside_graph) == 0:                                         # oba punkty są w grafie
+            if write_fc:
+                add_fc_to_map(input_points_name)
+            return start_end_final, length, time
+        else:            
+            # znalezienie najbliższych krawędzi
+            arcpy.analysis.Near(input_points_name, self.data_fc, 500, "LOCATION")
+            
+            # pobranie id najbliższych krawędzi i geometrii punktów do dosnapowania
+            near_line_ids = []
+            out_point_shapes = [] 
+            with arcpy.da.SearchCursor(input_points_name, ["NEAR_FID", "SHAPE@"]) as cursor:
+                for row in cursor:
+                    near_line_ids.append(row[0])
+                    out_point_shapes.append(row[1])
+            
+            # pobranie geometrii krawędzi
+            edge_shapes_dict = {}
+            edge_shapes = []
+            filter = f"{IDFIELD} IN ({', '.join(map(str, near_line_ids))})"
+            with arcpy.da.SearchCursor(self.data_fc, [IDFIELD, "SHAPE@"], filter) as edge_cursor:
+                for edge_row in edge_cursor:
+                    edge_shapes_dict[edge_row[0]] = edge_row[1]
+            
+            # posortowanie krawędzi
+            for i, fid in enumerate(near_line_ids):
+                edge_shapes.append(edge_shapes_dict[fid])
+            
+            # wybór bliższego wierzchołka krawędzi, do której przyłączane są punkty
+            with arcpy.da.UpdateCursor(input_points_name, ["NEAR_X", "NEAR_Y"]) as update_cursor:
+                k = 0
+                for row in update_cursor:
+                    out_point_shape = out_point_shapes[k]
+                    edge_shape = edge_shapes[k]
+                    first_point = edge_shape.firstPoint
+                    last_point = edge_shape.lastPoint
+                    if out_point_shape.distanceTo(first_point) < out_point_shape.distanceTo(last_point):
+                        update_cursor.updateRow([first_point.X, first_point.Y])
+                    else:
+                        update_cursor.updateRow([last_point.X, last_point.Y])
+                    k += 1
+            
+            # utworzenie klasy odcinów łączących punkty z grafem
+            arcpy.management.CreateFeatureclass(arcpy.env.workspace, snap_to_graph_name, 'POLYLINE')
+            field_names = ["F_POINT", "L_POINT"]
+            field_types = ["TEXT", "TEXT"]
+            for field_name, field_type in zip(field_names, field_types):
+                arcpy.AddField_management(snap_to_graph_name, field_name, field_type)
+            
+            # dodanie lini łączących punkty z grafem
+            with arcpy.da.SearchCursor(input_points_name, ["SHAPE", "NEAR_X", "NEAR_Y"]) as cursor:
+                with arcpy.da.InsertCursor(snap_to_graph_name, ["F_POINT", "L_POINT", "SHAPE@"]) as insert_cursor:
+                    for i, row in enumerate(cursor):
+                        out_point_shape = row[0]
+                        near_x = row[1]
+                        near_y = row[2]
+                        line = arcpy.Polyline(arcpy.Array(
+                            [arcpy.Point(out_point_shape[0], out_point_shape[1]), arcpy.Point(near_x, near_y)]))
+                        insert_cursor.insertRow(
+                            ["(" + str(out_point_shape[0]) + "," + str(out_point_shape[1]) + ")", str(cr), line])
+                        
+                        # koszt i czas dotarcia do grafu
+                        length += line.length
+                        time += line.length / (speed_dict['droga wewnętrzna'] * 1000 / 3600)
+                        
+                        # aktualizacja punktów startu i końca na podstawie słownika klasy Graph
+                        xy, xy1, xy2, xy3 = round_coords((near_x, near_y))
+                        for cr in [xy, xy1, xy2, xy3]:
+                            if cr in self.nodes:
+                                if len(outside_graph) == 2:
+                                    start_end_final[i] = cr
+                                else:
+                                    for j, item in enumerate(start_end_final):
+                                        if item == None:
+                                            start_end_final[j] = cr
+                                break
+                
+                # dodanie warstw do mapy
+                if write_fc:
+                    add_fc_to_map(snap_to_graph_name)
+                    add_fc_to_map(input_points_name)
+                
+                return start_end_final, length, time    # punkty, długość odcinków snapujących, czas pokonania odcinków snapujących
+
+# zapis odcinków łączących punkty z grafem [((x, y) punktu, (x, y) węzła), ...] do nowej klasy i warstwy
+def export_snap_lines(snap_lines):
+    global snap_call_counter
+    snap_call_counter += 1
+    snap_to_graph_name = f"PF_snap_to_graph_{snap_call_counter}"
+    if OUTPUT:
+        write_output(snap_to_graph_name, "LineString", (((point, node), {"F_POINT": str(point), "L_POINT": str(node)})
+                                                         for point, node in snap_lines))
+        return snap_to_graph_name
+    
+    arcpy.management.CreateFeatureclass(arcpy.env.workspace, snap_to_graph_name, 'POLYLINE')
+    for field_name in ["F_POINT", "L_POINT"]:
+        arcpy.AddField_management(snap_to_graph_name, field_name, "TEXT")
+    
+    with arcpy.da.InsertCursor(snap_to_graph_name, ["F_POINT", "L_POINT", "SHAPE@"]) as insert_cursor:
+        for point, node in snap_lines:
+            line = arcpy.Polyline(arcpy.Array([arcpy.Point(*point), arcpy.Point(*node)]))
+            insert_cursor.insertRow([str(point), str(node), line])
+    
+    add_fc_to_map(snap_to_graph_name)
+    return snap_to_graph_name
+
+# zapis linii trasy (wierzchołki w kolejności przejazdu) jako jednego obiektu nowej klasy i warstwy
+def export_polyline(xy, name):
+    if OUTPUT:
+        write_output(name, "LineString", [(xy, None)])
+        return
+    arcpy.management.CreateFeatureclass(
+        arcpy.env.workspace, name, geometry_type="POLYLINE", spatial_reference=arcpy.env.outputCoordinateSystem
+    )
+    with arcpy.da.InsertCursor(name, ["SHAPE@"]) as cursor:
+        line = arcpy.Polyline(arcpy.Array([arcpy.Point(x, y) for x, y in xy.tolist()]), arcpy.env.outputCoordinateSystem)
+        cursor.insertRow([line])
+    add_fc_to_map(name)
+    arc_prnt(f"Created feature class '{name}'.")
+
+# zapis obiektów (pary (współrzędne, atrybuty)) do warstwy name w pliku OUTPUT - bez arcpy i bez dodawania do mapy
+def write_output(name, geometry_type, features):
+    from writers import open_layer
+    
+    with open_layer(OUTPUT, name, geometry_type) as writer:
+        writer.write_many(features)
+    arc_prnt(f"Created layer '{name}' in '{OUTPUT}' ({writer.count} features).")
+
+speed_dict = {'autostrada': 140, 'droga ekspresowa': 120, 'droga główna ruchu przyśpieszonego': 60, 'droga główna': 50,
+              'droga zbiorcza': 40, 'droga lokalna': 30, 'droga dojazdowa': 30, 'droga wewnętrzna': 20}
+
+# dodanie warstwy do mapy - tylko dla GUI Script tool
+def add_fc_to_map(fc_name):
+    global a_map
+    if a_map is not None:
+        a_map.addDataFromPath(arcpy.env.workspace + "\\" + fc_name)
+
+# usunięcie warstwy z mapy - tylko dla GUI Script tool
+def remove_layer_from_map(layer_name):
+    global a_map
+    if a_map is not None:
+        all = a_map.listLayers()
+        for layer in all:
+            if layer.name == layer_name:
+                a_map.removeLayer(layer)
+
+# Script tool nie słucha się funkckji print
+def arc_prnt(message):
+    global mess
+    print(message)
+    if a_map is not None:
+        mess += message + "\n"
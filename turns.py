@@ -0,0 +1,220 @@
+# Authors:  PAGistyczna Drużyna Cybergeodetów
+# Created:  2026-10-18
+#
+# Zakazy i koszty skrętów - graf krawędziowy (line graph) zbudowany z grafu CSR:
+#   węzeł a     - krawędź skierowana a grafu (u -> v), ze współrzędnymi jej końca v
+#   krawędź a-b - przejazd z krawędzi a na krawędź b wychodzącą z v, koszt: koszt(b) + koszt skrętu (a, b)
+# Koszt skrętu [s] (dla metryki "time" i profili kosztów) zależy od kąta między a i b przy węźle (TURN_COSTS) -
+# z pierwszego / ostatniego odcinka drogi, gdy graf ma pełną geometrię (geometry), inaczej z końców krawędzi -
+# i jest naliczany tylko na skrzyżowaniach (węzły z co najmniej 3 krawędziami) - zakręt drogi nie jest skrętem.
+# Zawracanie jest zabronione poza ślepymi ulicami. Tabela restrictions (para ID krawędzi -> koszt, inf - zakaz)
+# ma pierwszeństwo przed kosztem z kąta; zakaz działa też dla metryki "length".
+# Graf krawędziowy to zwykły CSRGraph, więc działają na nim te same algorytmy (aShift8, dijkstra,
+# aShift8_bidirectional, one_to_all); start i koniec trasy (węzły grafu) są dołączane na czas zapytania
+# jako dwa węzły dodatkowe (TurnEndpoints, jak węzły wirtualne z virtual_nodes).
+
+import math
+import zlib
+import numpy as np
+
+# koszty skrętu [s] dla przedziałów kąta zmiany kierunku
+TURN_COSTS = {"straight": 0.0, "right": 4.0, "left": 10.0, "u_turn": 30.0}
+STRAIGHT_ANGLE = 30             # |kąt| <= 30° - jazda prosto
+U_TURN_ANGLE = 150              # |kąt| >= 150° - zawracanie
+
+# kąt zmiany kierunku [°] przy przejeździe z odcinka (x0, y0) -> (x1, y1) na (x1, y1) -> (x2, y2):
+# dodatni - skręt w lewo, ujemny - w prawo
+def turn_angles(x0, y0, x1, y1, x2, y2):
+    ax, ay = x1 - x0, y1 - y0
+    bx, by = x2 - x1, y2 - y1
+    return np.degrees(np.arctan2(ax * by - ay * bx, ax * bx + ay * by))
+
+# liczba różnych krawędzi (ID z pliku źródłowego) przy każdym węźle
+def junction_degree(graph):
+    sources = graph.arc_sources().astype(np.int64)
+    targets = np.asarray(graph.targets, dtype=np.int64)
+    edge_ids = np.asarray(graph.edge_ids, dtype=np.int64)
+    pairs = np.unique(np.concatenate((sources, targets)) << 32 | np.concatenate((edge_ids, edge_ids)))
+    return np.bincount(pairs >> 32, minlength=graph.node_count)
+
+class TurnGraph:
+    def __init__(self, graph, line, turn_cost):
+        self.graph = graph              # graf węzłowy (CSRGraph)
+        self.line = line                # graf krawędziowy (CSRGraph, węzeł = krawędź skierowana grafu)
+        self.turn_cost = turn_cost      # koszt skrętu każdej krawędzi grafu krawędziowego [s] (inf - zakaz)
+        self._checksum = None
+
+    # graf krawędziowy dla grafu CSR
+    #   turn_costs   - koszty dla przedziałów kąta (domyślnie TURN_COSTS)
+    #   restrictions - {(ID krawędzi, ID krawędzi następnej): koszt [s]}, math.inf - zakaz skrętu
+    #   u_turns      - zawracanie dozwolone wszędzie (z kosztem u_turn), domyślnie tylko na ślepych ulicach
+    #   min_degree   - najmniejsza liczba krawędzi węzła, przy której naliczany jest koszt skrętu
+    @classmethod
+    def build(cls, graph, turn_costs=None, restrictions=None, u_turns=False, min_degree=3):
+        from csr_graph import CSRGraph
+
+        costs = dict(TURN_COSTS, **(turn_costs or {}))
+        unknown = set(costs) - set(TURN_COSTS)
+        if unknown:
+            raise ValueError(f"Unknown turn types: {', '.join(sorted(unknown))}")
+        offsets = np.asarray(graph.offsets)
+        heads = np.asarray(graph.targets, dtype=np.int64)
+        tails = graph.arc_sources().astype(np.int64)
+        x, y = np.asarray(graph.x), np.asarray(graph.y)
+
+        # krawędzie grafu krawędziowego: a -> każda krawędź b wychodząca z końca a (posortowane po a)
+        count = offsets[heads + 1] - offsets[heads]
+        a = np.repeat(np.arange(len(heads), dtype=np.int64), count)
+        first = np.repeat(np.cumsum(count) - count, count)
+        b = np.repeat(offsets[heads], count) + np.arange(len(a), dtype=np.int64) - first
+        line_offsets = np.zeros(len(heads) + 1, dtype=np.int64)
+        np.cumsum(count, out=line_offsets[1:])
+
+        # koszt z kąta skrętu - kierunki odcinków przy węźle z pełnej geometrii dróg albo z końców krawędzi
+        v = heads[a]
+        if getattr(graph, "geometry", None) is not None:
+            after_tail, before_head = graph.geometry.arc_neighbours(graph)
+            angle = turn_angles(before_head[a, 0], before_head[a, 1], x[v], y[v], after_tail[b, 0], after_tail[b, 1])
+        else:
+            angle = turn_angles(x[tails[a]], y[tails[a]], x[v], y[v], x[heads[b]], y[heads[b]])
+        u_turn = (heads[b] == tails[a]) | (np.abs(angle) >= U_TURN_ANGLE)
+        turn = np.where(angle > STRAIGHT_ANGLE, costs["left"],
+                        np.where(angle < -STRAIGHT_ANGLE, costs["right"], costs["straight"]))
+        degree = junction_degree(graph)[v]
+        turn = np.where(degree >= min_degree, turn, 0.0)
+        turn[u_turn] = costs["u_turn"] if u_turns else math.inf
+        turn[u_turn & (degree == 1)] = costs["u_turn"]
+
+        # koszty i zakazy dla par krawędzi
+        edge_ids = np.asarray(graph.edge_ids, dtype=np.int64)
+        if restrictions:
+            keys = np.array([(int(e) << 32) | int(f) for e, f in restrictions], dtype=np.int64)
+            values = np.array(list(restrictions.values()), dtype=np.float64)
+            order = np.argsort(keys)
+            keys, values = keys[order], values[order]
+            pair = edge_ids[a] << 32 | edge_ids[b]
+            pos = np.minimum(np.searchsorted(keys, pair), len(keys) - 1)
+            hit = keys[pos] == pair
+            turn[hit] = values[pos[hit]]
+
+        forbidden = np.where(np.isinf(turn), math.inf, 0.0)
+        line = CSRGraph(x[heads], y[heads], line_offsets, b.astype(np.int32), edge_ids[b].astype(np.int32),
+                        np.asarray(graph.length)[b] + forbidden, np.asarray(graph.time)[b] + turn, graph.data_fc)
+        return cls(graph, line, turn)
+
+    # metryka grafu krawędziowego: "length", "time" albo profil kosztów (koszt profilu + koszt skrętu)
+    def metric(self, cost):
+        from cost_profiles import CostProfile, profile
+
+        if cost not in ("length", "time") and cost not in self.line.profiles:
+            p = profile(self.graph, cost)
+            targets = np.asarray(self.line.targets)
+            self.line.profiles[cost] = CostProfile(cost, p.definition, p.cost[targets] + self.turn_cost, p.max_speed)
+            self.line._mv = None
+        return cost
+
+    # suma kontrolna kosztów skrętów i zakazów (turn_cost) - np. do klucza pamięci tras; graf krawędziowy wynika
+    # z grafu, więc dwa TurnGraph tego samego grafu o tej samej sumie dają te same trasy
+    @property
+    def checksum(self):
+        if self._checksum is None:
+            self._checksum = zlib.crc32(memoryview(np.ascontiguousarray(self.turn_cost, dtype=np.float64)).cast("B"))
+        return self._checksum
+
+    def endpoints(self, start, end):
+        return TurnEndpoints(self, start, end)
+
+    # algorytmy grafu CSR na grafie krawędziowym - wynik jak CSRGraph.aShift8 (ścieżka po węzłach grafu)
+    def aShift8(self, cost, h, start, end, queue=None, context=None):
+        from csr_graph import DEFAULT_QUEUE
+
+        ends = self.endpoints(start, end)
+        return ends.result(self.line.aShift8(self.metric(cost), h, start, end, queue or DEFAULT_QUEUE, ends, context))
+
+    def dijkstra(self, cost, start, end, queue=None):
+        from csr_graph import h_zero
+
+        return self.aShift8(cost, h_zero, start, end, queue)
+
+    def aShift8_bidirectional(self, cost, h, start, end, queue=None):
+        from csr_graph import DEFAULT_QUEUE
+
+        ends = self.endpoints(start, end)
+        return ends.result(self.line.aShift8_bidirectional(self.metric(cost), h, start, end, queue or DEFAULT_QUEUE,
+                                                           ends))
+
+    def nbytes(self):
+        return self.line.nbytes() + self.turn_cost.nbytes
+
+# początek i koniec trasy na grafie krawędziowym - dwa węzły dodatkowe (interfejs jak virtual_nodes.VirtualNodes):
+#   S (id m)     - krawędzie do wszystkich krawędzi skierowanych wychodzących z węzła start, koszt krawędzi
+#   T (id m + 1) - krawędzie z wszystkich krawędzi skierowanych wchodzących do węzła end, koszt 0
+class TurnEndpoints:
+    def __init__(self, turns, start, end):
+        graph = turns.graph
+        self.graph = turns.line
+        self.base = graph
+        self.n = turns.line.node_count
+        self.points = [start, end]
+        self.ids = {(start[0], start[1]): self.n, (end[0], end[1]): self.n + 1}
+        s, t = graph.node_id(start), graph.node_id(end)
+        if s is None or t is None:
+            raise ValueError("Route endpoints must be graph nodes (snap)")
+        self.same = s == t
+        self.out = {self.n: [(k, k) for k in range(graph.offsets[s], graph.offsets[s + 1])]}
+        self.inn = {self.n + 1: []}
+        for k, _ in self._arcs_into(t):
+            self.out.setdefault(k, []).append((self.n + 1, -1))
+            self.inn[self.n + 1].append((k, -1))
+        for v, k in self.out[self.n]:
+            self.inn.setdefault(v, []).append((self.n, k))
+        self._adjacent = {}
+
+    def _arcs_into(self, t):
+        rv = self.base.reverse()
+        return [(rv["rev_arcs"][i], rv["rev_sources"][i]) for i in range(rv["rev_offsets"][t], rv["rev_offsets"][t + 1])]
+
+    @property
+    def node_count(self):
+        return self.n + 2
+
+    def __bool__(self):
+        return True
+
+    # krawędzie węzła u (z grafu krawędziowego i do / z S, T): (sąsiedzi, koszty w metryce cost, ID krawędzi).
+    # Krawędź S -> k kosztuje tyle co krawędź k grafu, krawędź k -> T - nic (ID krawędzi -1, usuwane w result)
+    def adjacent(self, u, cost, reverse=False):
+        key = (u, cost, reverse)
+        if key not in self._adjacent:
+            mv, base = self.graph.views(), self.base.views()
+            arcs = []
+            if u < self.n and not reverse:
+                arcs = [(mv["targets"][k], mv[cost][k], mv["edge_ids"][k])
+                        for k in range(mv["offsets"][u], mv["offsets"][u + 1])]
+            elif u < self.n:
+                rv = self.graph.reverse()
+                arcs = [(rv["rev_sources"][i], mv[cost][rv["rev_arcs"][i]], mv["edge_ids"][rv["rev_arcs"][i]])
+                        for i in range(rv["rev_offsets"][u], rv["rev_offsets"][u + 1])]
+            # wpisy out / inn: (sąsiad, krawędź k grafu węzłowego albo -1 dla krawędzi do T)
+            for v, k in (self.inn if reverse else self.out).get(u, []):
+                arcs.append((v, base[cost][k] if k >= 0 else 0.0, base["edge_ids"][k] if k >= 0 else -1))
+            self._adjacent[key] = ([v for v, _, _ in arcs], [w for _, w, _ in arcs], [e for _, _, e in arcs])
+        return self._adjacent[key]
+
+    def node_id(self, xy):
+        return self.ids.get((xy[0], xy[1]))
+
+    def coords(self, v):
+        return self.points[v - self.n] if v >= self.n else self.graph.coords(v)
+
+    def bound(self, lower, cost):
+        raise ValueError("Landmark heuristics are not available on the turn graph")
+
+    # wynik algorytmu na grafie krawędziowym jako ścieżka na grafie węzłowym: bez węzła T i krawędzi k -> T
+    def result(self, result):
+        if self.same:
+            return [self.points[0]], [], 0, 1
+        if result is None:
+            return None
+        path, edge_ids, cost, visited = result
+        return path[:-1], edge_ids[:-1], cost, visited
@@ -0,0 +1,138 @@
+# Authors:  PAGistyczna Drużyna Cybergeodetów
+# Created:  2026-10-18
+#
+# Węzły wirtualne na czas jednego zapytania - punkt spoza grafu jest rzutowany na linię najbliższej drogi,
+# a krawędź jest "dzielona" w miejscu rzutu bez zmiany tablic grafu CSR.
+# Węzły wirtualne mają id n, n + 1, ... (n - liczba węzłów grafu), a ich krawędzie są zapisane osobno:
+#   out[u] / inn[v] - lista (węzeł, indeks krawędzi skierowanej k, ułamek f)
+# Ułamek f jest liczony wzdłuż linii drogi, a nie cięciwy krawędzi. Koszt takiej krawędzi to f * koszt
+# krawędzi k w dowolnej metryce (length, time, ...), a ID krawędzi to ID krawędzi k z pliku źródłowego.
+
+import math
+import numpy as np
+
+class VirtualNodes:
+    def __init__(self, graph):
+        self.graph = graph
+        self.n = graph.node_count
+        self.points = []            # współrzędne rzutów (węzeł n + i)
+        self.ids = {}               # (x, y) rzutu -> id węzła wirtualnego
+        self.out = {}               # krawędzie wychodzące dodane przez podział
+        self.inn = {}               # krawędzie wchodzące dodane przez podział
+        self.on_arc = {}            # k -> [(węzeł wirtualny, ułamek od początku krawędzi k)]
+        self._adjacent = {}         # (węzeł, metryka, kierunek) -> listy krawędzi dla algorytmów
+
+    @property
+    def node_count(self):
+        return self.n + len(self.points)
+
+    def __bool__(self):
+        return bool(self.points)
+
+    def _add_arc(self, u, v, k, f):
+        self.out.setdefault(u, []).append((v, k, f))
+        self.inn.setdefault(v, []).append((u, k, f))
+        self._adjacent.clear()
+
+    # krawędzie węzła u (z grafu i dodane przez podział) jako listy: (sąsiedzi, koszty w metryce cost, ID krawędzi).
+    # Algorytmy w csr_graph używają ich tylko dla węzłów z out (inn dla reverse=True), dla pozostałych - tablic grafu.
+    def adjacent(self, u, cost, reverse=False):
+        key = (u, cost, reverse)
+        if key not in self._adjacent:
+            mv = self.graph.views()
+            w, edge_ids = mv[cost], mv["edge_ids"]
+            arcs = []
+            if u < self.n and not reverse:
+                arcs = [(mv["targets"][k], k, 1.0) for k in range(mv["offsets"][u], mv["offsets"][u + 1])]
+            elif u < self.n:
+                rv = self.graph.reverse()
+                arcs = [(rv["rev_sources"][i], rv["rev_arcs"][i], 1.0)
+                        for i in range(rv["rev_offsets"][u], rv["rev_offsets"][u + 1])]
+            arcs += (self.inn if reverse else self.out).get(u, [])
+            self._adjacent[key] = ([v for v, _, _ in arcs], [f * w[k] for _, k, f in arcs],
+                                   [edge_ids[k] for _, k, _ in arcs])
+        return self._adjacent[key]
+
+    # rzutowanie punktu na najbliższą drogę (w promieniu max_dist) i podział jej krawędzi:
+    # zwraca (id węzła, odległość punktu od grafu) albo None, gdy w promieniu max_dist nie ma krawędzi.
+    # Rzut leży na linii drogi (pełna geometria grafu), a krawędź jest dzielona w ułamku długości linii, w którym
+    # leży rzut - koszty części krawędzi są proporcjonalne do odległości wzdłuż drogi. Rzut na koniec drogi
+    # daje zwykły węzeł grafu.
+    def add(self, point, max_dist=500):
+        graph = self.graph
+        index = graph.spatial_index()
+        near = index.nearest_edge(point, max_dist)
+        if near is None:
+            return None
+        seg, edge_id, xy, f, dist = near
+        start = index.seg_node[seg]                                 # węzeł, od którego liczony jest ułamek f
+        targets = graph.views()["targets"]
+        arcs = graph.arcs_of_edge(edge_id)
+        if f <= 0 or f >= 1:
+            k, u = arcs[0]
+            end = targets[k] if u == start else u
+            return int(start if f <= 0 else end), dist
+        if xy in self.ids:
+            return self.ids[xy], dist
+
+        v = self.node_count
+        self.points.append(xy)
+        self.ids[xy] = v
+        for k, u in arcs:
+            fk = f if u == start else 1 - f                         # ułamek krawędzi k od jej początku
+            self._add_arc(u, v, k, fk)
+            self._add_arc(v, targets[k], k, 1 - fk)
+
+            # inne węzły wirtualne na tej samej krawędzi (np. start i koniec na jednej drodze)
+            for q, fq in self.on_arc.get(k, []):
+                if fq <= fk:
+                    self._add_arc(q, v, k, fk - fq)
+                else:
+                    self._add_arc(v, q, k, fq - fk)
+            self.on_arc.setdefault(k, []).append((v, fk))
+        return v, dist
+
+    # id węzła (wirtualnego albo grafu) o podanych współrzędnych
+    def node_id(self, xy):
+        v = self.ids.get((xy[0], xy[1]))
+        return v if v is not None else self.graph.node_id(xy)
+
+    def coords(self, v):
+        return self.points[v - self.n] if v >= self.n else self.graph.coords(v)
+
+    # dolne oszacowanie kosztu lower(a, b) na węzłach grafu (np. Landmarks.node_h) rozszerzone na węzły wirtualne:
+    # z węzła wirtualnego wychodzi się tylko jego krawędziami, a do węzła wirtualnego wchodzi tylko jego krawędziami.
+    # Krawędzie między dwoma węzłami wirtualnymi leżą na tej samej krawędzi grafu, więc ścieżka przez inny węzeł
+    # wirtualny kosztuje tyle samo co bezpośrednia krawędź do końca krawędzi grafu - wystarczą węzły grafu.
+    def bound(self, lower, cost):
+        w = self.graph.views()[cost]
+        n = self.n
+
+        def wrapped(a, b):
+            if a == b:
+                return 0.0
+            if a >= n:
+                return min((f * w[k] + (0.0 if x == b else wrapped(x, b))
+                            for x, k, f in self.out.get(a, ()) if x < n or x == b), default=0.0)
+            if b >= n:
+                return min((lower(a, u) + f * w[k] for u, k, f in self.inn.get(b, ()) if u < n), default=0.0)
+            return lower(a, b)
+        return wrapped
+
+# snapowanie listy punktów: (id węzłów, koszty dojazdu do grafu w metryce cost).
+# Punkty dalej niż max_dist od sieci mają id None i koszt inf.
+def snap_points(graph, virtual, points, cost, max_dist=500):
+    from toolbox_core import speed_dict
+
+    ids = []
+    snap_costs = []
+    for point in points:
+        i = graph.find_node(point)
+        dist = 0.0
+        if i is None:
+            added = virtual.add(point, max_dist)
+            i, dist = added if added is not None else (None, math.inf)
+        ids.append(i)
+        # dojazd do grafu jak w snap: odległość w linii prostej z prędkością drogi wewnętrznej
+        snap_costs.append(dist if cost == "length" else dist / (speed_dict['droga wewnętrzna'] * 1000 / 3600))
+    return ids, np.array(snap_costs)
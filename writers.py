@@ -0,0 +1,299 @@
+# Authors:  PAGistyczna Drużyna Cybergeodetów
+# Created:  2026-10-18
+#
+# Zapis wyników (trasy, zasięgi, odcinki snapowania) bez arcpy - do plików czytanych przez QGIS / GDAL / ArcGIS:
+#   .geojson            - GeoJSON FeatureCollection zapisywany strumieniowo (obiekt po obiekcie)
+#   .ndjson / .geojsonl - GeoJSON, jeden obiekt (Feature) w wierszu
+#   .csv                - atrybuty i geometria jako WKB (hex) w kolumnie "geometry"
+#   .gpkg               - GeoPackage (sqlite3 z biblioteki standardowej), wiele warstw w jednym pliku;
+#                         wszystkie obiekty warstwy wstawiane w jednej transakcji (executemany partiami)
+# Każdy zapis ma ten sam interfejs: write(coords, properties), write_many, close (albo with).
+# Geometria to współrzędne jak w GeoJSON dla typu warstwy (geometry_type): Point - (x, y), LineString - n x 2
+# (lista albo tablica numpy, np. z CSRGraph.route_geometry), Polygon - lista pierścieni, Multi* - lista części;
+# None - obiekt bez geometrii.
+
+import json
+import os
+import sqlite3
+import struct
+import numpy as np
+
+SRID = 2180             # ETRF2000-PL / CS92 (układ danych BDOT10k i arcpy.env.outputCoordinateSystem w skrypcie)
+WKB_TYPES = {"Point": 1, "LineString": 2, "Polygon": 3, "MultiPoint": 4, "MultiLineString": 5, "MultiPolygon": 6}
+_PARTS = {"MultiPoint": "Point", "MultiLineString": "LineString", "MultiPolygon": "Polygon"}
+SPATIAL_REFS = {
+    2180: ("ETRF2000-PL / CS92", 'PROJCS["ETRF2000-PL / CS92",GEOGCS["ETRF2000-PL",DATUM["ETRF2000_Poland",'
+                                 'SPHEROID["GRS 1980",6378137,298.257222101]],PRIMEM["Greenwich",0],'
+                                 'UNIT["degree",0.0174532925199433]],PROJECTION["Transverse_Mercator"],'
+                                 'PARAMETER["latitude_of_origin",0],PARAMETER["central_meridian",19],'
+                                 'PARAMETER["scale_factor",0.9993],PARAMETER["false_easting",500000],'
+                                 'PARAMETER["false_northing",-5300000],UNIT["metre",1],AUTHORITY["EPSG","2180"]]'),
+    4326: ("WGS 84", 'GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,298.257223563]],'
+                     'PRIMEM["Greenwich",0],UNIT["degree",0.0174532925199433],AUTHORITY["EPSG","4326"]]'),
+}
+
+# WKB (little endian) geometrii
+def wkb(geometry_type, coords):
+    if geometry_type not in WKB_TYPES:
+        raise ValueError(f"Unknown geometry type: {geometry_type}")
+    code = WKB_TYPES[geometry_type]
+    if geometry_type == "Point":
+        return struct.pack("<BIdd", 1, code, float(coords[0]), float(coords[1]))
+    if geometry_type == "LineString":
+        xy = np.asarray(coords, dtype="<f8").reshape(-1, 2)
+        return struct.pack("<BII", 1, code, len(xy)) + xy.tobytes()
+    if geometry_type == "Polygon":
+        out = [struct.pack("<BII", 1, code, len(coords))]
+        for ring in coords:
+            ring = np.asarray(ring, dtype="<f8").reshape(-1, 2)
+            out.append(struct.pack("<I", len(ring)))
+            out.append(ring.tobytes())
+        return b"".join(out)
+    part = _PARTS[geometry_type]
+    return struct.pack("<BII", 1, code, len(coords)) + b"".join(wkb(part, c) for c in coords)
+
+# współrzędne jako listy (GeoJSON) - tablice numpy zamieniane przez tolist
+def coordinates(geometry_type, coords):
+    if geometry_type in ("Point", "LineString"):
+        return np.asarray(coords, dtype=np.float64).tolist()
+    if geometry_type in ("Polygon", "MultiLineString", "MultiPoint"):
+        return [np.asarray(c, dtype=np.float64).tolist() for c in coords]
+    return [coordinates("Polygon", c) for c in coords]
+
+def feature(geometry_type, coords, properties=None):
+    geometry = None if coords is None else {"type": geometry_type, "coordinates": coordinates(geometry_type, coords)}
+    return {"type": "Feature", "properties": properties or {}, "geometry": geometry}
+
+# wszystkie wierzchołki geometrii (n x 2) - zasięg (envelope) obiektu
+def _points(geometry_type, coords):
+    if geometry_type == "Point":
+        return np.asarray(coords, dtype=np.float64).reshape(1, 2)
+    if geometry_type == "LineString":
+        return np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    part = "LineString" if geometry_type == "Polygon" else _PARTS[geometry_type]
+    return np.concatenate([_points(part, c) for c in coords])
+
+class _Writer:
+    def __init__(self, geometry_type):
+        if geometry_type not in WKB_TYPES:
+            raise ValueError(f"Unknown geometry type: {geometry_type}")
+        self.geometry_type = geometry_type
+        self.count = 0
+
+    # features - pary (współrzędne, atrybuty)
+    def write_many(self, features):
+        for coords, properties in features:
+            self.write(coords, properties)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+# GeoJSON FeatureCollection zapisywany obiekt po obiekcie (bez budowania całego słownika w pamięci)
+class GeoJSONWriter(_Writer):
+    def __init__(self, path, geometry_type, layer=None, srid=SRID):
+        super().__init__(geometry_type)
+        self.file = open(path, "w", encoding="utf-8")
+        header = {"type": "FeatureCollection"}
+        if layer:
+            header["name"] = layer
+        # układ współrzędnych inny niż WGS 84 - składnia "crs" z GeoJSON 2008 (czytana przez GDAL)
+        if srid != 4326:
+            header["crs"] = {"type": "name", "properties": {"name": f"urn:ogc:def:crs:EPSG::{srid}"}}
+        self.file.write(json.dumps(header, ensure_ascii=False)[:-1] + ', "features": [\n')
+
+    def write(self, coords, properties=None):
+        if self.count:
+            self.file.write(",\n")
+        self.file.write(json.dumps(feature(self.geometry_type, coords, properties), ensure_ascii=False))
+        self.count += 1
+
+    def close(self):
+        if not self.file.closed:
+            self.file.write("\n]}\n")
+            self.file.close()
+
+# GeoJSON z jednym obiektem w wierszu (newline-delimited) - plik można czytać i dopisywać strumieniowo
+class NDJSONWriter(_Writer):
+    def __init__(self, path, geometry_type, layer=None, srid=SRID):
+        super().__init__(geometry_type)
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write(self, coords, properties=None):
+        self.file.write(json.dumps(feature(self.geometry_type, coords, properties), ensure_ascii=False) + "\n")
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+# CSV z geometrią WKB (hex) w kolumnie "geometry"; kolumny atrybutów z pierwszego obiektu
+class WKBWriter(_Writer):
+    def __init__(self, path, geometry_type, layer=None, srid=SRID):
+        import csv
+
+        super().__init__(geometry_type)
+        self.file = open(path, "w", encoding="utf-8", newline="")
+        self.csv = csv.writer(self.file)
+        self.fields = None
+
+    def write(self, coords, properties=None):
+        properties = properties or {}
+        if self.fields is None:
+            self.fields = list(properties)
+            self.csv.writerow(self.fields + ["geometry"])
+        geometry = "" if coords is None else wkb(self.geometry_type, coords).hex()
+        self.csv.writerow([_text(properties.get(name)) for name in self.fields] + [geometry])
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+# warstwa GeoPackage (OGC GeoPackage 1.2) - tabela z kolumną geometrii "geom" i atrybutami z pierwszego obiektu.
+# Istniejąca warstwa o tej samej nazwie jest zastępowana (jak arcpy.env.overwriteOutput = True).
+# Obiekty są buforowane i wstawiane przez executemany po batch wierszy, całość w jednej transakcji
+# zatwierdzanej w close; wyjątek w bloku with wycofuje zapis warstwy.
+class GeoPackageWriter(_Writer):
+    def __init__(self, path, geometry_type, layer="features", srid=SRID, batch=10000):
+        super().__init__(geometry_type)
+        if srid not in SPATIAL_REFS:
+            raise ValueError(f"Unknown spatial reference: EPSG {srid}")
+        self.layer = layer or "features"
+        self.srid = srid
+        self.batch = batch
+        self.fields = None
+        self.rows = []
+        self.extent = [np.inf, np.inf, -np.inf, -np.inf]
+        self.db = sqlite3.connect(path, isolation_level=None)
+        self.db.execute("PRAGMA application_id = 1196444487")       # "GPKG"
+        self.db.execute("PRAGMA user_version = 10200")
+        self.db.execute("PRAGMA synchronous = OFF")
+        self.db.execute("BEGIN")
+        _gpkg_tables(self.db, srid)
+        table = _quote(self.layer)
+        self.db.execute(f"DROP TABLE IF EXISTS {table}")
+        self.db.execute("DELETE FROM gpkg_geometry_columns WHERE table_name = ?", (self.layer,))
+        self.db.execute("DELETE FROM gpkg_contents WHERE table_name = ?", (self.layer,))
+        self.header = struct.pack("<2sBBi", b"GP", 0, 0b011, srid)    # little endian, envelope minx maxx miny maxy
+
+    def _create(self, properties):
+        self.fields = list(properties)
+        columns = "".join(f", {_quote(name)} {_sql_type(properties[name])}" for name in self.fields)
+        self.db.execute(f"CREATE TABLE {_quote(self.layer)} (fid INTEGER PRIMARY KEY AUTOINCREMENT, "
+                        f"geom {self.geometry_type.upper()}{columns})")
+        self.db.execute("INSERT INTO gpkg_contents (table_name, data_type, identifier, srs_id) "
+                        "VALUES (?, 'features', ?, ?)", (self.layer, self.layer, self.srid))
+        self.db.execute("INSERT INTO gpkg_geometry_columns VALUES (?, 'geom', ?, ?, 0, 0)",
+                        (self.layer, self.geometry_type.upper(), self.srid))
+        placeholders = ", ".join("?" * (len(self.fields) + 1))
+        self.insert = (f"INSERT INTO {_quote(self.layer)} (geom{''.join(', ' + _quote(f) for f in self.fields)}) "
+                       f"VALUES ({placeholders})")
+
+    def write(self, coords, properties=None):
+        properties = properties or {}
+        if self.fields is None:
+            self._create(properties)
+        geometry = None
+        if coords is not None:
+            xy = _points(self.geometry_type, coords)
+            env = (xy[:, 0].min(), xy[:, 0].max(), xy[:, 1].min(), xy[:, 1].max())
+            e = self.extent
+            e[0], e[1], e[2], e[3] = min(e[0], env[0]), min(e[1], env[2]), max(e[2], env[1]), max(e[3], env[3])
+            geometry = self.header + struct.pack("<4d", *env) + wkb(self.geometry_type, coords)
+        self.rows.append([geometry] + [_value(properties.get(name)) for name in self.fields])
+        self.count += 1
+        if len(self.rows) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self.db.executemany(self.insert, self.rows)
+            self.rows = []
+
+    def close(self):
+        if self.db is None:
+            return
+        if self.fields is None:
+            self._create({})
+        self.flush()
+        if self.count and np.isfinite(self.extent[0]):
+            self.db.execute("UPDATE gpkg_contents SET min_x = ?, min_y = ?, max_x = ?, max_y = ? WHERE table_name = ?",
+                            (*map(float, self.extent), self.layer))
+        self.db.execute("COMMIT")
+        self.db.close()
+        self.db = None
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and self.db is not None:
+            self.db.execute("ROLLBACK")
+            self.db.close()
+            self.db = None
+            return
+        self.close()
+
+# tabele systemowe GeoPackage (jeśli plik jest nowy) i definicja układu współrzędnych srid
+def _gpkg_tables(db, srid):
+    db.execute("CREATE TABLE IF NOT EXISTS gpkg_spatial_ref_sys (srs_name TEXT NOT NULL, "
+               "srs_id INTEGER PRIMARY KEY, organization TEXT NOT NULL, organization_coordsys_id INTEGER NOT NULL, "
+               "definition TEXT NOT NULL, description TEXT)")
+    db.execute("CREATE TABLE IF NOT EXISTS gpkg_contents (table_name TEXT NOT NULL PRIMARY KEY, "
+               "data_type TEXT NOT NULL, identifier TEXT UNIQUE, description TEXT DEFAULT '', "
+               "last_change DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')), "
+               "min_x DOUBLE, min_y DOUBLE, max_x DOUBLE, max_y DOUBLE, srs_id INTEGER, "
+               "CONSTRAINT fk_gc_r_srs_id FOREIGN KEY (srs_id) REFERENCES gpkg_spatial_ref_sys(srs_id))")
+    db.execute("CREATE TABLE IF NOT EXISTS gpkg_geometry_columns (table_name TEXT NOT NULL, "
+               "column_name TEXT NOT NULL, geometry_type_name TEXT NOT NULL, srs_id INTEGER NOT NULL, "
+               "z TINYINT NOT NULL, m TINYINT NOT NULL, "
+               "CONSTRAINT pk_geom_cols PRIMARY KEY (table_name, column_name), "
+               "CONSTRAINT fk_gc_tn FOREIGN KEY (table_name) REFERENCES gpkg_contents(table_name), "
+               "CONSTRAINT fk_gc_srs FOREIGN KEY (srs_id) REFERENCES gpkg_spatial_ref_sys (srs_id))")
+    refs = [("Undefined cartesian SRS", -1, "NONE", -1, "undefined"),
+            ("Undefined geographic SRS", 0, "NONE", 0, "undefined")]
+    refs += [(name, code, "EPSG", code, definition) for code, (name, definition) in SPATIAL_REFS.items()
+             if code in (4326, srid)]
+    db.executemany("INSERT OR IGNORE INTO gpkg_spatial_ref_sys (srs_name, srs_id, organization, "
+                   "organization_coordsys_id, definition) VALUES (?, ?, ?, ?, ?)", refs)
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+def _sql_type(value):
+    if isinstance(value, (bool, int, np.integer)):
+        return "INTEGER"
+    if isinstance(value, (float, np.floating)):
+        return "DOUBLE"
+    return "TEXT"
+
+# wartość atrybutu dla sqlite3 (listy i słowniki jako tekst JSON)
+def _value(value):
+    if isinstance(value, (list, tuple, dict)):
+        return json.dumps(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+def _text(value):
+    value = _value(value)
+    return "" if value is None else value
+
+WRITERS = {".geojson": GeoJSONWriter, ".json": GeoJSONWriter, ".ndjson": NDJSONWriter, ".geojsonl": NDJSONWriter,
+           ".csv": WKBWriter, ".gpkg": GeoPackageWriter}
+
+# zapis (writer) dla pliku path - format z rozszerzenia pliku (WRITERS)
+#   layer - nazwa warstwy (tabela w GeoPackage, "name" w GeoJSON)
+def open_writer(path, geometry_type, layer=None, srid=SRID):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in WRITERS:
+        raise ValueError(f"Unknown output format: {ext or path} (use {', '.join(WRITERS)})")
+    if ext == ".gpkg":
+        return GeoPackageWriter(path, geometry_type, layer or os.path.splitext(os.path.basename(path))[0], srid)
+    return WRITERS[ext](path, geometry_type, layer, srid)
+
+# warstwa name w wyjściu output: w GeoPackage - tabela w tym samym pliku, w pozostałych formatach - osobny plik
+# <output bez rozszerzenia>_<name>.<rozszerzenie>
+def open_layer(output, name, geometry_type, srid=SRID):
+    root, ext = os.path.splitext(output)
+    if ext.lower() == ".gpkg":
+        return open_writer(output, geometry_type, name, srid)
+    return open_writer(f"{root}_{name}{ext}", geometry_type, name, srid)